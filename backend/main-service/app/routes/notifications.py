@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+from flask_mail import Message
+import os
 from app import socketio
-from app.websocket.events import emit_quiz_created, emit_quiz_approved, emit_quiz_rejected, emit_quiz_deleted
-from app.services.email_service import EmailService
+from app.websocket.events import (
+    emit_quiz_created, emit_quizzes_imported, emit_quiz_approved, emit_quiz_rejected, emit_quiz_deleted
+)
+from app.services.email_service import EmailService, mail
 from app.services.user_service import UserService
 
 notifications_bp = Blueprint('notifications', __name__)
@@ -17,6 +21,16 @@ def notify_quiz_created():
         return jsonify({"error": str(e)}), 500
 
 
+@notifications_bp.route('/quizzes-imported', methods=['POST'])
+def notify_quizzes_imported():
+    try:
+        import_data = request.get_json()
+        emit_quizzes_imported(socketio, import_data)
+        return jsonify({"message": "Notification sent"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @notifications_bp.route('/quiz-approved', methods=['POST'])
 def notify_quiz_approved():
     try:
@@ -73,10 +87,6 @@ def send_quiz_result_email():
 
         percentage = (score / max_score * 100) if max_score > 0 else 0
 
-        from flask_mail import Message
-        from app.services.email_service import mail
-        from flask import current_app
-
         msg = Message(
             subject=f"Quiz Results: {quiz_title}",
             recipients=[user.email],
@@ -115,41 +125,31 @@ def send_pdf_report():
         data = request.get_json()
         recipient_email = data.get('recipient_email')
         quiz_title = data.get('quiz_title')
-        pdf_data = data.get('pdf_data')  
+        pdf_file = data.get('pdf_file')
 
-        if not all([recipient_email, quiz_title, pdf_data]):
+        if not all([recipient_email, quiz_title, pdf_file]):
             return jsonify({"error": "Missing required fields"}), 400
 
-        import base64
-        import io
-        pdf_bytes = base64.b64decode(pdf_data)
-        pdf_attachment = io.BytesIO(pdf_bytes)
-
-        from flask_mail import Message
-        from app.services.email_service import mail
-        from flask import current_app
+        # A file quiz-service wrote to the shared report spool; only its name is accepted
+        pdf_path = os.path.join(current_app.config['REPORT_SPOOL_DIR'], os.path.basename(pdf_file))
+        if not os.path.isfile(pdf_path):
+            print(f"[EMAIL ERROR] Report file {pdf_path} not found, is the report spool mounted?")
+            return jsonify({"error": "Report file not found"}), 404
 
-        msg = Message(
-            subject=f"Quiz Report: {quiz_title}",
-            recipients=[recipient_email],
-            body=f"""
+        body = f"""
 Hello,
 
 Please find attached the PDF report for quiz: {quiz_title}
 
 Best regards,
 Quiz Platform Team
-            """.strip()
-        )
-
-        msg.attach(
-            f"{quiz_title}_report.pdf",
-            "application/pdf",
-            pdf_attachment.getvalue()
-        )
+        """.strip()
 
         if current_app.config.get('MAIL_SERVER'):
-            mail.send(msg)
+            EmailService.send_file_attachment(
+                recipient_email, f"Quiz Report: {quiz_title}", body,
+                pdf_path, f"{quiz_title}_report.pdf", "application/pdf"
+            )
         else:
             print(f"[EMAIL] PDF report sent to {recipient_email}")
             print(f"Quiz: {quiz_title}")
@@ -7,14 +7,14 @@ quiz_proxy_bp = Blueprint('quiz_proxy', __name__)
 
 QUIZ_SERVICE_URL = os.environ.get('QUIZ_SERVICE_URL', 'http://quiz-service:5001')
 
+FORWARDED_REQUEST_HEADERS = ['Authorization', 'Content-Type', 'Accept-Encoding', 'If-None-Match']
+# Set by this response's own framing; the body is relayed as received (still compressed, if it was)
+DROPPED_RESPONSE_HEADERS = {'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
 def forward_request(path, method='GET', include_body=True):
     url = f"{QUIZ_SERVICE_URL}{path}"
-    headers = {}
-
-    if 'Authorization' in request.headers:
-        headers['Authorization'] = request.headers['Authorization']
-    if 'Content-Type' in request.headers:
-        headers['Content-Type'] = request.headers['Content-Type']
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+    headers.setdefault('Accept-Encoding', 'identity')
 
     params = request.args.to_dict()
 
@@ -29,9 +29,44 @@ def forward_request(path, method='GET', include_body=True):
             headers=headers,
             params=params,
             json=data,
-            timeout=30
+            timeout=30,
+            stream=True
+        )
+        content = response.raw.read(decode_content=False)
+        response_headers = {name: value for name, value in response.headers.items()
+                            if name.lower() not in DROPPED_RESPONSE_HEADERS}
+        return Response(content, status=response.status_code, headers=response_headers)
+
+    except requests.exceptions.RequestException:
+        return jsonify({"error": "Failed to connect to quiz service"}), 503
+
+
+def stream_request(path, method='GET'):
+    """Like forward_request, but streams the request and response bodies instead of buffering them"""
+    url = f"{QUIZ_SERVICE_URL}{path}"
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+    headers.setdefault('Accept-Encoding', 'identity')
+
+    try:
+        response = requests.request(
+            method=method,
+            url=url,
+            headers=headers,
+            params=request.args.to_dict(),
+            data=request.stream if method in ['POST', 'PUT', 'PATCH'] else None,
+            timeout=300,
+            stream=True
         )
-        return Response(response.content, status=response.status_code, headers=dict(response.headers))
+        response_headers = {name: value for name, value in response.headers.items()
+                            if name.lower() not in DROPPED_RESPONSE_HEADERS}
+
+        def body():
+            try:
+                yield from response.raw.stream(64 * 1024, decode_content=False)
+            finally:
+                response.close()
+
+        return Response(body(), status=response.status_code, headers=response_headers)
 
     except requests.exceptions.RequestException:
         return jsonify({"error": "Failed to connect to quiz service"}), 503
@@ -42,6 +77,21 @@ def forward_request(path, method='GET', include_body=True):
 def get_quizzes():
     return forward_request('/quizzes', method='GET', include_body=False)
 
+@quiz_proxy_bp.route('/quizzes/search', methods=['GET'])
+@token_required
+def search_quizzes():
+    return forward_request('/quizzes/search', method='GET', include_body=False)
+
+@quiz_proxy_bp.route('/quizzes/bulk', methods=['POST'])
+@token_required
+def bulk_import_quizzes():
+    return stream_request('/quizzes/bulk', method='POST')
+
+@quiz_proxy_bp.route('/quizzes/export', methods=['GET'])
+@token_required
+def export_quizzes():
+    return stream_request('/quizzes/export', method='GET')
+
 @quiz_proxy_bp.route('/quizzes/<quiz_id>', methods=['GET'])
 @token_required
 def get_quiz(quiz_id):
@@ -62,11 +112,31 @@ def update_quiz(quiz_id):
 def delete_quiz(quiz_id):
     return forward_request(f'/quizzes/{quiz_id}', method='DELETE', include_body=False)
 
-@quiz_proxy_bp.route('/quizzes/<quiz_id>/attempts', methods=['POST'])
+@quiz_proxy_bp.route('/quizzes/my-quizzes', methods=['GET'])
 @token_required
 def get_my_quizzes():
     return forward_request(f'/quizzes/my-quizzes', method='GET', include_body=False)
 
+@quiz_proxy_bp.route('/quizzes/<quiz_id>/attempts', methods=['POST'])
+@token_required
+def start_attempt(quiz_id):
+    return forward_request(f'/quizzes/{quiz_id}/attempts', method='POST', include_body=False)
+
+@quiz_proxy_bp.route('/quizzes/<quiz_id>/attempts/<attempt_id>', methods=['GET'])
+@token_required
+def get_attempt(quiz_id, attempt_id):
+    return forward_request(f'/quizzes/{quiz_id}/attempts/{attempt_id}', method='GET', include_body=False)
+
+@quiz_proxy_bp.route('/quizzes/<quiz_id>/attempts/<attempt_id>/answers', methods=['PATCH'])
+@token_required
+def save_attempt_answers(quiz_id, attempt_id):
+    return forward_request(f'/quizzes/{quiz_id}/attempts/{attempt_id}/answers', method='PATCH')
+
+@quiz_proxy_bp.route('/quizzes/<quiz_id>/attempts/<attempt_id>/submit', methods=['POST'])
+@token_required
+def submit_attempt(quiz_id, attempt_id):
+    return forward_request(f'/quizzes/{quiz_id}/attempts/{attempt_id}/submit', method='POST', include_body=False)
+
 @quiz_proxy_bp.route('/quizzes/pending', methods=['GET'])
 @token_required
 def get_pending_quizzes():
@@ -87,17 +157,62 @@ def reject_quiz(quiz_id):
 def submit_results():
     return forward_request('/results/submit', method='POST')
 
+@quiz_proxy_bp.route('/results/submissions/<submission_id>', methods=['GET'])
+@token_required
+def get_submission_status(submission_id):
+    return forward_request(f'/results/submissions/{submission_id}', method='GET', include_body=False)
+
 @quiz_proxy_bp.route('/results/my-results', methods=['GET'])
 @token_required
 def get_my_results():
     return forward_request('/results/my-results', method='GET', include_body=False)
 
+@quiz_proxy_bp.route('/results/quiz/<quiz_id>/statistics', methods=['GET'])
+@token_required
+def get_quiz_statistics(quiz_id):
+    return forward_request(f'/results/quiz/{quiz_id}/statistics', method='GET', include_body=False)
+
 @quiz_proxy_bp.route('/results/leaderboard/<quiz_id>', methods=['GET'])
 @token_required
 def get_leaderboard(quiz_id):
     return forward_request(f'/results/leaderboard/{quiz_id}', method='GET', include_body=False)
 
+@quiz_proxy_bp.route('/results/leaderboard/<quiz_id>/around-me', methods=['GET'])
+@token_required
+def get_leaderboard_around_me(quiz_id):
+    return forward_request(f'/results/leaderboard/{quiz_id}/around-me', method='GET', include_body=False)
+
 @quiz_proxy_bp.route('/results/quiz/<quiz_id>/user/<user_id>', methods=['GET'])
 @token_required
 def create_pdf_report(quiz_id, user_id):
-    return forward_request(f'/reports/quiz/{quiz_id}', method='POST')
\ No newline at end of file
+    return forward_request(f'/reports/quiz/{quiz_id}', method='POST')
+
+@quiz_proxy_bp.route('/reports/bulk', methods=['POST'])
+@token_required
+def bulk_quiz_reports():
+    return stream_request('/reports/bulk', method='POST')
+
+@quiz_proxy_bp.route('/reports/quiz/<quiz_id>', methods=['POST'])
+@token_required
+def request_quiz_report(quiz_id):
+    return forward_request(f'/reports/quiz/{quiz_id}', method='POST', include_body=False)
+
+@quiz_proxy_bp.route('/reports/quiz/<quiz_id>/questions', methods=['GET'])
+@token_required
+def get_question_analytics(quiz_id):
+    return forward_request(f'/reports/quiz/{quiz_id}/questions', method='GET', include_body=False)
+
+@quiz_proxy_bp.route('/reports/quiz/<quiz_id>/results.<fmt>', methods=['GET'])
+@token_required
+def export_quiz_results(quiz_id, fmt):
+    return stream_request(f'/reports/quiz/{quiz_id}/results.{fmt}', method='GET')
+
+@quiz_proxy_bp.route('/reports/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_report_job(job_id):
+    return forward_request(f'/reports/jobs/{job_id}', method='GET', include_body=False)
+
+@quiz_proxy_bp.route('/reports/jobs/<job_id>/pdf', methods=['GET'])
+@token_required
+def download_report(job_id):
+    return stream_request(f'/reports/jobs/{job_id}/pdf', method='GET')
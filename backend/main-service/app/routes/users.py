@@ -1,14 +1,15 @@
 from flask import Blueprint, request, jsonify, g
 from marshmallow import ValidationError
-from app.schemas.user_schema import UserUpdateSchema, RoleChangeSchema, UserResponseSchema
+from app.schemas.user_schema import UserUpdateSchema, RoleChangeSchema, UserResponseSchema, PublicUsersBatchSchema
 from app.services.user_service import UserService
-from app.utils.decorators import token_required, admin_required
+from app.utils.decorators import token_required, admin_required, service_token_required
 
 users_bp = Blueprint('users', __name__)
 
 user_update_schema = UserUpdateSchema()
 role_change_schema = RoleChangeSchema()
 user_response_schema = UserResponseSchema()
+public_users_batch_schema = PublicUsersBatchSchema()
 
 
 @users_bp.route('', methods=['GET'])
@@ -58,6 +59,30 @@ def get_user_public(user_id):
         return jsonify({"error": "Failed to retrieve user"}), 500
 
 
+@users_bp.route('/public/batch', methods=['POST'])
+@service_token_required
+def get_users_public_batch():
+    try:
+        data = public_users_batch_schema.load(request.get_json() or {})
+        users = UserService.get_public_users(data['ids'])
+        return jsonify({
+            "users": [
+                {
+                    "id": user.id,
+                    "first_name": user.first_name,
+                    "last_name": user.last_name,
+                    "email": user.email
+                }
+                for user in users
+            ]
+        }), 200
+
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve users"}), 500
+
+
 @users_bp.route('/<int:user_id>', methods=['PUT'])
 @token_required
 def update_user(user_id):
@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields, validates, ValidationError
+from marshmallow import Schema, fields, validates, ValidationError, validate
 from marshmallow.fields import Field
 import re
 
@@ -32,6 +32,10 @@ class UserUpdateSchema(Schema):
         return value
 
 
+class PublicUsersBatchSchema(Schema):
+    ids = fields.List(fields.Int(), required=True, validate=validate.Length(min=1, max=5000))
+
+
 class RoleChangeSchema(Schema):
     role = fields.Str(required=True)
 
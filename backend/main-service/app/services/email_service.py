@@ -1,8 +1,19 @@
+from email import policy
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
+from smtplib import SMTPDataError, SMTPRecipientsRefused, SMTPSenderRefused
 from flask import current_app
 from flask_mail import Mail, Message
+import base64
+import re
 
 mail = Mail()
 
+# Whole base64 lines: 57 input bytes encode to one 76 character line
+ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
 
 class EmailService:
     @staticmethod
@@ -72,3 +83,61 @@ Quiz Platform Team
         except Exception as e:
             print(f"[EMAIL ERROR] Failed to send role change email: {str(e)}")
             return False
+
+    @staticmethod
+    def send_file_attachment(recipient, subject, body, file_path, filename, content_type):
+        """
+        Send a message with one file attached, streaming the file into the SMTP
+        DATA command in base64 chunks instead of building the message in memory.
+        Raises on failure.
+        """
+        boundary = make_msgid().strip('<>').replace('@', '.')
+        message = MIMEMultipart(boundary=boundary)
+        message['Subject'] = subject
+        message['From'] = current_app.config['MAIL_DEFAULT_SENDER']
+        message['To'] = recipient
+        message['Date'] = formatdate(localtime=True)
+        message['Message-ID'] = make_msgid()
+
+        maintype, subtype = content_type.split('/', 1)
+        attachment = MIMEBase(maintype, subtype)
+        attachment.add_header('Content-Disposition', 'attachment', filename=filename)
+        attachment['Content-Transfer-Encoding'] = 'base64'
+
+        def headers(part):
+            return b''.join(policy.SMTP.fold_binary(name, value) for name, value in part.items())
+
+        head = (
+            headers(message) + b'\r\n'
+            + f"--{boundary}\r\n".encode() + MIMEText(body, 'plain', 'utf-8').as_bytes(policy=policy.SMTP)
+            + f"\r\n--{boundary}\r\n".encode() + headers(attachment) + b'\r\n'
+        )
+
+        with mail.connect() as connection:
+            smtp = connection.host
+            if smtp is None:
+                return
+
+            smtp.ehlo_or_helo_if_needed()
+            code, reply = smtp.mail(message['From'])
+            if code != 250:
+                raise SMTPSenderRefused(code, reply, message['From'])
+            code, reply = smtp.rcpt(recipient)
+            if code not in (250, 251):
+                raise SMTPRecipientsRefused({recipient: (code, reply)})
+
+            smtp.putcmd('data')
+            code, reply = smtp.getreply()
+            if code != 354:
+                raise SMTPDataError(code, reply)
+
+            # Lines starting with a dot are doubled, as smtplib does; base64 lines never start with one
+            smtp.send(re.sub(rb'(?m)^\.', b'..', head))
+            with open(file_path, 'rb') as attachment_file:
+                for chunk in iter(lambda: attachment_file.read(ATTACHMENT_CHUNK_SIZE), b''):
+                    smtp.send(base64.encodebytes(chunk).replace(b'\n', b'\r\n'))
+            smtp.send(f"--{boundary}--\r\n.\r\n".encode())
+
+            code, reply = smtp.getreply()
+            if code != 250:
+                raise SMTPDataError(code, reply)
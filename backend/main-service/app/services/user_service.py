@@ -4,9 +4,15 @@ from app.models.audit_log import AuditLog
 from app.services.email_service import EmailService
 from app.utils.password_utils import hash_password, verify_password
 from datetime import datetime, date
+from flask import current_app
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
 
 
 class UserService:
+    PROFILE_EVENTS_STREAM = "user-profile-events"
+    PROFILE_EVENTS_MAXLEN = 100000
+
     @staticmethod
     def get_user(user_id):
         """Get all user by ID"""
@@ -16,6 +22,14 @@ class UserService:
 
         return user
 
+    @staticmethod
+    def get_public_users(user_ids):
+        """Get public profile fields of many users with a single query"""
+        rows = db.session.query(User.id, User.first_name, User.last_name, User.email).filter(
+            User.id == any_(bindparam('user_ids', value=list(set(user_ids)), type_=ARRAY(db.Integer)))
+        ).all()
+        return rows
+
     @staticmethod 
     def list_all_users():
         """List all users"""
@@ -70,8 +84,29 @@ class UserService:
         user.updated_at = datetime.utcnow()
         db.session.commit()
 
+        if 'first_name' in data or 'last_name' in data:
+            UserService.publish_profile_changed(user)
+
         return user
 
+    @staticmethod
+    def publish_profile_changed(user):
+        """Let other services refresh the user's name wherever they copied it"""
+        try:
+            current_app.redis_client.xadd(
+                UserService.PROFILE_EVENTS_STREAM,
+                {
+                    'user_id': user.id,
+                    'first_name': user.first_name or '',
+                    'last_name': user.last_name or '',
+                    'email': user.email or ''
+                },
+                maxlen=UserService.PROFILE_EVENTS_MAXLEN,
+                approximate=True
+            )
+        except Exception as e:
+            print(f"[EVENTS] Failed to publish profile change for user {user.id}: {str(e)}")
+
     @staticmethod
     def delete_user(user_id):
         """Delete user (admin only)"""
@@ -1,5 +1,6 @@
 from functools import wraps
-from flask import request, jsonify, g
+import hmac
+from flask import current_app, request, jsonify, g
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 from app.models.user import User
 
@@ -47,3 +48,16 @@ def moderator_required(func):
         return func(*args, **kwargs)
 
     return wrapper
+
+
+def service_token_required(func):
+    """For service-to-service endpoints: the caller must send SERVICE_TOKEN in X-Service-Token"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        expected = current_app.config.get('SERVICE_TOKEN')
+        provided = request.headers.get('X-Service-Token', '')
+        if not expected or not hmac.compare_digest(provided.encode('utf-8'), expected.encode('utf-8')):
+            return jsonify({"error": "Service token required"}), 401
+        return func(*args, **kwargs)
+
+    return wrapper
@@ -59,6 +59,11 @@ def emit_quiz_created(socketio, quiz_data):
     print(f"[WebSocket] Emitted new_quiz_created to admin_room")
 
 
+def emit_quizzes_imported(socketio, import_data):
+    socketio.emit('quizzes_imported', import_data, room='admin_room')
+    print(f"[WebSocket] Emitted quizzes_imported to admin_room")
+
+
 def emit_quiz_approved(socketio, quiz_data, author_id):
     socketio.emit('quiz_approved', quiz_data, room=f'user_{author_id}')
     print(f"[WebSocket] Emitted quiz_approved to user_{author_id}")
@@ -6,9 +6,15 @@ class Config:
     REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Shared secret quiz-service sends to internal endpoints; they reject every call while unset
+    SERVICE_TOKEN = os.environ.get("SERVICE_TOKEN", "")
+
     MAIL_SERVER = os.environ.get("MAIL_SERVER")
     MAIL_PORT = int(os.environ.get("MAIL_PORT", 587))
     MAIL_USE_TLS = os.environ.get("MAIL_USE_TLS", "True").lower() == "true"
     MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
     MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
-    MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER", "noreply@quizplatform.com")
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER", "noreply@quizplatform.com")
+
+    # Quiz report PDFs written by quiz-service to the shared spool volume
+    REPORT_SPOOL_DIR = os.environ.get("REPORT_SPOOL_DIR", "/tmp/quiz-reports")
@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from pymongo import MongoClient
+import redis
 from config import Config
 
 jwt = JWTManager()
@@ -18,17 +19,71 @@ def create_app():
     app.mongo_client = MongoClient(app.config['MONGO_URI'])
     app.mongo_db = app.mongo_client[app.config.get('MONGO_DB', 'quiz_db')]
 
+    app.redis_client = redis.from_url(app.config.get('REDIS_URL', 'redis://localhost:6379/0'))
+
     from app.models.quiz import QuizModel
     from app.models.result import ResultModel
+    from app.models.submission_job import SubmissionJobModel
+    from app.models.leaderboard_entry import LeaderboardEntryModel
+    from app.models.player_view import PlayerViewModel
+    from app.models.quiz_version import QuizVersionModel
+    from app.models.attempt import AttemptModel
+    from app.models.report_job import ReportJobModel
+    from app.models.question_stats import QuestionStatsModel
+    from app.models.score_sketch import ScoreSketchModel
+    from app.services.report_artifacts import ReportArtifactStore
+    from app.services.report_jobs import ReportJobRunner
+    from app.services.attempt_service import AttemptBuffer
+    from app.services.leaderboard_engine import LeaderboardEngine
+    from app.services.quiz_cache import QuizCache
+    from app.services.rerank_job import RerankJob
+    from app.services.user_directory import UserDirectory
+    from app.commands import register_commands
+    from app.utils.serializers import to_jsonable
+
+    app.quiz_cache = None
+    if app.config['QUIZ_CACHE_ENABLED']:
+        app.quiz_cache = QuizCache(
+            app.redis_client,
+            max_size=app.config['QUIZ_CACHE_SIZE'],
+            ttl_seconds=app.config['QUIZ_CACHE_TTL_SECONDS']
+        )
 
-    app.quiz_model = QuizModel(app.mongo_db)
+    app.quiz_model = QuizModel(app.mongo_db, cache=app.quiz_cache)
+    app.player_view_model = PlayerViewModel(app.mongo_db)
+    app.quiz_version_model = QuizVersionModel(app.mongo_db)
     app.result_model = ResultModel(app.mongo_db)
+    app.attempt_model = AttemptModel(app.mongo_db)
+    app.attempt_buffer = AttemptBuffer(
+        app.redis_client, app.attempt_model,
+        retention_seconds=app.config['ATTEMPT_BUFFER_RETENTION_SECONDS']
+    )
+    app.submission_job_model = SubmissionJobModel(app.mongo_db)
+    app.leaderboard_entry_model = LeaderboardEntryModel(app.mongo_db)
+    app.leaderboard = LeaderboardEngine(app.redis_client, app.result_model)
+    app.user_directory = UserDirectory(
+        app.config['MAIN_SERVICE_URL'],
+        chunk_size=app.config['USER_DIRECTORY_CHUNK_SIZE'],
+        max_workers=app.config['USER_DIRECTORY_CONCURRENCY'],
+        timeout=app.config['USER_DIRECTORY_TIMEOUT'],
+        service_token=app.config['USER_DIRECTORY_SERVICE_TOKEN']
+    )
+    app.question_stats_model = QuestionStatsModel(app.mongo_db)
+    app.score_sketch_model = ScoreSketchModel(app.mongo_db)
+    app.report_job_model = ReportJobModel(app.mongo_db)
+    app.report_artifacts = ReportArtifactStore(
+        app.config['REPORT_ARTIFACT_DIR'],
+        lock_timeout_seconds=app.config['REPORT_RENDER_LOCK_SECONDS']
+    )
+    report_config = {key: value for key, value in app.config.items() if key.startswith(('REPORT_', 'USER_DIRECTORY_'))}
+    report_config.update(MONGO_URI=app.config['MONGO_URI'], MONGO_DB=app.config['MONGO_DB'],
+                         MAIN_SERVICE_URL=app.config['MAIN_SERVICE_URL'])
+    app.report_jobs = ReportJobRunner(report_config, app.report_job_model, app.config['REPORT_WORKERS'])
+    app.rerank_job = RerankJob(app.mongo_db, app.result_model, lag_seconds=app.config['RERANK_LAG_SECONDS'])
 
-    app.mongo_db.quizzes.create_index('status')
-    app.mongo_db.quizzes.create_index('author_id')
-    app.mongo_db.results.create_index('quiz_id')
-    app.mongo_db.results.create_index('user_id')
-    app.mongo_db.results.create_index([('quiz_id', 1), ('score', -1)])
+    register_commands(app)
+
+    app.result_worker_pool = None
 
     @app.route("/test-db2")
     def test_db2():
@@ -56,12 +111,66 @@ def create_app():
         except Exception as e:
             return {"status": "error", "message": str(e)}, 500
 
+    @app.route("/metrics")
+    def metrics():
+        return {
+            "result_pool": app.result_worker_pool.stats() if app.result_worker_pool else None,
+            "rerank": to_jsonable(app.rerank_job.last_run()),
+            "quiz_cache": app.quiz_cache.stats() if app.quiz_cache else None,
+            "report_jobs": app.report_jobs.stats()
+        }, 200
+
     from app.routes.quiz import quiz_bp
     from app.routes.results import results_bp
     from app.routes.reports import reports_bp
+    from app.routes.attempts import attempts_bp
 
     app.register_blueprint(quiz_bp, url_prefix='/quizzes')
+    app.register_blueprint(attempts_bp, url_prefix='/quizzes')
     app.register_blueprint(results_bp, url_prefix='/results')
     app.register_blueprint(reports_bp, url_prefix='/reports')
 
     return app
+
+
+def start_background_services(app):
+    """
+    Start the result workers and background threads of an app that is about to serve.
+    Kept out of create_app so CLI commands and the reloader's watching process don't run them.
+    """
+    from app.services.attempt_service import start_attempt_flusher
+    from app.services.rerank_job import start_rerank_scheduler
+
+    if app.config['RESULT_WORKERS_ENABLED']:
+        from app.services.worker_pool import ResultWorkerPool
+
+        worker_config = {key: value for key, value in app.config.items() if key.startswith('RESULT_')}
+        worker_config['MONGO_URI'] = app.config['MONGO_URI']
+        worker_config['MONGO_DB'] = app.config['MONGO_DB']
+        worker_config['MAIN_SERVICE_URL'] = app.config['MAIN_SERVICE_URL']
+        worker_config['REDIS_URL'] = app.config['REDIS_URL']
+        worker_config.update({key: value for key, value in app.config.items() if key.startswith('USER_DIRECTORY_')})
+
+        app.result_worker_pool = ResultWorkerPool(worker_config, app.submission_job_model)
+        app.result_worker_pool.start()
+
+    app.report_jobs.start_heartbeat(app.config['REPORT_JOB_HEARTBEAT_SECONDS'])
+
+    if app.config['RERANK_ENABLED']:
+        start_rerank_scheduler(app.rerank_job, app.config['RERANK_INTERVAL_SECONDS'])
+
+    if app.config['ATTEMPT_FLUSH_ENABLED']:
+        start_attempt_flusher(
+            app.attempt_buffer, app.config['ATTEMPT_FLUSH_INTERVAL_SECONDS'], app.config['ATTEMPT_FLUSH_BATCH_SIZE'],
+            job_model=app.submission_job_model, grace_seconds=app.config['ATTEMPT_GRACE_SECONDS']
+        )
+
+    if app.config['PROFILE_EVENTS_ENABLED']:
+        from app.services.profile_events import ProfileEventConsumer, start_profile_event_consumer
+
+        start_profile_event_consumer(ProfileEventConsumer(
+            app.redis_client, app.result_model, app.leaderboard_entry_model, app.leaderboard,
+            app.config['PROFILE_EVENTS_STREAM'], store_email=app.config['RESULT_STORE_USER_EMAIL'],
+            retry_idle_seconds=app.config['PROFILE_EVENTS_RETRY_IDLE_SECONDS'],
+            max_deliveries=app.config['PROFILE_EVENTS_MAX_DELIVERIES']
+        ))
@@ -0,0 +1,106 @@
+import click
+from flask import current_app
+from app.indexes import apply_indexes, verify_query_plans
+from app.services.report_service import ReportService
+from app.services.result_processor import ResultProcessor
+
+
+def _quiz_ids(quiz_id):
+    if quiz_id:
+        return [quiz_id]
+    return [str(quiz_id) for quiz_id in current_app.result_model.find_quiz_ids()]
+
+
+def register_commands(app):
+
+    @app.cli.command('leaderboard-rebuild')
+    @click.option('--quiz-id', default=None, help='Rebuild a single quiz (default: every quiz with results)')
+    def leaderboard_rebuild(quiz_id):
+        """Rebuild Redis leaderboards from the results collection"""
+        for current_quiz_id in _quiz_ids(quiz_id):
+            if not current_app.leaderboard.rebuild(current_quiz_id):
+                click.echo(f"{current_quiz_id}: rebuild already running, skipped")
+
+    @app.cli.command('leaderboard-backfill')
+    @click.option('--quiz-id', default=None, help='Backfill a single quiz (default: every quiz)')
+    def leaderboard_backfill(quiz_id):
+        """Build leaderboard_entries (best attempt per user) from existing results"""
+        count = current_app.leaderboard_entry_model.backfill(quiz_id)
+        click.echo(f"{count} leaderboard entr{'y' if count == 1 else 'ies'}")
+
+    @app.cli.command('leaderboard-check')
+    @click.option('--quiz-id', default=None, help='Check a single quiz (default: every quiz with results)')
+    @click.option('--sample', default=100, help='Number of top rows to compare')
+    def leaderboard_check(quiz_id, sample):
+        """Compare Redis leaderboards with Mongo and exit non-zero on any mismatch"""
+        inconsistent = 0
+        for current_quiz_id in _quiz_ids(quiz_id):
+            problems = current_app.leaderboard.check(current_quiz_id, sample)
+            if problems:
+                inconsistent += 1
+                for problem in problems:
+                    click.echo(f"{current_quiz_id}: {problem}")
+
+        if inconsistent:
+            click.echo(f"{inconsistent} inconsistent leaderboard(s)")
+            raise SystemExit(1)
+        click.echo("All leaderboards consistent")
+
+    @app.cli.command('rerank')
+    @click.option('--all', 'all_quizzes', is_flag=True, help='Re-rank every quiz, not only those with new results')
+    def rerank(all_quizzes):
+        """Bring ranked_position of stored results up to date"""
+        metrics = current_app.rerank_job.run(all_quizzes=all_quizzes)
+        if metrics is None:
+            click.echo("Another re-ranking run is in progress")
+            raise SystemExit(1)
+
+    @app.cli.command('quiz-summary-backfill')
+    def quiz_summary_backfill():
+        """Store question_count and total_points on quizzes created before they existed"""
+        count = current_app.quiz_model.backfill_summaries()
+        click.echo(f"{count} quiz(zes) updated")
+
+    @app.cli.command('quiz-versions-backfill')
+    def quiz_versions_backfill():
+        """Snapshot the current revision of every approved quiz that has no snapshot yet"""
+        count = 0
+        for quiz in current_app.quiz_model.iter_quizzes(current_app.quiz_model.quiz_filter(status='APPROVED')):
+            current_app.quiz_version_model.create_snapshot(quiz)
+            count += 1
+        click.echo(f"{count} approved quiz(zes) snapshotted")
+
+    @app.cli.command('question-stats-rebuild')
+    @click.option('--quiz-id', default=None, help='Rebuild a single quiz (default: every quiz with results)')
+    def question_stats_rebuild(quiz_id):
+        """Recompute per-question statistics from the results collection"""
+        for current_quiz_id in _quiz_ids(quiz_id):
+            count = ReportService.rebuild_question_stats(current_quiz_id)
+            click.echo(f"{current_quiz_id}: {count} result(s)")
+
+    @app.cli.command('score-sketch-rebuild')
+    @click.option('--quiz-id', default=None, help='Rebuild a single quiz (default: every quiz with results)')
+    def score_sketch_rebuild(quiz_id):
+        """Recompute score distribution sketches from the results collection"""
+        for current_quiz_id in _quiz_ids(quiz_id):
+            count = ResultProcessor.rebuild_score_sketch(current_quiz_id)
+            click.echo(f"{current_quiz_id}: {count} result(s)")
+
+    @app.cli.command('indexes-apply')
+    @click.option('--prune', is_flag=True, help='Also drop indexes that are not in the registry')
+    def indexes_apply(prune):
+        """Create the indexes declared in app.indexes"""
+        for action in apply_indexes(current_app.mongo_db, prune=prune):
+            click.echo(action)
+
+    @app.cli.command('indexes-verify')
+    def indexes_verify():
+        """Explain every registered query shape and exit non-zero on a collection scan or in-memory sort"""
+        problems = verify_query_plans(current_app.mongo_db)
+        for description, stages in problems:
+            click.echo(f"{description}: {', '.join(stages)}")
+
+        if problems:
+            click.echo(f"{len(problems)} query shape(s) without a suitable index")
+            raise SystemExit(1)
+        click.echo("All query shapes use indexes")
@@ -0,0 +1,241 @@
+"""
+Index registry for quiz-service collections and a plan checker for the
+queries the models run.
+
+`flask indexes-apply` creates what is declared here (and with --prune drops
+what is not); `flask indexes-verify` explains every registered query shape
+and reports any that would scan a collection or sort in memory.
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from app.models.attempt import AttemptModel
+from app.models.leaderboard_entry import LeaderboardEntryModel
+from app.models.question_stats import QuestionStatsModel
+from app.models.quiz import QuizModel
+from app.models.quiz_version import QuizVersionModel
+from app.models.report_job import ReportJobModel
+from app.models.result import ResultModel
+from app.models.submission_job import SubmissionJobModel
+
+INDEXES = {
+    'quizzes': [
+        IndexModel([('author_id', ASCENDING), ('_id', ASCENDING)]),
+        IndexModel([('status', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]),
+        IndexModel([('status', ASCENDING), ('_id', ASCENDING)]),
+        IndexModel(
+            [('title', TEXT), ('description', TEXT), ('questions.text', TEXT)],
+            weights={'title': 10, 'description': 4, 'questions.text': 1},
+            name='quiz_text'
+        ),
+    ],
+    'quiz_versions': [
+        IndexModel([('quiz_id', ASCENDING), ('version', ASCENDING)], unique=True),
+    ],
+    'attempts': [
+        IndexModel([('quiz_id', ASCENDING), ('user_id', ASCENDING), ('status', ASCENDING)]),
+        IndexModel([('status', ASCENDING), ('updated_at', ASCENDING)]),
+    ],
+    'question_stats': [
+        IndexModel([('quiz_id', ASCENDING), ('version', ASCENDING)], unique=True),
+    ],
+    'results': [
+        IndexModel([('quiz_id', ASCENDING), ('score', DESCENDING), ('time_spent_seconds', ASCENDING)]),
+        IndexModel([('user_id', ASCENDING), ('submitted_at', DESCENDING)]),
+        IndexModel([('quiz_id', ASCENDING), ('submitted_at', DESCENDING)]),
+        IndexModel([('submitted_at', ASCENDING)]),
+    ],
+    'leaderboard_entries': [
+        IndexModel([('quiz_id', ASCENDING), ('user_id', ASCENDING)], unique=True),
+        IndexModel([('user_id', ASCENDING), ('quiz_id', ASCENDING)]),
+        IndexModel([
+            ('quiz_id', ASCENDING), ('score', DESCENDING), ('time_spent_seconds', ASCENDING),
+            ('user_id', ASCENDING), ('max_score', ASCENDING), ('submitted_at', ASCENDING), ('user_name', ASCENDING)
+        ]),
+    ],
+    'report_jobs': [
+        IndexModel([('finished_at', ASCENDING)], expireAfterSeconds=7 * 86400),
+        IndexModel([('status', ASCENDING), ('heartbeat_at', ASCENDING)]),
+    ],
+    'submission_jobs': [
+        IndexModel([('status', ASCENDING), ('enqueued_at', ASCENDING)]),
+        IndexModel([('finished_at', ASCENDING)], expireAfterSeconds=86400),
+        IndexModel([('batch_id', ASCENDING)], sparse=True),
+    ],
+}
+
+BAD_STAGES = {'COLLSCAN', 'SORT'}
+
+
+def missing_unique_indexes(mongo_db):
+    """(collection, key) of every registered unique index that does not exist in the database"""
+    missing = []
+    for collection_name, indexes in INDEXES.items():
+        unique = [index.document for index in indexes if index.document.get('unique')]
+        if not unique:
+            continue
+        existing = [
+            list(info['key']) for info in mongo_db[collection_name].index_information().values() if info.get('unique')
+        ]
+        missing += [(collection_name, list(index['key'].items())) for index in unique
+                    if list(index['key'].items()) not in existing]
+    return missing
+
+
+def check_unique_indexes(mongo_db):
+    """
+    Raise unless every registered unique index exists. Upserts rely on them for
+    correctness, so serving without them is refused; they are only ever built
+    by `flask indexes-apply`.
+    """
+    missing = missing_unique_indexes(mongo_db)
+    if missing:
+        described = ', '.join(f"{collection}{key}" for collection, key in missing)
+        raise RuntimeError(f"Missing unique indexes: {described}. Run `flask indexes-apply` first")
+
+
+def apply_indexes(mongo_db, prune=False):
+    """Create every registered index; returns a list of what was done"""
+    actions = []
+    for collection_name, indexes in INDEXES.items():
+        collection = mongo_db[collection_name]
+        names = collection.create_indexes(indexes)
+        actions += [f"{collection_name}: {name}" for name in names]
+
+        if prune:
+            wanted = set(names) | {'_id_'}
+            for name in collection.index_information():
+                if name not in wanted:
+                    collection.drop_index(name)
+                    actions.append(f"{collection_name}: dropped {name}")
+    return actions
+
+
+def query_shapes():
+    """
+    (description, command, allowed bad stages) for every query the models
+    issue, reads and filtered writes alike. The commands come from the models'
+    own *_query builders, called with sample values in place of request
+    parameters. Lookups and writes by _id alone always use the _id index and
+    are left out.
+    """
+    quiz_id = ObjectId()
+    ids = [ObjectId(), ObjectId()]
+    now = datetime.utcnow()
+    result = {'_id': ObjectId(), 'quiz_id': quiz_id, 'user_id': 1, 'user_name': 'A', 'score': 10, 'max_score': 20,
+              'time_spent_seconds': 60, 'submitted_at': now}
+    around_position, around_above, around_below = LeaderboardEntryModel.find_around_queries(quiz_id, 1, 10, 60)
+    return [
+        ('QuizModel.find_all_quizzes (status)',
+         QuizModel.find_all_quizzes_query(QuizModel.quiz_filter(status='APPROVED')), set()),
+        ('QuizModel.find_all_quizzes (author)',
+         QuizModel.find_all_quizzes_query(QuizModel.quiz_filter(author_id=1)), set()),
+        ('QuizModel.find_all_quizzes (author, status)',
+         QuizModel.find_all_quizzes_query(QuizModel.quiz_filter(status='APPROVED', author_id=1)), set()),
+        ('QuizModel.find_quiz_summaries',
+         QuizModel.find_quiz_summaries_query(QuizModel.STATUSES, after=(now, quiz_id)), set()),
+        ('QuizModel.iter_quizzes (status)',
+         QuizModel.iter_quizzes_query(QuizModel.quiz_filter(status='APPROVED')), set()),
+        ('QuizModel.find_quiz_titles (ids)',
+         QuizModel.find_quiz_titles_query(QuizModel.quiz_filter(quiz_ids=ids), 500), set()),
+        ('QuizModel.find_quiz_titles (status)',
+         QuizModel.find_quiz_titles_query(QuizModel.quiz_filter(status='APPROVED'), 500), set()),
+        ('QuizModel.find_quiz_titles (author)',
+         QuizModel.find_quiz_titles_query(QuizModel.quiz_filter(author_id=1), 500), set()),
+        ('QuizModel.find_quiz_titles (author, status)',
+         QuizModel.find_quiz_titles_query(QuizModel.quiz_filter(status='APPROVED', author_id=1), 500), set()),
+        # One-off migration that has to visit every quiz
+        ('QuizModel.backfill_summaries', QuizModel.backfill_summaries_query(), {'COLLSCAN'}),
+        # Ordering by text score always happens after the text match
+        ('QuizModel.search_quiz_summaries',
+         QuizModel.search_quiz_summaries_query('history', ['APPROVED'], after=(1.5, quiz_id)), {'SORT'}),
+        ('QuizVersionModel.find_version', QuizVersionModel.find_version_query(quiz_id, 1), set()),
+        ('AttemptModel.find_active_attempt', AttemptModel.find_active_attempt_query(quiz_id, 1), set()),
+        ('AttemptModel.find_stale_submissions', AttemptModel.find_stale_submissions_query(now), set()),
+        ('QuestionStatsModel.record', QuestionStatsModel.record_query({(quiz_id, 1): {'count': 1}}), set()),
+        ('QuestionStatsModel.find_stats', QuestionStatsModel.find_stats_query(quiz_id, 1), set()),
+        ('QuestionStatsModel.find_versions', QuestionStatsModel.find_versions_query(quiz_id), set()),
+        ('QuestionStatsModel.delete_stats', QuestionStatsModel.delete_stats_query(quiz_id), set()),
+        ('ResultModel.find_results_by_user', ResultModel.find_results_by_user_query(1), set()),
+        ('ResultModel.find_results_by_quiz', ResultModel.find_results_by_quiz_query(quiz_id), set()),
+        ('ResultModel.find_latest_submission_time', ResultModel.find_latest_submission_time_query(quiz_id), set()),
+        ('ResultModel.find_latest_submission_times', ResultModel.find_latest_submission_times_query(ids), set()),
+        ('ResultModel.iter_rank_rows', ResultModel.iter_rank_rows_query(quiz_id), set()),
+        ('ResultModel.iter_question_rows', ResultModel.iter_question_rows_query(quiz_id), set()),
+        ('ResultModel.iter_score_rows', ResultModel.iter_score_rows_query(quiz_id), set()),
+        ('ResultModel.iter_ranked_rows', ResultModel.iter_ranked_rows_query(quiz_id), set()),
+        ('ResultModel.iter_export_rows', ResultModel.iter_export_rows_query(quiz_id), set()),
+        ('ResultModel.find_top_results', ResultModel.find_top_results_query(quiz_id, 20), set()),
+        ('ResultModel.get_quiz_statistics', ResultModel.get_quiz_statistics_query(quiz_id), set()),
+        ('ResultModel.count_results_by_quiz', ResultModel.count_results_by_quiz_query(quiz_id), set()),
+        ('ResultModel.calculate_user_rank', ResultModel.calculate_user_rank_query(quiz_id, 10, 60), set()),
+        ('ResultModel.get_leaderboard', ResultModel.get_leaderboard_query(quiz_id), set()),
+        ('ResultModel.find_quizzes_with_results_between',
+         ResultModel.find_quizzes_with_results_between_query(now - timedelta(minutes=5), now), set()),
+        ('ResultModel.find_quiz_ids', ResultModel.find_quiz_ids_query(), set()),
+        ('ResultModel.set_user_fields', ResultModel.set_user_fields_query(1, {'user_name': 'A'}), set()),
+        ('LeaderboardEntryModel.backfill', LeaderboardEntryModel.backfill_query(quiz_id), set()),
+        ('LeaderboardEntryModel.backfill (count)', LeaderboardEntryModel.count_entries_query(quiz_id), set()),
+        ('LeaderboardEntryModel.upsert_best', LeaderboardEntryModel.upsert_best_query([result]), set()),
+        ('LeaderboardEntryModel.find_top', LeaderboardEntryModel.find_top_query(quiz_id), set()),
+        ('LeaderboardEntryModel.find_around (entry)', LeaderboardEntryModel.find_entry_query(quiz_id, 1), set()),
+        ('LeaderboardEntryModel.find_around (position)', around_position, set()),
+        ('LeaderboardEntryModel.find_around (above)', around_above, set()),
+        ('LeaderboardEntryModel.find_around (below)', around_below, set()),
+        ('LeaderboardEntryModel.set_user_fields',
+         LeaderboardEntryModel.set_user_fields_query(1, {'user_name': 'A'}), set()),
+        ('LeaderboardEntryModel.find_quiz_ids_by_user', LeaderboardEntryModel.find_quiz_ids_by_user_query(1), set()),
+        ('ReportJobModel.touch', ReportJobModel.touch_query(ids), set()),
+        ('ReportJobModel.fail_orphaned', ReportJobModel.fail_orphaned_query(now), set()),
+        ('SubmissionJobModel.count_pending', SubmissionJobModel.count_pending_query(), set()),
+        ('SubmissionJobModel.claim_batch (candidates)', SubmissionJobModel.claim_candidates_query(now, 3, 100), set()),
+        ('SubmissionJobModel.claim_batch (claim)',
+         SubmissionJobModel.claim_query(now, ids, ObjectId(), 'worker', 60), set()),
+        # A batch is at most RESULT_BATCH_SIZE jobs, sorting it in memory is free
+        ('SubmissionJobModel.claim_batch (batch)', SubmissionJobModel.find_batch_query(ObjectId()), {'SORT'}),
+        ('SubmissionJobModel.fail_abandoned', SubmissionJobModel.fail_abandoned_query(3), set()),
+    ]
+
+
+def _plan_stages(node, stages):
+    if isinstance(node, dict):
+        if 'stage' in node:
+            stages.add(node['stage'])
+        for value in node.values():
+            _plan_stages(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            _plan_stages(item, stages)
+
+
+def _winning_stages(explain, stages):
+    """Stages of every winning plan in an explain result, including ones nested in aggregation stages"""
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'winningPlan':
+                _plan_stages(value, stages)
+            elif key == 'stages' and isinstance(value, list):
+                for stage in value:
+                    if '$sort' in stage:
+                        stages.add('SORT')
+                    _winning_stages(stage, stages)
+            else:
+                _winning_stages(value, stages)
+    elif isinstance(explain, list):
+        for item in explain:
+            _winning_stages(item, stages)
+
+
+def verify_query_plans(mongo_db):
+    """Returns (description, bad stages) for every query shape whose plan scans or sorts in memory"""
+    problems = []
+    for description, command, allowed in query_shapes():
+        explain = mongo_db.command('explain', command, verbosity='queryPlanner')
+        stages = set()
+        _winning_stages(explain, stages)
+        bad = (stages & BAD_STAGES) - allowed
+        if bad:
+            problems.append((description, sorted(bad)))
+    return problems
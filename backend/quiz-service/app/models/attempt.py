@@ -0,0 +1,101 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument, UpdateOne
+
+from app.models import queries
+
+
+class AttemptModel:
+    """
+    Server-side quiz attempts. Answers are stored per question under
+    `answers.<question_id>` so partial saves never rewrite the whole attempt.
+    """
+
+    COLLECTION = 'attempts'
+    ACTIVE = 'ACTIVE'
+    SUBMITTING = 'SUBMITTING'
+    SUBMITTED = 'SUBMITTED'
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db[self.COLLECTION]
+
+    def create_attempt(self, quiz_id, user_id, duration_seconds):
+        now = datetime.utcnow()
+        attempt = {
+            '_id': ObjectId(),
+            'quiz_id': ObjectId(quiz_id),
+            'user_id': user_id,
+            'status': self.ACTIVE,
+            'duration_seconds': duration_seconds,
+            'started_at': now,
+            'deadline': now + timedelta(seconds=duration_seconds),
+            'answers': {},
+            'updated_at': now
+        }
+        self.collection.insert_one(attempt)
+        return attempt
+
+    def find_attempt_by_id(self, attempt_id):
+        return self.collection.find_one({'_id': ObjectId(attempt_id)})
+
+    @classmethod
+    def find_active_attempt_query(cls, quiz_id, user_id):
+        return {'find': cls.COLLECTION, 'filter': {
+            'quiz_id': ObjectId(quiz_id),
+            'user_id': user_id,
+            'status': cls.ACTIVE,
+            'deadline': {'$gt': datetime.utcnow()}
+        }}
+
+    def find_active_attempt(self, quiz_id, user_id):
+        """The user's unexpired attempt at a quiz, if any"""
+        return queries.find_one(self.collection, self.find_active_attempt_query(quiz_id, user_id))
+
+    def save_answers(self, answers_by_attempt):
+        """Write buffered answers of many attempts in one round trip: {attempt_id: {question_id: answer_ids}}"""
+        now = datetime.utcnow()
+        operations = []
+        for attempt_id, answers in answers_by_attempt.items():
+            update = {f"answers.{question_id}": answer_ids for question_id, answer_ids in answers.items()}
+            update['updated_at'] = now
+            operations.append(UpdateOne({'_id': ObjectId(attempt_id), 'status': self.ACTIVE}, {'$set': update}))
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def start_submission(self, attempt_id, user_id):
+        """Move an active attempt to SUBMITTING; None if it is not the user's or not active"""
+        return self.collection.find_one_and_update(
+            {'_id': ObjectId(attempt_id), 'user_id': user_id, 'status': self.ACTIVE},
+            {'$set': {'status': self.SUBMITTING, 'updated_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def finish_submission(self, attempt_id, answers, submission_id, time_spent_seconds):
+        self.collection.update_one(
+            {'_id': ObjectId(attempt_id)},
+            {'$set': {
+                'status': self.SUBMITTED,
+                'answers': answers,
+                'submission_id': submission_id,
+                'time_spent_seconds': time_spent_seconds,
+                'submitted_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow()
+            }}
+        )
+
+    @classmethod
+    def find_stale_submissions_query(cls, updated_before, limit=100):
+        return {'find': cls.COLLECTION, 'filter': {'status': cls.SUBMITTING, 'updated_at': {'$lt': updated_before}},
+                'projection': {'_id': 1}, 'limit': limit}
+
+    def find_stale_submissions(self, updated_before, limit=100):
+        """Attempts stuck in SUBMITTING since before `updated_before`"""
+        return list(queries.find(self.collection, self.find_stale_submissions_query(updated_before, limit)))
+
+    def abort_submission(self, attempt_id):
+        """Return an attempt to ACTIVE after its submission could not be queued"""
+        self.collection.update_one(
+            {'_id': ObjectId(attempt_id), 'status': self.SUBMITTING},
+            {'$set': {'status': self.ACTIVE, 'updated_at': datetime.utcnow()}}
+        )
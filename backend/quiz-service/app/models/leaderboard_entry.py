@@ -0,0 +1,177 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.models import queries
+from app.models.result import ResultModel
+
+
+class LeaderboardEntryModel:
+    """
+    Best attempt of every user on every quiz, one document per (quiz_id, user_id).
+    Kept up to date by the result pipeline so leaderboard reads never scan attempts.
+    """
+
+    COLLECTION = 'leaderboard_entries'
+    TOP_FIELDS = ['user_id', 'score', 'max_score', 'time_spent_seconds', 'submitted_at', 'user_name']
+    TOP_PROJECTION = {**{field: 1 for field in TOP_FIELDS}, '_id': 0}
+    DUPLICATE_KEY = 11000
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db[self.COLLECTION]
+        self.results = mongo_db[ResultModel.COLLECTION]
+
+    @classmethod
+    def upsert_best_query(cls, results):
+        return {'update': cls.COLLECTION, 'ordered': False, 'updates': [{
+            'q': {
+                'quiz_id': result['quiz_id'],
+                'user_id': result['user_id'],
+                '$or': [
+                    {'score': {'$lt': result['score']}},
+                    {'score': result['score'], 'time_spent_seconds': {'$gt': result['time_spent_seconds']}}
+                ]
+            },
+            'u': {'$set': {
+                'result_id': result['_id'],
+                'user_name': result.get('user_name'),
+                'score': result['score'],
+                'max_score': result['max_score'],
+                'time_spent_seconds': result['time_spent_seconds'],
+                'submitted_at': result['submitted_at']
+            }},
+            'upsert': True
+        } for result in results]}
+
+    def upsert_best(self, results):
+        """
+        Store each result as its user's entry unless the stored entry is at least as good.
+        A worse attempt matches nothing, so the upsert's insert hits the unique
+        (quiz_id, user_id) index and is ignored.
+        """
+        if not results:
+            return
+        try:
+            queries.bulk_update(self.collection, self.upsert_best_query(results))
+        except BulkWriteError as e:
+            errors = [error for error in e.details.get('writeErrors', []) if error['code'] != self.DUPLICATE_KEY]
+            if errors:
+                raise
+
+    @classmethod
+    def find_top_query(cls, quiz_id, limit=10):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)}, 'projection': cls.TOP_PROJECTION,
+                'sort': {'score': -1, 'time_spent_seconds': 1}, 'limit': limit}
+
+    def find_top(self, quiz_id, limit=10):
+        """Top entries of a quiz, answered entirely from the top-K index"""
+        entries = list(queries.find(self.collection, self.find_top_query(quiz_id, limit)))
+        for entry in entries:
+            entry['_id'] = entry['user_id']
+        return entries
+
+    @classmethod
+    def find_entry_query(cls, quiz_id, user_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id), 'user_id': user_id},
+                'projection': cls.TOP_PROJECTION}
+
+    @classmethod
+    def find_around_queries(cls, quiz_id, user_id, score, time_spent, radius=5):
+        """(position count, entries above, entries below) of the user's entry with `score` and `time_spent`"""
+        quiz_id = ObjectId(quiz_id)
+        ahead = {'quiz_id': quiz_id, '$or': [
+            {'score': {'$gt': score}},
+            {'score': score, 'time_spent_seconds': {'$lt': time_spent}}
+        ]}
+        behind = {'quiz_id': quiz_id, '$or': [
+            {'score': {'$lt': score}},
+            {'score': score, 'time_spent_seconds': {'$gte': time_spent}, 'user_id': {'$ne': user_id}}
+        ]}
+        return (
+            {'count': cls.COLLECTION, 'query': ahead},
+            {'find': cls.COLLECTION, 'filter': ahead, 'projection': cls.TOP_PROJECTION,
+             'sort': {'score': 1, 'time_spent_seconds': -1}, 'limit': radius},
+            {'find': cls.COLLECTION, 'filter': behind, 'projection': cls.TOP_PROJECTION,
+             'sort': {'score': -1, 'time_spent_seconds': 1}, 'limit': radius}
+        )
+
+    def find_around(self, quiz_id, user_id, radius=5):
+        """Entries just above and below a user's entry, with 1-based positions"""
+        entry = queries.find_one(self.collection, self.find_entry_query(quiz_id, user_id))
+        if not entry:
+            return []
+
+        position_query, above_query, below_query = self.find_around_queries(
+            quiz_id, user_id, entry['score'], entry['time_spent_seconds'], radius
+        )
+        position = queries.count(self.collection, position_query) + 1
+        above = list(queries.find(self.collection, above_query))[::-1]
+        below = list(queries.find(self.collection, below_query))
+
+        rows = above + [entry] + below
+        for offset, row in enumerate(rows):
+            row['_id'] = row['user_id']
+            row['position'] = position - len(above) + offset
+        return rows
+
+    @classmethod
+    def set_user_fields_query(cls, user_id, fields):
+        return {'update': cls.COLLECTION, 'updates': [{'q': {'user_id': user_id}, 'u': {'$set': fields}, 'multi': True}]}
+
+    def set_user_fields(self, user_id, fields):
+        """Copy changed profile fields onto every entry of a user"""
+        queries.update(self.collection, self.set_user_fields_query(user_id, fields))
+
+    @classmethod
+    def find_quiz_ids_by_user_query(cls, user_id):
+        return {'distinct': cls.COLLECTION, 'key': 'quiz_id', 'query': {'user_id': user_id}}
+
+    def find_quiz_ids_by_user(self, user_id):
+        """Ids of the quizzes a user has an entry on"""
+        return queries.distinct(self.collection, self.find_quiz_ids_by_user_query(user_id))
+
+    @classmethod
+    def backfill_query(cls, quiz_id=None):
+        pipeline = []
+        if quiz_id:
+            pipeline.append({'$match': {'quiz_id': ObjectId(quiz_id)}})
+        pipeline += [
+            {'$sort': {'quiz_id': 1, 'score': -1, 'time_spent_seconds': 1}},
+            {'$group': {
+                '_id': {'quiz_id': '$quiz_id', 'user_id': '$user_id'},
+                'result_id': {'$first': '$_id'},
+                'user_name': {'$first': '$user_name'},
+                'score': {'$first': '$score'},
+                'max_score': {'$first': '$max_score'},
+                'time_spent_seconds': {'$first': '$time_spent_seconds'},
+                'submitted_at': {'$first': '$submitted_at'}
+            }},
+            {'$project': {
+                '_id': 0,
+                'quiz_id': '$_id.quiz_id',
+                'user_id': '$_id.user_id',
+                'result_id': 1,
+                'user_name': 1,
+                'score': 1,
+                'max_score': 1,
+                'time_spent_seconds': 1,
+                'submitted_at': 1
+            }},
+            {'$merge': {
+                'into': cls.COLLECTION,
+                'on': ['quiz_id', 'user_id'],
+                'whenMatched': 'replace',
+                'whenNotMatched': 'insert'
+            }}
+        ]
+        return {'aggregate': ResultModel.COLLECTION, 'cursor': {}, 'pipeline': pipeline, 'allowDiskUse': True}
+
+    @classmethod
+    def count_entries_query(cls, quiz_id):
+        return {'count': cls.COLLECTION, 'query': {'quiz_id': ObjectId(quiz_id)}}
+
+    def backfill(self, quiz_id=None):
+        """Recompute entries from the results collection, entirely inside Mongo"""
+        queries.aggregate(self.results, self.backfill_query(quiz_id))
+        if quiz_id:
+            return queries.count(self.collection, self.count_entries_query(quiz_id))
+        return self.collection.estimated_document_count()
@@ -0,0 +1,26 @@
+from bson import ObjectId, Binary
+from datetime import datetime
+
+
+class PlayerViewModel:
+    """
+    Pre-rendered player responses for approved quizzes: the gzip-compressed
+    JSON body of GET /quizzes/<id> with answers' correct flags removed.
+    """
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db.quiz_player_views
+
+    def save_view(self, quiz_id, version, etag, body):
+        self.collection.replace_one(
+            {'_id': ObjectId(quiz_id)},
+            {'version': version, 'etag': etag, 'body': Binary(body), 'rendered_at': datetime.utcnow()},
+            upsert=True
+        )
+
+    def find_view(self, quiz_id, include_body=True):
+        projection = None if include_body else {'etag': 1, 'version': 1}
+        return self.collection.find_one({'_id': ObjectId(quiz_id)}, projection)
+
+    def delete_view(self, quiz_id):
+        self.collection.delete_one({'_id': ObjectId(quiz_id)})
@@ -0,0 +1,61 @@
+"""
+Runners for database commands built by the models.
+
+Every filtered query a model sends is built by one of its `*_query` class
+methods as the body of the matching Mongo command (find, aggregate, count,
+distinct, update, delete). The model runs it through these helpers and
+app.indexes explains the very same command, so the plan checker always sees
+exactly what the model sends.
+"""
+from pymongo import UpdateOne
+
+
+def find(collection, command):
+    cursor = collection.find(command.get('filter', {}), command.get('projection'))
+    if 'sort' in command:
+        cursor = cursor.sort(list(command['sort'].items()))
+    if 'limit' in command:
+        cursor = cursor.limit(command['limit'])
+    if 'batchSize' in command:
+        cursor = cursor.batch_size(command['batchSize'])
+    return cursor
+
+
+def find_one(collection, command):
+    sort = list(command['sort'].items()) if 'sort' in command else None
+    return collection.find_one(command.get('filter', {}), command.get('projection'), sort=sort)
+
+
+def aggregate(collection, command):
+    return collection.aggregate(command['pipeline'], allowDiskUse=command.get('allowDiskUse', False))
+
+
+def count(collection, command):
+    return collection.count_documents(command['query'])
+
+
+def distinct(collection, command):
+    return collection.distinct(command['key'], command.get('query'))
+
+
+def update(collection, command):
+    """Run a single-statement update command; returns the UpdateResult"""
+    statement, = command['updates']
+    method = collection.update_many if statement.get('multi') else collection.update_one
+    return method(statement['q'], statement['u'], upsert=statement.get('upsert', False))
+
+
+def bulk_update(collection, command):
+    """Run every statement of an update command in one bulk write; returns the BulkWriteResult"""
+    return collection.bulk_write(
+        [UpdateOne(statement['q'], statement['u'], upsert=statement.get('upsert', False))
+         for statement in command['updates']],
+        ordered=command.get('ordered', True)
+    )
+
+
+def delete(collection, command):
+    """Run a single-statement delete command; returns the DeleteResult"""
+    statement, = command['deletes']
+    method = collection.delete_many if statement['limit'] == 0 else collection.delete_one
+    return method(statement['q'])
@@ -0,0 +1,54 @@
+from bson import ObjectId
+from datetime import datetime
+
+from app.models import queries
+
+
+class QuestionStatsModel:
+    """
+    Running per-question sums of each quiz version's results, one document per
+    (quiz_id, version); see app.utils.question_stats for the fields
+    """
+
+    COLLECTION = 'question_stats'
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db[self.COLLECTION]
+
+    @classmethod
+    def record_query(cls, increments_by_version):
+        now = datetime.utcnow()
+        return {'update': cls.COLLECTION, 'ordered': False, 'updates': [
+            {
+                'q': {'quiz_id': ObjectId(quiz_id), 'version': version},
+                'u': {'$inc': increments, '$set': {'updated_at': now}},
+                'upsert': True
+            }
+            for (quiz_id, version), increments in increments_by_version.items()
+        ]}
+
+    def record(self, increments_by_version):
+        """Fold {(quiz_id, version): increments} into the stored sums with one bulk write"""
+        if increments_by_version:
+            queries.bulk_update(self.collection, self.record_query(increments_by_version))
+
+    @classmethod
+    def find_stats_query(cls, quiz_id, version):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id), 'version': version}}
+
+    def find_stats(self, quiz_id, version):
+        return queries.find_one(self.collection, self.find_stats_query(quiz_id, version))
+
+    @classmethod
+    def find_versions_query(cls, quiz_id):
+        return {'distinct': cls.COLLECTION, 'key': 'version', 'query': {'quiz_id': ObjectId(quiz_id)}}
+
+    def find_versions(self, quiz_id):
+        return sorted(queries.distinct(self.collection, self.find_versions_query(quiz_id)))
+
+    @classmethod
+    def delete_stats_query(cls, quiz_id):
+        return {'delete': cls.COLLECTION, 'deletes': [{'q': {'quiz_id': ObjectId(quiz_id)}, 'limit': 0}]}
+
+    def delete_stats(self, quiz_id):
+        queries.delete(self.collection, self.delete_stats_query(quiz_id))
@@ -1,64 +1,229 @@
 from bson import ObjectId
 from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from app.models import queries
 
 
 class QuizModel:
     """MongoDB model for Quiz collection"""
 
-    def __init__(self, mongo_db):
-        self.collection = mongo_db.quizzes
+    COLLECTION = 'quizzes'
+    STATUSES = ['PENDING', 'APPROVED', 'REJECTED']
+    SUMMARY_FIELDS = ['title', 'author_id', 'author_email', 'status', 'question_count', 'total_points', 'created_at']
 
-    def create_quiz(self, quiz_data):
-        """Create a new quiz"""
-        quiz_data['created_at'] = datetime.utcnow()
-        quiz_data['updated_at'] = datetime.utcnow()
+    def __init__(self, mongo_db, cache=None):
+        self.collection = mongo_db[self.COLLECTION]
+        self.cache = cache
+
+    @staticmethod
+    def summarize_questions(questions):
+        """Listing fields derived from the questions, stored so listings never load them"""
+        return {
+            'question_count': len(questions),
+            'total_points': sum(question.get('points', 0) for question in questions)
+        }
+
+    def _prepare_new_quiz(self, quiz_data, now):
+        quiz_data.update(self.summarize_questions(quiz_data.get('questions', [])))
+        quiz_data['created_at'] = now
+        quiz_data['updated_at'] = now
         quiz_data['status'] = 'PENDING'
-        result = self.collection.insert_one(quiz_data)
-        return str(result.inserted_id)
+        quiz_data['version'] = 1
+
+    def create_quiz(self, quiz_data):
+        """Create a new quiz and return it as stored"""
+        self._prepare_new_quiz(quiz_data, datetime.utcnow())
+        self.collection.insert_one(quiz_data)
+        return quiz_data
+
+    def create_quizzes(self, quizzes_data):
+        """
+        Insert many new quizzes in one unordered round trip.
+        Returns the indexes of the ones that failed, mapped to their error message.
+        """
+        now = datetime.utcnow()
+        for quiz_data in quizzes_data:
+            quiz_data.setdefault('_id', ObjectId())
+            self._prepare_new_quiz(quiz_data, now)
+
+        failed = {}
+        try:
+            self.collection.insert_many(quizzes_data, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index']: error.get('errmsg', 'Insert failed') for error in e.details.get('writeErrors', [])}
+        return failed
 
     def find_quiz_by_id(self, quiz_id):
         """Find quiz by ID"""
+        if self.cache:
+            return self.cache.get(quiz_id, lambda: self.collection.find_one({'_id': ObjectId(quiz_id)}))
         return self.collection.find_one({'_id': ObjectId(quiz_id)})
 
+    def find_quiz_stamp(self, quiz_id):
+        """Find only the fields that identify the current revision of a quiz"""
+        return self.collection.find_one({'_id': ObjectId(quiz_id)}, {'updated_at': 1, 'version': 1})
+
+    def find_quiz_stamps(self, quiz_ids):
+        """Find revision stamps for several quizzes at once, keyed by quiz id string"""
+        cursor = self.collection.find(
+            {'_id': {'$in': [ObjectId(quiz_id) for quiz_id in quiz_ids]}},
+            {'updated_at': 1, 'version': 1}
+        )
+        return {str(stamp['_id']): stamp for stamp in cursor}
+
+    @staticmethod
+    def quiz_filter(quiz_ids=None, status=None, author_id=None):
+        """Filter of the quizzes listing and bulk report endpoints; ids take precedence over the other fields"""
+        if quiz_ids:
+            return {'_id': {'$in': [ObjectId(quiz_id) for quiz_id in quiz_ids]}}
+
+        filter_dict = {}
+        if status:
+            filter_dict['status'] = status
+        if author_id is not None:
+            filter_dict['author_id'] = author_id
+        return filter_dict
+
+    @classmethod
+    def find_quiz_titles_query(cls, filter_dict, limit):
+        return {'find': cls.COLLECTION, 'filter': filter_dict, 'projection': {'title': 1, 'version': 1},
+                'sort': {'_id': 1}, 'limit': limit}
+
+    def find_quiz_titles(self, filter_dict, limit):
+        """Id, title and version of matching quizzes, oldest first"""
+        return list(queries.find(self.collection, self.find_quiz_titles_query(filter_dict, limit)))
+
+    @classmethod
+    def find_all_quizzes_query(cls, filter_dict=None):
+        return {'find': cls.COLLECTION, 'filter': filter_dict or {}}
+
     def find_all_quizzes(self, filter_dict=None):
         """Find all quizzes with optional filter"""
-        if filter_dict is None:
-            filter_dict = {}
-        return list(self.collection.find(filter_dict))
+        return list(queries.find(self.collection, self.find_all_quizzes_query(filter_dict)))
+
+    @classmethod
+    def iter_quizzes_query(cls, filter_dict=None, batch_size=100):
+        return {'find': cls.COLLECTION, 'filter': filter_dict or {}, 'sort': {'_id': 1}, 'batchSize': batch_size}
+
+    def iter_quizzes(self, filter_dict=None, batch_size=100):
+        """Stream quizzes in insertion order without holding them all in memory"""
+        return queries.find(self.collection, self.iter_quizzes_query(filter_dict, batch_size))
+
+    @classmethod
+    def find_quiz_summaries_query(cls, statuses, limit=20, after=None):
+        filter_dict = {'status': statuses[0] if len(statuses) == 1 else {'$in': statuses}}
+        if after:
+            created_at, quiz_id = after
+            filter_dict['$or'] = [
+                {'created_at': {'$lt': created_at}},
+                {'created_at': created_at, '_id': {'$lt': quiz_id}}
+            ]
+        return {'find': cls.COLLECTION, 'filter': filter_dict,
+                'projection': {field: 1 for field in cls.SUMMARY_FIELDS},
+                'sort': {'created_at': -1, '_id': -1}, 'limit': limit}
+
+    def find_quiz_summaries(self, statuses, limit=20, after=None):
+        """
+        One page of quiz summaries, newest first, without questions.
+        `after` is the (created_at, _id) of the last quiz on the previous page.
+        """
+        return list(queries.find(self.collection, self.find_quiz_summaries_query(statuses, limit, after)))
 
-    def update_quiz(self, quiz_id, update_data):
-        """Update quiz"""
+    @classmethod
+    def search_quiz_summaries_query(cls, text, statuses, author_id=None, limit=20, after=None):
+        match = {'$text': {'$search': text}, 'status': statuses[0] if len(statuses) == 1 else {'$in': statuses}}
+        if author_id is not None:
+            match['author_id'] = author_id
+
+        pipeline = [
+            {'$match': match},
+            {'$project': {**{field: 1 for field in cls.SUMMARY_FIELDS}, 'relevance': {'$meta': 'textScore'}}}
+        ]
+        if after:
+            relevance, quiz_id = after
+            pipeline.append({'$match': {'$or': [
+                {'relevance': {'$lt': relevance}},
+                {'relevance': relevance, '_id': {'$lt': quiz_id}}
+            ]}})
+        pipeline += [
+            {'$sort': {'relevance': -1, '_id': -1}},
+            {'$limit': limit}
+        ]
+        return {'aggregate': cls.COLLECTION, 'cursor': {}, 'pipeline': pipeline}
+
+    def search_quiz_summaries(self, text, statuses, author_id=None, limit=20, after=None):
+        """
+        One page of quiz summaries matching a text query, most relevant first.
+        `after` is the (relevance, _id) of the last quiz on the previous page.
+        """
+        command = self.search_quiz_summaries_query(text, statuses, author_id, limit, after)
+        return list(queries.aggregate(self.collection, command))
+
+    @classmethod
+    def backfill_summaries_query(cls):
+        return {'update': cls.COLLECTION, 'updates': [{
+            'q': {'question_count': {'$exists': False}},
+            'u': [{'$set': {
+                'question_count': {'$size': {'$ifNull': ['$questions', []]}},
+                'total_points': {'$sum': '$questions.points'}
+            }}],
+            'multi': True
+        }]}
+
+    def backfill_summaries(self):
+        """Compute summary fields for quizzes stored before they existed"""
+        return queries.update(self.collection, self.backfill_summaries_query()).modified_count
+
+    def update_quiz(self, quiz_id, update_data, expected_status=None):
+        """
+        Update a quiz in one round trip and return it as updated.
+        With `expected_status` the write only happens while the quiz is in that status;
+        None is returned when the quiz does not exist or is in another status.
+        """
+        if 'questions' in update_data:
+            update_data.update(self.summarize_questions(update_data['questions']))
         update_data['updated_at'] = datetime.utcnow()
-        result = self.collection.update_one(
-            {'_id': ObjectId(quiz_id)},
-            {'$set': update_data}
+
+        filter_dict = {'_id': ObjectId(quiz_id)}
+        if expected_status:
+            filter_dict['status'] = expected_status
+
+        quiz = self.collection.find_one_and_update(
+            filter_dict,
+            {'$set': update_data, '$inc': {'version': 1}},
+            return_document=ReturnDocument.AFTER
         )
-        return result.modified_count > 0
+        if quiz and self.cache:
+            self.cache.invalidate(quiz_id, quiz['version'])
+            self.cache.prime(quiz)
+        return quiz
 
     def delete_quiz(self, quiz_id):
-        """Delete quiz"""
-        result = self.collection.delete_one({'_id': ObjectId(quiz_id)})
-        return result.deleted_count > 0
+        """Delete a quiz and return the deleted document, or None if it did not exist"""
+        quiz = self.collection.find_one_and_delete({'_id': ObjectId(quiz_id)})
+        if self.cache:
+            self.cache.invalidate(quiz_id)
+        return quiz
 
     def approve_quiz(self, quiz_id, admin_id, notes=None):
-        """Approve a quiz"""
+        """Approve a pending quiz"""
         update_data = {
             'status': 'APPROVED',
             'approved_by_admin_id': admin_id,
-            'approval_notes': notes,
-            'updated_at': datetime.utcnow()
+            'approval_notes': notes
         }
-        return self.update_quiz(quiz_id, update_data)
+        return self.update_quiz(quiz_id, update_data, expected_status='PENDING')
 
     def reject_quiz(self, quiz_id, admin_id, reason):
-        """Reject a quiz"""
+        """Reject a pending quiz"""
         update_data = {
             'status': 'REJECTED',
             'rejected_by_admin_id': admin_id,
-            'rejection_reason': reason,
-            'updated_at': datetime.utcnow()
+            'rejection_reason': reason
         }
-        return self.update_quiz(quiz_id, update_data)
+        return self.update_quiz(quiz_id, update_data, expected_status='PENDING')
 
     def get_pending_quizzes(self):
         """Get all pending quizzes"""
@@ -0,0 +1,49 @@
+from bson import Binary, ObjectId
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+import bson
+import zlib
+
+from app.models import queries
+
+
+class QuizVersionModel:
+    """
+    Immutable snapshots of approved quiz revisions, one per (quiz_id, version).
+    Questions are stored zlib-compressed since snapshots are written once and rarely read.
+    """
+
+    COLLECTION = 'quiz_versions'
+    SNAPSHOT_FIELDS = ['title', 'description', 'duration_seconds', 'author_id', 'question_count', 'total_points']
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db[self.COLLECTION]
+
+    def create_snapshot(self, quiz):
+        """Store a quiz's current revision; a snapshot that already exists is left untouched"""
+        snapshot = {field: quiz[field] for field in self.SNAPSHOT_FIELDS if field in quiz}
+        snapshot.update({
+            'quiz_id': quiz['_id'],
+            'version': quiz.get('version', 0),
+            'questions_z': Binary(zlib.compress(bson.encode({'questions': quiz.get('questions', [])}))),
+            'created_at': datetime.utcnow()
+        })
+        try:
+            self.collection.insert_one(snapshot)
+        except DuplicateKeyError:
+            pass
+
+    @classmethod
+    def find_version_query(cls, quiz_id, version):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id), 'version': version}}
+
+    def find_version(self, quiz_id, version):
+        """A snapshot shaped like a quiz document (questions decompressed), or None"""
+        snapshot = queries.find_one(self.collection, self.find_version_query(quiz_id, version))
+        if not snapshot:
+            return None
+
+        questions = bson.decode(zlib.decompress(snapshot.pop('questions_z')))['questions']
+        snapshot['questions'] = questions
+        snapshot['_id'] = snapshot.pop('quiz_id')
+        return snapshot
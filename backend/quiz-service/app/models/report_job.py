@@ -0,0 +1,86 @@
+from bson import ObjectId
+from datetime import datetime
+
+from app.models import queries
+
+
+class ReportJobModel:
+    """
+    Quiz PDF reports requested by admins and rendered in the report process pool.
+    The process running a job refreshes its heartbeat_at; unfinished jobs whose
+    heartbeat stops (the process died or restarted) are failed by fail_orphaned.
+    """
+
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    COLLECTION = 'report_jobs'
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db[self.COLLECTION]
+
+    def create_job(self, quiz_id, requested_by, artifact_key):
+        job = {
+            '_id': ObjectId(),
+            'quiz_id': ObjectId(quiz_id),
+            'requested_by': requested_by,
+            'artifact_key': artifact_key,
+            'status': self.PENDING,
+            'created_at': datetime.utcnow(),
+            'heartbeat_at': datetime.utcnow()
+        }
+        self.collection.insert_one(job)
+        return job
+
+    def find_job_by_id(self, job_id):
+        return self.collection.find_one({'_id': ObjectId(job_id)})
+
+    def mark_running(self, job_id):
+        self.collection.update_one(
+            {'_id': ObjectId(job_id)},
+            {'$set': {'status': self.RUNNING, 'started_at': datetime.utcnow()}}
+        )
+
+    def mark_done(self, job_id, rendered, size):
+        """`rendered` is False when the PDF came from the artifact store"""
+        self.collection.update_one(
+            {'_id': ObjectId(job_id)},
+            {'$set': {'status': self.DONE, 'rendered': rendered, 'size': size, 'finished_at': datetime.utcnow()}}
+        )
+
+    @classmethod
+    def touch_query(cls, job_ids):
+        return {'update': cls.COLLECTION, 'updates': [{
+            'q': {'_id': {'$in': [ObjectId(job_id) for job_id in job_ids]}, 'status': {'$in': [cls.PENDING, cls.RUNNING]}},
+            'u': {'$set': {'heartbeat_at': datetime.utcnow()}},
+            'multi': True
+        }]}
+
+    def touch(self, job_ids):
+        """Refresh the heartbeat of unfinished jobs this process is still running"""
+        if job_ids:
+            queries.update(self.collection, self.touch_query(job_ids))
+
+    @classmethod
+    def fail_orphaned_query(cls, stale_before):
+        return {'update': cls.COLLECTION, 'updates': [{
+            'q': {'status': {'$in': [cls.PENDING, cls.RUNNING]}, 'heartbeat_at': {'$not': {'$gte': stale_before}}},
+            'u': {'$set': {
+                'status': cls.FAILED,
+                'error': 'Report worker stopped before finishing, request the report again',
+                'finished_at': datetime.utcnow()
+            }},
+            'multi': True
+        }]}
+
+    def fail_orphaned(self, stale_before):
+        """Fail unfinished jobs whose heartbeat stopped before `stale_before`; returns how many"""
+        return queries.update(self.collection, self.fail_orphaned_query(stale_before)).modified_count
+
+    def mark_failed(self, job_id, error):
+        """Fail a job unless it already finished"""
+        self.collection.update_one(
+            {'_id': ObjectId(job_id), 'status': {'$in': [self.PENDING, self.RUNNING]}},
+            {'$set': {'status': self.FAILED, 'error': error, 'finished_at': datetime.utcnow()}}
+        )
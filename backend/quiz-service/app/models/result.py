@@ -1,33 +1,197 @@
 from bson import ObjectId
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.models import queries
 
 
 class ResultModel:
 
+    COLLECTION = 'results'
+    RANK_SORT = {'score': -1, 'time_spent_seconds': 1}
+    RANK_FIELDS = {'user_id': 1, 'user_name': 1, 'score': 1, 'max_score': 1, 'time_spent_seconds': 1, 'submitted_at': 1}
+
     def __init__(self, mongo_db):
-        self.collection = mongo_db.results
+        self.collection = mongo_db[self.COLLECTION]
 
     def create_result(self, result_data):
         result_data['submitted_at'] = datetime.utcnow()
         result = self.collection.insert_one(result_data)
         return str(result.inserted_id)
 
+    def create_results(self, results_data):
+        """
+        Insert many results in one unordered round trip.
+        Returns the ids of the results, the indexes of the ones that failed and the
+        indexes of the ones whose _id was already stored.
+        """
+        submitted_at = datetime.utcnow()
+        for result_data in results_data:
+            result_data.setdefault('_id', ObjectId())
+            result_data.setdefault('submitted_at', submitted_at)
+
+        failed, existing = set(), set()
+        try:
+            self.collection.insert_many(results_data, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                (existing if error.get('code') == 11000 else failed).add(error['index'])
+
+        return [str(result_data['_id']) for result_data in results_data], failed, existing
+
     def find_result_by_id(self, result_id):
         return self.collection.find_one({'_id': ObjectId(result_id)})
 
+    @classmethod
+    def find_results_by_quiz_query(cls, quiz_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)}, 'sort': cls.RANK_SORT}
+
     def find_results_by_quiz(self, quiz_id):
-        return list(self.collection.find({'quiz_id': ObjectId(quiz_id)}).sort([('score', -1), ('time_spent_seconds', 1)]))
+        return list(queries.find(self.collection, self.find_results_by_quiz_query(quiz_id)))
+
+    @classmethod
+    def find_latest_submission_time_query(cls, quiz_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': {'_id': 0, 'submitted_at': 1}, 'sort': {'submitted_at': -1}, 'limit': 1}
+
+    def find_latest_submission_time(self, quiz_id):
+        """When the quiz's most recent result was stored, or None if it has none"""
+        latest = queries.find_one(self.collection, self.find_latest_submission_time_query(quiz_id))
+        return latest['submitted_at'] if latest else None
+
+    @classmethod
+    def find_latest_submission_times_query(cls, quiz_ids):
+        return {'aggregate': cls.COLLECTION, 'cursor': {}, 'pipeline': [
+            {'$match': {'quiz_id': {'$in': [ObjectId(quiz_id) for quiz_id in quiz_ids]}}},
+            {'$sort': {'quiz_id': 1, 'submitted_at': -1}},
+            {'$group': {'_id': '$quiz_id', 'submitted_at': {'$first': '$submitted_at'}}}
+        ]}
+
+    def find_latest_submission_times(self, quiz_ids):
+        """Map of quiz id -> when its most recent result was stored, for quizzes that have results"""
+        rows = queries.aggregate(self.collection, self.find_latest_submission_times_query(quiz_ids))
+        return {str(row['_id']): row['submitted_at'] for row in rows}
+
+    @classmethod
+    def find_top_results_query(cls, quiz_id, limit):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': cls.RANK_FIELDS, 'sort': cls.RANK_SORT, 'limit': limit}
+
+    def find_top_results(self, quiz_id, limit):
+        """The quiz's best `limit` results, with only the fields a report prints"""
+        return list(queries.find(self.collection, self.find_top_results_query(quiz_id, limit)))
+
+    @classmethod
+    def get_quiz_statistics_query(cls, quiz_id):
+        return {'aggregate': cls.COLLECTION, 'cursor': {}, 'pipeline': [
+            {'$match': {'quiz_id': ObjectId(quiz_id)}},
+            {'$project': {'_id': 0, 'user_id': 1, 'score': 1, 'max_score': 1, 'time_spent_seconds': 1}},
+            {'$facet': {
+                'scores': [{'$group': {
+                    '_id': None,
+                    'total': {'$sum': 1},
+                    'average_score': {'$avg': '$score'},
+                    'highest_score': {'$max': '$score'},
+                    'lowest_score': {'$min': '$score'},
+                    'max_score': {'$max': '$max_score'},
+                    'average_time_seconds': {'$avg': '$time_spent_seconds'}
+                }}],
+                'participants': [{'$group': {'_id': '$user_id'}}, {'$count': 'count'}]
+            }}
+        ]}
+
+    def get_quiz_statistics(self, quiz_id):
+        """Totals and score statistics of a quiz's results in one aggregation"""
+        facets = next(queries.aggregate(self.collection, self.get_quiz_statistics_query(quiz_id)))
+        if not facets['scores']:
+            return None
+
+        statistics = facets['scores'][0]
+        statistics.pop('_id')
+        statistics['participants'] = facets['participants'][0]['count'] if facets['participants'] else 0
+        return statistics
+
+    @classmethod
+    def count_results_by_quiz_query(cls, quiz_id):
+        return {'count': cls.COLLECTION, 'query': {'quiz_id': ObjectId(quiz_id)}}
+
+    def count_results_by_quiz(self, quiz_id):
+        return queries.count(self.collection, self.count_results_by_quiz_query(quiz_id))
+
+    @classmethod
+    def iter_rank_rows_query(cls, quiz_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': cls.RANK_FIELDS, 'batchSize': 1000}
+
+    def iter_rank_rows(self, quiz_id):
+        """Stream the fields needed to rank a quiz's results"""
+        return queries.find(self.collection, self.iter_rank_rows_query(quiz_id))
+
+    @classmethod
+    def iter_question_rows_query(cls, quiz_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': {'_id': 0, 'quiz_id': 1, 'quiz_version': 1, 'score': 1,
+                               'submitted_answers.question_id': 1, 'submitted_answers.correct': 1,
+                               'submitted_answers.points_earned': 1, 'submitted_answers.submitted_answer_ids': 1},
+                'batchSize': 5000}
+
+    def iter_question_rows(self, quiz_id):
+        """Stream the fields per-question statistics are computed from"""
+        return queries.find(self.collection, self.iter_question_rows_query(quiz_id))
+
+    @classmethod
+    def iter_score_rows_query(cls, quiz_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': {'_id': 0, 'score': 1, 'max_score': 1}, 'batchSize': 5000}
+
+    def iter_score_rows(self, quiz_id):
+        """Stream just the scores of a quiz's results"""
+        return queries.find(self.collection, self.iter_score_rows_query(quiz_id))
+
+    @classmethod
+    def iter_export_rows_query(cls, quiz_id, batch_size=5000):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': {**cls.RANK_FIELDS, 'quiz_version': 1, 'ranked_position': 1,
+                               'submitted_answers.question_id': 1, 'submitted_answers.correct': 1},
+                'sort': {'submitted_at': 1}, 'batchSize': batch_size}
+
+    def iter_export_rows(self, quiz_id, batch_size=5000):
+        """Stream a quiz's results in submission order with the fields a row export writes"""
+        return queries.find(self.collection, self.iter_export_rows_query(quiz_id, batch_size))
+
+    @classmethod
+    def find_results_by_user_query(cls, user_id):
+        return {'find': cls.COLLECTION, 'filter': {'user_id': user_id}, 'sort': {'submitted_at': -1}}
 
     def find_results_by_user(self, user_id):
-        return list(self.collection.find({'user_id': user_id}).sort('submitted_at', -1))
+        return list(queries.find(self.collection, self.find_results_by_user_query(user_id)))
 
-    def get_leaderboard(self, quiz_id, limit=10):
-        pipeline = [
+    @classmethod
+    def find_quiz_ids_query(cls):
+        return {'distinct': cls.COLLECTION, 'key': 'quiz_id', 'query': {}}
+
+    def find_quiz_ids(self):
+        """Ids of every quiz that has results"""
+        return queries.distinct(self.collection, self.find_quiz_ids_query())
+
+    @classmethod
+    def set_user_fields_query(cls, user_id, fields):
+        return {'update': cls.COLLECTION, 'updates': [{'q': {'user_id': user_id}, 'u': {'$set': fields}, 'multi': True}]}
+
+    def set_user_fields(self, user_id, fields):
+        """Copy changed profile fields onto every result of a user"""
+        queries.update(self.collection, self.set_user_fields_query(user_id, fields))
+
+    @classmethod
+    def get_leaderboard_query(cls, quiz_id, limit=10):
+        return {'aggregate': cls.COLLECTION, 'cursor': {}, 'pipeline': [
             {'$match': {'quiz_id': ObjectId(quiz_id)}},
             {'$sort': {'score': -1, 'time_spent_seconds': 1}},
             {'$group': {
                 '_id': '$user_id',
                 'user_id': {'$first': '$user_id'},
+                'user_name': {'$first': '$user_name'},
                 'score': {'$first': '$score'},
                 'max_score': {'$first': '$max_score'},
                 'time_spent_seconds': {'$first': '$time_spent_seconds'},
@@ -35,8 +199,10 @@ class ResultModel:
             }},
             {'$sort': {'score': -1, 'time_spent_seconds': 1}},
             {'$limit': limit}
-        ]
-        return list(self.collection.aggregate(pipeline))
+        ]}
+
+    def get_leaderboard(self, quiz_id, limit=10):
+        return list(queries.aggregate(self.collection, self.get_leaderboard_query(quiz_id, limit)))
 
     def update_result_rank(self, result_id, rank):
         result = self.collection.update_one(
@@ -45,12 +211,46 @@ class ResultModel:
         )
         return result.modified_count > 0
 
-    def calculate_user_rank(self, quiz_id, score, time_spent):
-        better_results = self.collection.count_documents({
+    def update_result_ranks(self, ranks):
+        """Write many (result_id, rank) pairs in one unordered bulk write"""
+        if not ranks:
+            return 0
+        result = self.collection.bulk_write(
+            [UpdateOne({'_id': result_id}, {'$set': {'ranked_position': rank}}) for result_id, rank in ranks],
+            ordered=False
+        )
+        return result.modified_count
+
+    @classmethod
+    def iter_ranked_rows_query(cls, quiz_id):
+        return {'find': cls.COLLECTION, 'filter': {'quiz_id': ObjectId(quiz_id)},
+                'projection': {'score': 1, 'time_spent_seconds': 1, 'ranked_position': 1},
+                'sort': cls.RANK_SORT, 'batchSize': 1000}
+
+    def iter_ranked_rows(self, quiz_id):
+        """Stream a quiz's results in rank order, straight off the (quiz_id, score, time) index"""
+        return queries.find(self.collection, self.iter_ranked_rows_query(quiz_id))
+
+    @classmethod
+    def find_quizzes_with_results_between_query(cls, since, until):
+        submitted_at = {'$lte': until}
+        if since:
+            submitted_at['$gt'] = since
+        return {'distinct': cls.COLLECTION, 'key': 'quiz_id', 'query': {'submitted_at': submitted_at}}
+
+    def find_quizzes_with_results_between(self, since, until):
+        """Ids of quizzes that received results in the (since, until] window"""
+        return queries.distinct(self.collection, self.find_quizzes_with_results_between_query(since, until))
+
+    @classmethod
+    def calculate_user_rank_query(cls, quiz_id, score, time_spent):
+        return {'count': cls.COLLECTION, 'query': {
             'quiz_id': ObjectId(quiz_id),
             '$or': [
                 {'score': {'$gt': score}},
                 {'score': score, 'time_spent_seconds': {'$lt': time_spent}}
             ]
-        })
-        return better_results + 1
+        }}
+
+    def calculate_user_rank(self, quiz_id, score, time_spent):
+        return queries.count(self.collection, self.calculate_user_rank_query(quiz_id, score, time_spent)) + 1
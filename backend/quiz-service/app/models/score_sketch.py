@@ -0,0 +1,47 @@
+from bson import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+
+
+class ScoreSketchModel:
+    """
+    One fixed-bin score histogram per quiz (see app.utils.score_sketch),
+    updated as results are stored
+    """
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db.score_sketches
+
+    def record(self, updates_by_quiz):
+        """Add {quiz_id: (inc, minimum, maximum)} batches to the stored sketches with one bulk write"""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'_id': ObjectId(quiz_id)},
+                {'$inc': inc, '$min': {'min': minimum}, '$max': {'max': maximum}, '$set': {'updated_at': now}},
+                upsert=True
+            )
+            for quiz_id, (inc, minimum, maximum) in updates_by_quiz.items()
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def replace_sketch(self, quiz_id, update):
+        """Overwrite a quiz's sketch with a rebuilt one; None removes it"""
+        if update is None:
+            self.collection.delete_one({'_id': ObjectId(quiz_id)})
+            return
+
+        inc, minimum, maximum = update
+        sketch = {'count': inc['count'], 'sum': inc['sum'], 'sum_sq': inc['sum_sq'],
+                  'min': minimum, 'max': maximum, 'updated_at': datetime.utcnow(),
+                  'bins': {field.split('.', 1)[1]: count for field, count in inc.items() if field.startswith('bins.')}}
+        self.collection.replace_one({'_id': ObjectId(quiz_id)}, sketch, upsert=True)
+
+    def find_sketch(self, quiz_id):
+        return self.collection.find_one({'_id': ObjectId(quiz_id)})
+
+    def find_sketches(self, quiz_ids):
+        """Map of quiz id -> sketch document for many quizzes in one query"""
+        return {str(sketch['_id']): sketch
+                for sketch in self.collection.find({'_id': {'$in': [ObjectId(quiz_id) for quiz_id in quiz_ids]}})}
@@ -0,0 +1,119 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+from app.models import queries
+
+
+class SubmissionJobModel:
+    """MongoDB-backed durable queue of quiz submissions waiting to be scored"""
+
+    PENDING = 'PENDING'
+    PROCESSING = 'PROCESSING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    COLLECTION = 'submission_jobs'
+
+    def __init__(self, mongo_db):
+        self.collection = mongo_db[self.COLLECTION]
+
+    def enqueue(self, job_data):
+        """Add a submission to the queue"""
+        job_data['status'] = self.PENDING
+        job_data['attempts'] = 0
+        job_data['enqueued_at'] = datetime.utcnow()
+        result = self.collection.insert_one(job_data)
+        return str(result.inserted_id)
+
+    def find_job_by_id(self, job_id):
+        return self.collection.find_one({'_id': ObjectId(job_id)})
+
+    @classmethod
+    def count_pending_query(cls):
+        return {'count': cls.COLLECTION, 'query': {'status': cls.PENDING}}
+
+    def count_pending(self):
+        return queries.count(self.collection, self.count_pending_query())
+
+    @classmethod
+    def _claimable(cls, now):
+        return [
+            {'status': cls.PENDING},
+            {'status': cls.PROCESSING, 'lease_expires_at': {'$lt': now}}
+        ]
+
+    @classmethod
+    def claim_candidates_query(cls, now, max_attempts, limit):
+        return {'find': cls.COLLECTION, 'filter': {'attempts': {'$lt': max_attempts}, '$or': cls._claimable(now)},
+                'projection': {'_id': 1}, 'sort': {'enqueued_at': 1}, 'limit': limit}
+
+    @classmethod
+    def claim_query(cls, now, candidate_ids, batch_id, worker_id, lease_seconds):
+        return {'update': cls.COLLECTION, 'updates': [{
+            'q': {'_id': {'$in': candidate_ids}, '$or': cls._claimable(now)},
+            'u': {
+                '$set': {
+                    'status': cls.PROCESSING,
+                    'worker_id': worker_id,
+                    'batch_id': batch_id,
+                    'started_at': now,
+                    'lease_expires_at': now + timedelta(seconds=lease_seconds)
+                },
+                '$inc': {'attempts': 1}
+            },
+            'multi': True
+        }]}
+
+    @classmethod
+    def find_batch_query(cls, batch_id):
+        return {'find': cls.COLLECTION, 'filter': {'batch_id': batch_id}, 'sort': {'enqueued_at': 1}}
+
+    def claim_batch(self, worker_id, lease_seconds, max_attempts, limit):
+        """
+        Take up to `limit` of the oldest claimable jobs in three round trips,
+        however many jobs are claimed
+        """
+        now = datetime.utcnow()
+        candidate_ids = [job['_id'] for job in
+                         queries.find(self.collection, self.claim_candidates_query(now, max_attempts, limit))]
+
+        if not candidate_ids:
+            return []
+
+        batch_id = ObjectId()
+        queries.update(self.collection, self.claim_query(now, candidate_ids, batch_id, worker_id, lease_seconds))
+        return list(queries.find(self.collection, self.find_batch_query(batch_id)))
+
+    def finish_batch(self, outcomes):
+        """Record the outcome of every job in a batch with one bulk write"""
+        now = datetime.utcnow()
+        operations = []
+        for job_id, result_id, error in outcomes:
+            if error is None:
+                update = {'status': self.DONE, 'result_id': result_id, 'finished_at': now}
+            else:
+                update = {'status': self.FAILED, 'error': error, 'finished_at': now}
+            operations.append(UpdateOne({'_id': ObjectId(job_id)}, {'$set': update}))
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    @classmethod
+    def fail_abandoned_query(cls, max_attempts):
+        return {'update': cls.COLLECTION, 'updates': [{
+            'q': {
+                'status': cls.PROCESSING,
+                'attempts': {'$gte': max_attempts},
+                'lease_expires_at': {'$lt': datetime.utcnow()}
+            },
+            'u': {'$set': {
+                'status': cls.FAILED,
+                'error': 'Worker did not finish the job',
+                'finished_at': datetime.utcnow()
+            }},
+            'multi': True
+        }]}
+
+    def fail_abandoned(self, max_attempts):
+        """Give up on jobs whose lease expired after the last allowed attempt"""
+        return queries.update(self.collection, self.fail_abandoned_query(max_attempts)).modified_count
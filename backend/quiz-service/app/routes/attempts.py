@@ -0,0 +1,79 @@
+from flask import Blueprint, request, jsonify, g
+from marshmallow import ValidationError
+from app.schemas.quiz_schema import AttemptAnswersSchema
+from app.services.attempt_service import AttemptService, AttemptClosedError
+from app.services.result_processor import QueueFullError
+from app.utils.auth_helper import token_required
+from app.utils.serializers import json_response
+
+attempts_bp = Blueprint('attempts', __name__)
+
+attempt_answers_schema = AttemptAnswersSchema()
+
+
+@attempts_bp.route('/<quiz_id>/attempts', methods=['POST'])
+@token_required
+def start_attempt(quiz_id):
+    try:
+        attempt, created = AttemptService.start_attempt(quiz_id, g.user_id)
+        return json_response({
+            "attempt": attempt
+        }), 201 if created else 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to start attempt"}), 500
+
+
+@attempts_bp.route('/<quiz_id>/attempts/<attempt_id>', methods=['GET'])
+@token_required
+def get_attempt(quiz_id, attempt_id):
+    try:
+        attempt = AttemptService.get_attempt(quiz_id, attempt_id, g.user_id)
+        return json_response({
+            "attempt": attempt
+        }), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve attempt"}), 500
+
+
+@attempts_bp.route('/<quiz_id>/attempts/<attempt_id>/answers', methods=['PATCH'])
+@token_required
+def save_answers(quiz_id, attempt_id):
+    try:
+        data = attempt_answers_schema.load(request.get_json())
+        remaining_seconds = AttemptService.save_answers(quiz_id, attempt_id, g.user_id, data['answers'])
+        return jsonify({
+            "saved": len(data['answers']),
+            "remaining_seconds": remaining_seconds
+        }), 200
+
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    except AttemptClosedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to save answers"}), 500
+
+
+@attempts_bp.route('/<quiz_id>/attempts/<attempt_id>/submit', methods=['POST'])
+@token_required
+def submit_attempt(quiz_id, attempt_id):
+    try:
+        result = AttemptService.submit_attempt(quiz_id, attempt_id, g.user_id)
+        return jsonify(result), 202
+
+    except QueueFullError as e:
+        response = jsonify({"error": "Too many submissions right now, please retry shortly"})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to submit attempt"}), 500
@@ -1,11 +1,12 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, Response, current_app, request, jsonify, g
 from marshmallow import ValidationError
-from bson import ObjectId, json_util
-import json
+from bson import ObjectId
+import gzip
 from app.schemas.quiz_schema import CreateQuizSchema, UpdateQuizSchema, ApprovalSchema, RejectionSchema
 from app.services.quiz_service import QuizService
 from app.services.notification_service import NotificationService
 from app.utils.auth_helper import token_required, moderator_required, admin_required
+from app.utils.serializers import json_response, ndjson_response, to_jsonable
 
 quiz_bp = Blueprint('quiz', __name__)
 
@@ -16,7 +17,32 @@ rejection_schema = RejectionSchema()
 
 
 def serialize_quiz(quiz):
-    return json.loads(json_util.dumps(quiz))
+    return to_jsonable(quiz)
+
+
+def player_quiz_response(quiz_id):
+    """Answer a player from the stored gzip rendition, or with 304 when their copy is current"""
+    gzip_accepted = 'gzip' in request.accept_encodings
+
+    def representation_etag(etag):
+        return f"{etag}-gzip" if gzip_accepted else etag
+
+    if request.if_none_match:
+        view = QuizService.get_player_view(quiz_id, include_body=False)
+        if request.if_none_match.contains(representation_etag(view['etag'])):
+            response = Response(status=304)
+            response.set_etag(representation_etag(view['etag']))
+            return response
+
+    view = QuizService.get_player_view(quiz_id)
+    body = bytes(view['body'])
+    response = Response(body if gzip_accepted else gzip.decompress(body), status=200, mimetype='application/json')
+    if gzip_accepted:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(representation_etag(view['etag']))
+    return response
 
 
 @quiz_bp.route('', methods=['POST'])
@@ -29,9 +55,9 @@ def create_quiz():
 
         NotificationService.notify_quiz_created(serialize_quiz(quiz))
 
-        return jsonify({
+        return json_response({
             "message": "Quiz created successfully and pending approval",
-            "quiz": serialize_quiz(quiz)
+            "quiz": quiz
         }), 201
 
     except ValidationError as err:
@@ -48,26 +74,108 @@ def list_quizzes():
     try:
         if g.user_role in ['ADMIN', 'MODERATOR']:
             status = request.args.get('status')
-            quizzes = QuizService.list_quizzes(status=status)
         else:
-            quizzes = QuizService.list_quizzes(status='APPROVED')
-
-        return jsonify({
-            "quizzes": [serialize_quiz(q) for q in quizzes]
+            status = 'APPROVED'
+
+        if request.args.get('view') == 'summary':
+            limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+            summaries, next_cursor = QuizService.list_quiz_summaries(
+                status=status, limit=limit, cursor=request.args.get('cursor')
+            )
+            return json_response({
+                "quizzes": summaries,
+                "next_cursor": next_cursor
+            }), 200
+
+        quizzes = QuizService.list_quizzes(status=status)
+
+        return json_response({
+            "quizzes": quizzes
         }), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Failed to retrieve quizzes"}), 500
 
 
+@quiz_bp.route('/search', methods=['GET'])
+@token_required
+def search_quizzes():
+    try:
+        text = request.args.get('q', '').strip()
+        if not text:
+            return jsonify({"error": "q parameter required"}), 400
+
+        if g.user_role in ['ADMIN', 'MODERATOR']:
+            status = request.args.get('status')
+            author_id = request.args.get('author_id', type=int)
+        else:
+            status = 'APPROVED'
+            author_id = None
+
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        summaries, next_cursor = QuizService.search_quizzes(
+            text, status=status, author_id=author_id, limit=limit, cursor=request.args.get('cursor')
+        )
+        return json_response({
+            "quizzes": summaries,
+            "next_cursor": next_cursor
+        }), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Failed to search quizzes"}), 500
+
+
+@quiz_bp.route('/bulk', methods=['POST'])
+@moderator_required
+def bulk_import_quizzes():
+    try:
+        summary = QuizService.import_quizzes(
+            request.stream,
+            g.user_id,
+            g.user_email,
+            batch_size=current_app.config['QUIZ_IMPORT_BATCH_SIZE']
+        )
+
+        if summary['imported']:
+            NotificationService.notify_quizzes_imported(summary, g.user_id, g.user_email)
+
+        return jsonify({
+            "message": f"Imported {summary['imported']} quiz(zes), {summary['failed']} line(s) rejected",
+            "imported": summary['imported'],
+            "failed": summary['failed'],
+            "quiz_ids": summary['quiz_ids'],
+            "errors": summary['errors']
+        }), 201 if summary['imported'] else 400
+
+    except Exception as e:
+        return jsonify({"error": "Failed to import quizzes"}), 500
+
+
+@quiz_bp.route('/export', methods=['GET'])
+@moderator_required
+def export_quizzes():
+    try:
+        quizzes = QuizService.export_quizzes(status=request.args.get('status'))
+        response = ndjson_response(quizzes)
+        response.headers['Content-Disposition'] = 'attachment; filename=quizzes.ndjson'
+        return response
+
+    except Exception as e:
+        return jsonify({"error": "Failed to export quizzes"}), 500
+
+
 @quiz_bp.route('/my-quizzes', methods=['GET'])
 @moderator_required
 def get_my_quizzes():
     try:
         quizzes = QuizService.get_quizzes_by_author(g.user_id)
 
-        return jsonify({
-            "quizzes": [serialize_quiz(q) for q in quizzes]
+        return json_response({
+            "quizzes": quizzes
         }), 200
 
     except Exception as e:
@@ -80,8 +188,8 @@ def get_pending_quizzes():
     try:
         quizzes = QuizService.list_quizzes(status='PENDING')
 
-        return jsonify({
-            "quizzes": [serialize_quiz(q) for q in quizzes]
+        return json_response({
+            "quizzes": quizzes
         }), 200
 
     except Exception as e:
@@ -92,12 +200,12 @@ def get_pending_quizzes():
 @token_required
 def get_quiz(quiz_id):
     try:
-        quiz = QuizService.get_quiz(quiz_id)
+        if g.user_role == 'PLAYER':
+            return player_quiz_response(quiz_id)
 
-        if g.user_role == 'PLAYER' and quiz['status'] != 'APPROVED':
-            return jsonify({"error": "Quiz not available"}), 404
+        quiz = QuizService.get_quiz(quiz_id)
 
-        return jsonify({"quiz": serialize_quiz(quiz)}), 200
+        return json_response({"quiz": quiz}), 200
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
@@ -109,19 +217,16 @@ def get_quiz(quiz_id):
 @moderator_required
 def update_quiz(quiz_id):
     try:
-        original_quiz = QuizService.get_quiz(quiz_id)
-        was_rejected = original_quiz['status'] == 'REJECTED'
-
         data = update_quiz_schema.load(request.get_json())
 
-        quiz = QuizService.update_quiz(quiz_id, data, g.user_id)
+        quiz, resubmitted = QuizService.update_quiz(quiz_id, data, g.user_id)
 
-        if was_rejected and quiz['status'] == 'PENDING':
+        if resubmitted:
             NotificationService.notify_quiz_created(serialize_quiz(quiz))
 
-        return jsonify({
+        return json_response({
             "message": "Quiz updated successfully",
-            "quiz": serialize_quiz(quiz)
+            "quiz": quiz
         }), 200
 
     except ValidationError as err:
@@ -170,9 +275,9 @@ def approve_quiz(quiz_id):
 
         NotificationService.notify_quiz_approved(serialize_quiz(quiz), quiz['author_id'])
 
-        return jsonify({
+        return json_response({
             "message": "Quiz approved successfully",
-            "quiz": serialize_quiz(quiz)
+            "quiz": quiz
         }), 200
 
     except ValidationError as err:
@@ -197,9 +302,9 @@ def reject_quiz(quiz_id):
 
         NotificationService.notify_quiz_rejected(serialize_quiz(quiz), quiz['author_id'])
 
-        return jsonify({
+        return json_response({
             "message": "Quiz rejected",
-            "quiz": serialize_quiz(quiz)
+            "quiz": quiz
         }), 200
 
     except ValidationError as err:
@@ -1,55 +1,140 @@
-from flask import Blueprint, send_file, jsonify, g, current_app
+from datetime import datetime
+from flask import Blueprint, Response, request, send_file, jsonify, g
+from marshmallow import ValidationError
+from app.schemas.quiz_schema import BulkReportSchema
+from app.services.quiz_service import QuizService
 from app.services.report_service import ReportService
+from app.utils.result_export import ParquetUnavailableError
 from app.utils.auth_helper import token_required, admin_required
-import requests
+from app.utils.serializers import json_response
 
 reports_bp = Blueprint('reports', __name__)
 
+bulk_report_schema = BulkReportSchema()
+
+
+@reports_bp.route('/bulk', methods=['POST'])
+@admin_required
+def generate_bulk_reports():
+    try:
+        data = bulk_report_schema.load(request.get_json() or {})
+        archive = ReportService.bulk_quiz_reports(data.get('quiz_ids'), data.get('status'), data.get('author_id'))
+
+        filename = f"quiz-reports-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+        return Response(archive, mimetype='application/zip', headers={
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        })
+
+    except ValidationError as err:
+        return jsonify({"errors": err.messages}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        print(f"[REPORT ERROR] {str(e)}")
+        return jsonify({"error": "Failed to generate reports"}), 500
+
 
 @reports_bp.route('/quiz/<quiz_id>', methods=['POST'])
 @admin_required
 def generate_quiz_report(quiz_id):
     try:
-        pdf_buffer, filename = ReportService.generate_quiz_report(quiz_id)
+        job = ReportService.request_quiz_report(quiz_id, g.user_id)
+
+        return jsonify({
+            "message": "PDF report is being generated and will be sent to your email",
+            "job_id": str(job['_id']),
+            "status": job['status']
+        }), 202
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        print(f"[REPORT ERROR] {str(e)}")
+        return jsonify({"error": "Failed to generate report"}), 500
 
-        main_service_url = current_app.config.get('MAIN_SERVICE_URL', 'http://localhost:5000')
-        response = requests.get(f"{main_service_url}/users/{g.user_id}/public")
 
-        if response.status_code != 200:
-            return jsonify({"error": "Failed to fetch user information"}), 500
+@reports_bp.route('/quiz/<quiz_id>/questions', methods=['GET'])
+@token_required
+def get_question_analytics(quiz_id):
+    try:
+        quiz = QuizService.get_quiz(quiz_id)
 
-        user_data = response.json().get('user', {})
-        admin_email = user_data.get('email')
+        if g.user_role not in ['ADMIN', 'MODERATOR'] and quiz['author_id'] != g.user_id:
+            return jsonify({"error": "You can only view analytics of your own quizzes"}), 403
 
-        if not admin_email:
-            return jsonify({"error": "Admin email not found"}), 500
+        analytics = ReportService.get_question_analytics(quiz, request.args.get('version', type=int))
+        return json_response(analytics), 200
 
-        admin_email = 'REPLACE@gmail.com'
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve question analytics"}), 500
 
-        import base64
-        pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode('utf-8')
 
-        email_data = {
-            'recipient_email': admin_email,
-            'quiz_title': filename,
-            'pdf_data': pdf_base64
-        }
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet'
+}
 
-        email_response = requests.post(
-            f"{main_service_url}/api/notify/send-pdf-report",
-            json=email_data
-        )
 
-        if email_response.status_code == 200:
-            return jsonify({"message": "PDF report has been sent to your email"}), 200
-        else:
-            return jsonify({"error": "Failed to send PDF report"}), 500
+@reports_bp.route('/quiz/<quiz_id>/results.<fmt>', methods=['GET'])
+@token_required
+def export_quiz_results(quiz_id, fmt):
+    try:
+        if fmt not in EXPORT_MIMETYPES:
+            return jsonify({"error": "Export format must be csv or parquet"}), 404
+
+        quiz = QuizService.get_quiz(quiz_id)
+
+        if g.user_role not in ['ADMIN', 'MODERATOR'] and quiz['author_id'] != g.user_id:
+            return jsonify({"error": "You can only export results of your own quizzes"}), 403
+
+        chunks = ReportService.export_results(quiz, fmt)
+        return Response(chunks, mimetype=EXPORT_MIMETYPES[fmt], headers={
+            'Content-Disposition': f'attachment; filename="quiz-{quiz_id}-results.{fmt}"'
+        })
 
+    except ParquetUnavailableError as e:
+        return jsonify({"error": str(e)}), 501
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
         print(f"[REPORT ERROR] {str(e)}")
-        return jsonify({"error": "Failed to generate report"}), 500
+        return jsonify({"error": "Failed to export results"}), 500
+
+
+@reports_bp.route('/jobs/<job_id>', methods=['GET'])
+@admin_required
+def get_report_job(job_id):
+    try:
+        job = ReportService.get_report_job(job_id)
+        return json_response({
+            "job": job
+        }), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve report job"}), 500
+
+
+@reports_bp.route('/jobs/<job_id>/pdf', methods=['GET'])
+@admin_required
+def download_report(job_id):
+    try:
+        path, title = ReportService.get_report_artifact(job_id)
+
+        return send_file(
+            path,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f"{title}_report.pdf"
+        )
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve report"}), 500
 
 
 @reports_bp.route('/result/<result_id>', methods=['GET'])
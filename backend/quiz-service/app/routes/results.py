@@ -1,20 +1,15 @@
 from flask import Blueprint, request, jsonify, g
 from marshmallow import ValidationError
-from bson import json_util
-import json
 from app.schemas.quiz_schema import QuizSubmissionSchema
-from app.services.result_processor import ResultProcessor
+from app.services.result_processor import ResultProcessor, QueueFullError
 from app.utils.auth_helper import token_required
+from app.utils.serializers import json_response
 
 results_bp = Blueprint('results', __name__)
 
 quiz_submission_schema = QuizSubmissionSchema()
 
 
-def serialize_result(result):
-    return json.loads(json_util.dumps(result))
-
-
 @results_bp.route('/submit', methods=['POST'])
 @token_required
 def submit_quiz():
@@ -36,23 +31,53 @@ def submit_quiz():
 
     except ValidationError as err:
         return jsonify({"errors": err.messages}), 400
+    except QueueFullError as e:
+        response = jsonify({"error": "Too many submissions right now, please retry shortly"})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
     except Exception as e:
         return jsonify({"error": "Failed to submit quiz"}), 500
 
 
+@results_bp.route('/submissions/<submission_id>', methods=['GET'])
+@token_required
+def get_submission_status(submission_id):
+    try:
+        status = ResultProcessor.get_submission_status(submission_id, g.user_id)
+        return jsonify(status), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve submission status"}), 500
+
+
 @results_bp.route('/my-results', methods=['GET'])
 @token_required
 def get_my_results():
     try:
         results = ResultProcessor.get_user_results(g.user_id)
-        return jsonify({
-            "results": [serialize_result(r) for r in results]
+        return json_response({
+            "results": results
         }), 200
 
     except Exception as e:
         return jsonify({"error": "Failed to retrieve results"}), 500
 
 
+@results_bp.route('/quiz/<quiz_id>/statistics', methods=['GET'])
+@token_required
+def get_quiz_statistics(quiz_id):
+    try:
+        statistics = ResultProcessor.get_quiz_statistics(quiz_id, request.args.get('result_id'), g.user_id)
+        return json_response(statistics), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve quiz statistics"}), 500
+
+
 @results_bp.route('/leaderboard/<quiz_id>', methods=['GET'])
 @token_required
 def get_leaderboard(quiz_id):
@@ -61,10 +86,25 @@ def get_leaderboard(quiz_id):
         auth_token = request.headers.get('Authorization', '')
         leaderboard = ResultProcessor.get_quiz_leaderboard(quiz_id, limit, auth_token)
 
-        return jsonify({
-            "leaderboard": [serialize_result(r) for r in leaderboard]
+        return json_response({
+            "leaderboard": leaderboard
         }), 200
 
     except Exception as e:
         return jsonify({"error": "Failed to retrieve leaderboard"}), 500
 
+
+@results_bp.route('/leaderboard/<quiz_id>/around-me', methods=['GET'])
+@token_required
+def get_leaderboard_around_me(quiz_id):
+    try:
+        radius = min(request.args.get('radius', 5, type=int), 50)
+        auth_token = request.headers.get('Authorization', '')
+        leaderboard = ResultProcessor.get_leaderboard_around_user(quiz_id, g.user_id, radius, auth_token)
+
+        return json_response({
+            "leaderboard": leaderboard
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve leaderboard"}), 500
@@ -1,4 +1,5 @@
-from marshmallow import Schema, fields, validates, ValidationError
+from bson import ObjectId
+from marshmallow import Schema, fields, validate, validates, validates_schema, ValidationError, EXCLUDE
 
 
 class AnswerSchema(Schema):
@@ -34,6 +35,26 @@ class CreateQuizSchema(Schema):
             raise ValidationError("Quiz must have at least one question")
 
 
+class ImportAnswerSchema(AnswerSchema):
+    class Meta:
+        unknown = EXCLUDE
+
+
+class ImportQuestionSchema(QuestionSchema):
+    answers = fields.List(fields.Nested(ImportAnswerSchema), required=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class ImportQuizSchema(CreateQuizSchema):
+    """A bulk-import record; ids, status and other exported fields are ignored"""
+    questions = fields.List(fields.Nested(ImportQuestionSchema), required=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
 class UpdateQuizSchema(Schema):
     title = fields.Str(required=False)
     description = fields.Str(required=False, allow_none=True)
@@ -57,3 +78,32 @@ class SubmitAnswersSchema(Schema):
 class QuizSubmissionSchema(Schema):
     answers = fields.List(fields.Nested(SubmitAnswersSchema), required=True)
     time_spent_seconds = fields.Int(required=True)
+
+
+class AttemptAnswersSchema(Schema):
+    answers = fields.List(fields.Nested(SubmitAnswersSchema), required=True)
+
+    @validates('answers')
+    def validate_answers(self, value):
+        if len(value) > 200:
+            raise ValidationError("At most 200 answers per save")
+        for answer in value:
+            if not ObjectId.is_valid(answer['question_id']):
+                raise ValidationError(f"Invalid question id: {answer['question_id']}")
+
+
+class BulkReportSchema(Schema):
+    quiz_ids = fields.List(fields.Str(), required=False)
+    status = fields.Str(required=False, validate=validate.OneOf(['PENDING', 'APPROVED', 'REJECTED']))
+    author_id = fields.Int(required=False)
+
+    @validates('quiz_ids')
+    def validate_quiz_ids(self, value):
+        for quiz_id in value:
+            if not ObjectId.is_valid(quiz_id):
+                raise ValidationError(f"Invalid quiz id: {quiz_id}")
+
+    @validates_schema
+    def validate_selection(self, data, **kwargs):
+        if not data.get('quiz_ids') and 'status' not in data and 'author_id' not in data:
+            raise ValidationError("Provide quiz_ids or a status/author_id filter")
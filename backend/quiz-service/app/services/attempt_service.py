@@ -0,0 +1,277 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from flask import current_app
+from redis import RedisError
+import json
+import threading
+import time
+from app.services.quiz_service import QuizService
+from app.services.result_processor import ResultProcessor, QueueFullError
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class AttemptClosedError(Exception):
+    """Raised when answers arrive for an attempt whose time is over"""
+
+
+class AttemptBuffer:
+    """
+    Holds autosaved answers in Redis until the periodic flush writes them to Mongo.
+    Each attempt keeps a hash of question_id -> answer ids plus a small metadata hash,
+    and attempts with unsaved answers are listed in one shared set.
+    """
+
+    DIRTY_KEY = 'attempts:dirty'
+
+    def __init__(self, redis_client, attempt_model, retention_seconds=3600):
+        self.redis = redis_client
+        self.attempt_model = attempt_model
+        self.retention_seconds = retention_seconds
+
+    @staticmethod
+    def _keys(attempt_id):
+        return f"attempt:{attempt_id}:answers", f"attempt:{attempt_id}:meta"
+
+    def _expire_at(self, deadline):
+        return int((deadline - EPOCH).total_seconds()) + self.retention_seconds
+
+    def remember(self, attempt):
+        _, meta_key = self._keys(attempt['_id'])
+        pipe = self.redis.pipeline()
+        pipe.hset(meta_key, mapping={
+            'quiz_id': str(attempt['quiz_id']),
+            'user_id': attempt['user_id'],
+            'status': attempt['status'],
+            'deadline': (attempt['deadline'] - EPOCH).total_seconds()
+        })
+        pipe.expireat(meta_key, self._expire_at(attempt['deadline']))
+        pipe.execute()
+
+    def meta(self, attempt_id):
+        _, meta_key = self._keys(attempt_id)
+        meta = self.redis.hgetall(meta_key)
+        if not meta:
+            return None
+        return {
+            'quiz_id': meta[b'quiz_id'].decode('utf-8'),
+            'user_id': int(meta[b'user_id']),
+            'status': meta[b'status'].decode('utf-8'),
+            'deadline': float(meta[b'deadline'])
+        }
+
+    def add_answers(self, attempt_id, answers, deadline):
+        answers_key, _ = self._keys(attempt_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(answers_key, mapping={question_id: json.dumps(answer_ids) for question_id, answer_ids in answers.items()})
+        pipe.expireat(answers_key, int(deadline) + self.retention_seconds)
+        pipe.sadd(self.DIRTY_KEY, str(attempt_id))
+        pipe.execute()
+
+    def pending_answers(self, attempt_id):
+        answers_key, _ = self._keys(attempt_id)
+        return {question_id.decode('utf-8'): json.loads(answer_ids)
+                for question_id, answer_ids in self.redis.hgetall(answers_key).items()}
+
+    def flush(self, batch_size=500):
+        """Write the buffered answers of up to `batch_size` attempts to Mongo; returns how many"""
+        attempt_ids = [attempt_id.decode('utf-8') for attempt_id in self.redis.spop(self.DIRTY_KEY, batch_size) or []]
+        if not attempt_ids:
+            return 0
+
+        pipe = self.redis.pipeline()
+        for attempt_id in attempt_ids:
+            pipe.hgetall(self._keys(attempt_id)[0])
+        answers_by_attempt = {}
+        for attempt_id, answers in zip(attempt_ids, pipe.execute()):
+            if answers:
+                answers_by_attempt[attempt_id] = {question_id.decode('utf-8'): json.loads(answer_ids)
+                                                  for question_id, answer_ids in answers.items()}
+
+        try:
+            self.attempt_model.save_answers(answers_by_attempt)
+        except Exception:
+            self.redis.sadd(self.DIRTY_KEY, *attempt_ids)
+            raise
+        return len(attempt_ids)
+
+    def forget(self, attempt_id):
+        pipe = self.redis.pipeline()
+        pipe.delete(*self._keys(attempt_id))
+        pipe.srem(self.DIRTY_KEY, str(attempt_id))
+        pipe.execute()
+
+
+def recover_stale_submissions(attempt_model, job_model, grace_seconds):
+    """
+    Settle attempts left in SUBMITTING by a process that died mid-submit.
+    The submission job shares the attempt's _id, so an attempt whose job was
+    queued becomes SUBMITTED and any other goes back to ACTIVE.
+    """
+    stale = attempt_model.find_stale_submissions(datetime.utcnow() - timedelta(seconds=grace_seconds))
+    for attempt in stale:
+        attempt_id = str(attempt['_id'])
+        job = job_model.find_job_by_id(attempt_id)
+        if job:
+            answers = {answer['question_id']: answer['answer_ids'] for answer in job['submitted_answers']}
+            attempt_model.finish_submission(attempt_id, answers, attempt_id, job['time_spent_seconds'])
+            print(f"[Attempts] Marked stale attempt {attempt_id} as submitted")
+        else:
+            attempt_model.abort_submission(attempt_id)
+            print(f"[Attempts] Returned stale attempt {attempt_id} to active")
+    return len(stale)
+
+
+def start_attempt_flusher(attempt_buffer, interval_seconds, batch_size, job_model=None, grace_seconds=5):
+    """
+    Flush autosaved answers to Mongo periodically in a daemon thread,
+    settling stuck submissions on the way when given the submission job model
+    """
+
+    def loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                while attempt_buffer.flush(batch_size) == batch_size:
+                    pass
+            except Exception as e:
+                print(f"[Attempts] Flush failed: {str(e)}")
+
+            if job_model is None:
+                continue
+            try:
+                recover_stale_submissions(attempt_buffer.attempt_model, job_model, grace_seconds)
+            except Exception as e:
+                print(f"[Attempts] Failed to recover stale submissions: {str(e)}")
+
+    thread = threading.Thread(target=loop, name='attempt-flusher', daemon=True)
+    thread.start()
+    return thread
+
+
+class AttemptService:
+    @staticmethod
+    def _check_ids(*ids):
+        if not all(ObjectId.is_valid(value) for value in ids):
+            raise ValueError("Attempt not found")
+
+    @staticmethod
+    def _view(attempt, answers=None):
+        """Attempt as returned to its player, with the time they have left"""
+        remaining = (attempt['deadline'] - datetime.utcnow()).total_seconds()
+        return {
+            '_id': attempt['_id'],
+            'quiz_id': attempt['quiz_id'],
+            'status': attempt['status'],
+            'started_at': attempt['started_at'],
+            'deadline': attempt['deadline'],
+            'remaining_seconds': max(0, int(remaining)),
+            'answers': [{'question_id': question_id, 'answer_ids': answer_ids}
+                        for question_id, answer_ids in (answers if answers is not None else attempt['answers']).items()]
+        }
+
+    @staticmethod
+    def start_attempt(quiz_id, user_id):
+        """Open an attempt, or return the user's unexpired one; returns (attempt, created)"""
+        AttemptService._check_ids(quiz_id)
+        attempt_model = current_app.attempt_model
+
+        existing = attempt_model.find_active_attempt(quiz_id, user_id)
+        if existing:
+            return AttemptService.get_attempt(quiz_id, str(existing['_id']), user_id), False
+
+        quiz = QuizService.get_quiz(quiz_id)
+        if quiz['status'] != 'APPROVED':
+            raise ValueError("Quiz not available")
+
+        attempt = attempt_model.create_attempt(quiz_id, user_id, quiz.get('duration_seconds', 0))
+        current_app.attempt_buffer.remember(attempt)
+        return AttemptService._view(attempt), True
+
+    @staticmethod
+    def _attempt_meta(quiz_id, attempt_id, user_id):
+        AttemptService._check_ids(quiz_id, attempt_id)
+        buffer = current_app.attempt_buffer
+        meta = buffer.meta(attempt_id)
+        if meta is None:
+            attempt = current_app.attempt_model.find_attempt_by_id(attempt_id)
+            if attempt:
+                buffer.remember(attempt)
+                meta = buffer.meta(attempt_id)
+
+        if not meta or meta['user_id'] != user_id or meta['quiz_id'] != quiz_id:
+            raise ValueError("Attempt not found")
+        return meta
+
+    @staticmethod
+    def get_attempt(quiz_id, attempt_id, user_id):
+        """An attempt with its autosaved answers, including ones not flushed to Mongo yet"""
+        AttemptService._check_ids(quiz_id, attempt_id)
+        attempt = current_app.attempt_model.find_attempt_by_id(attempt_id)
+        if not attempt or attempt['user_id'] != user_id or str(attempt['quiz_id']) != quiz_id:
+            raise ValueError("Attempt not found")
+
+        answers = dict(attempt['answers'])
+        if attempt['status'] == current_app.attempt_model.ACTIVE:
+            answers.update(current_app.attempt_buffer.pending_answers(attempt_id))
+        return AttemptService._view(attempt, answers)
+
+    @staticmethod
+    def save_answers(quiz_id, attempt_id, user_id, answers):
+        """Buffer changed answers; returns the seconds left in the attempt"""
+        meta = AttemptService._attempt_meta(quiz_id, attempt_id, user_id)
+        if meta['status'] != current_app.attempt_model.ACTIVE:
+            raise AttemptClosedError("Attempt already submitted")
+
+        now = (datetime.utcnow() - EPOCH).total_seconds()
+        if now > meta['deadline'] + current_app.config['ATTEMPT_GRACE_SECONDS']:
+            raise AttemptClosedError("Attempt time is over")
+
+        changes = {answer['question_id']: answer['answer_ids'] for answer in answers}
+        if changes:
+            current_app.attempt_buffer.add_answers(attempt_id, changes, meta['deadline'])
+        return max(0, int(meta['deadline'] - now))
+
+    @staticmethod
+    def submit_attempt(quiz_id, attempt_id, user_id):
+        """Score an attempt from its stored answers and server-side clock"""
+        AttemptService._check_ids(quiz_id, attempt_id)
+        attempt_model = current_app.attempt_model
+        buffer = current_app.attempt_buffer
+
+        attempt = attempt_model.start_submission(attempt_id, user_id)
+        if not attempt or str(attempt['quiz_id']) != quiz_id:
+            raise ValueError("Attempt not found or already submitted")
+
+        try:
+            answers = dict(attempt['answers'])
+            answers.update(buffer.pending_answers(attempt_id))
+        except RedisError:
+            attempt_model.abort_submission(attempt_id)
+            raise
+
+        elapsed = (datetime.utcnow() - attempt['started_at']).total_seconds()
+        time_spent_seconds = int(min(elapsed, attempt['duration_seconds']))
+
+        try:
+            result = ResultProcessor.submit_quiz_async(
+                quiz_id=quiz_id,
+                user_id=user_id,
+                submitted_answers=[{'question_id': question_id, 'answer_ids': answer_ids}
+                                   for question_id, answer_ids in answers.items()],
+                time_spent_seconds=time_spent_seconds,
+                submission_id=attempt_id
+            )
+        except QueueFullError:
+            attempt_model.abort_submission(attempt_id)
+            raise
+
+        attempt_model.finish_submission(attempt_id, answers, result['submission_id'], time_spent_seconds)
+        try:
+            buffer.forget(attempt_id)
+        except RedisError as e:
+            print(f"[Attempts] Failed to clear buffered answers of {attempt_id}: {str(e)}")
+
+        result['attempt_id'] = attempt_id
+        result['time_spent_seconds'] = time_spent_seconds
+        return result
@@ -0,0 +1,307 @@
+from datetime import datetime
+import json
+import threading
+import uuid
+
+
+RECORD_RESULT_SCRIPT = """
+local function record(attempts, best, entries)
+    redis.call('ZADD', attempts, ARGV[3], ARGV[1])
+    if redis.call('ZADD', best, 'GT', 'CH', ARGV[3], ARGV[2]) == 1 then
+        redis.call('HSET', entries, ARGV[2], ARGV[4])
+    end
+end
+
+record(KEYS[1], KEYS[2], KEYS[3])
+-- While a rebuild runs, new results also go into the keys it is building
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    record(KEYS[5], KEYS[6], KEYS[7])
+end
+return redis.call('ZCOUNT', KEYS[1], '(' .. ARGV[3], '+inf') + 1
+"""
+
+MERGE_BEST_SCRIPT = """
+if redis.call('ZADD', KEYS[1], 'GT', 'CH', ARGV[2], ARGV[1]) == 1 then
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+end
+"""
+
+BEGIN_REBUILD_SCRIPT = """
+if not redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 0
+end
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4])
+return 1
+"""
+
+FINISH_REBUILD_SCRIPT = """
+-- KEYS: lock, ready, building attempts/best/entries, live attempts/best/entries
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == '1' then
+    for i = 3, 5 do
+        if redis.call('EXISTS', KEYS[i]) == 1 then
+            redis.call('RENAME', KEYS[i], KEYS[i + 3])
+        else
+            redis.call('DEL', KEYS[i + 3])
+        end
+    end
+    redis.call('SET', KEYS[2], 1)
+else
+    redis.call('DEL', KEYS[3], KEYS[4], KEYS[5])
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+class LeaderboardEngine:
+    """
+    Per-quiz leaderboards kept in Redis sorted sets.
+
+    Every result is ordered by one composite number (score desc, time asc), so
+    ranking a new result is a ZADD + ZCOUNT and top-K is a ZREVRANGE.
+    Two sets are kept per quiz: every attempt (for ranked_position) and the
+    best attempt of each user (for the leaderboard).
+
+    Rebuilds load Mongo into separate keys that are renamed over the live ones
+    when done; results recorded meanwhile are written to both.
+    """
+
+    TIME_SLOTS = 2 ** 24
+    ATTEMPTS_KEY = "leaderboard:{}:attempts"
+    BEST_KEY = "leaderboard:{}:best"
+    ENTRIES_KEY = "leaderboard:{}:entries"
+    READY_KEY = "leaderboard:{}:ready"
+    REBUILD_LOCK_KEY = "leaderboard:{}:rebuilding"
+    REBUILD_KEY_PREFIX = "leaderboard:{}:rebuild:"
+    REBUILD_LOCK_SECONDS = 300
+
+    def __init__(self, redis_client, result_model):
+        self.redis = redis_client
+        self.result_model = result_model
+        self.record_script = redis_client.register_script(RECORD_RESULT_SCRIPT)
+        self.merge_best_script = redis_client.register_script(MERGE_BEST_SCRIPT)
+        self.begin_rebuild_script = redis_client.register_script(BEGIN_REBUILD_SCRIPT)
+        self.finish_rebuild_script = redis_client.register_script(FINISH_REBUILD_SCRIPT)
+
+    @staticmethod
+    def composite_score(score, time_spent_seconds):
+        """Higher is better: score in hundredths first, then less time spent"""
+        time_part = min(max(int(time_spent_seconds or 0), 0), LeaderboardEngine.TIME_SLOTS - 1)
+        return round(score * 100) * LeaderboardEngine.TIME_SLOTS + (LeaderboardEngine.TIME_SLOTS - 1 - time_part)
+
+    @staticmethod
+    def _keys(quiz_id):
+        quiz_id = str(quiz_id)
+        return (
+            LeaderboardEngine.ATTEMPTS_KEY.format(quiz_id),
+            LeaderboardEngine.BEST_KEY.format(quiz_id),
+            LeaderboardEngine.ENTRIES_KEY.format(quiz_id)
+        )
+
+    @staticmethod
+    def _rebuild_keys(quiz_id):
+        """Keys a running rebuild writes to, renamed over _keys() when it finishes"""
+        prefix = LeaderboardEngine.REBUILD_KEY_PREFIX.format(str(quiz_id))
+        return prefix + 'attempts', prefix + 'best', prefix + 'entries'
+
+    @staticmethod
+    def _encode_entry(result):
+        submitted_at = result.get('submitted_at')
+        return json.dumps({
+            'result_id': str(result['_id']),
+            'user_id': result['user_id'],
+            'score': result['score'],
+            'max_score': result.get('max_score'),
+            'time_spent_seconds': result.get('time_spent_seconds'),
+            'submitted_at': int((submitted_at - datetime(1970, 1, 1)).total_seconds() * 1000) if submitted_at else None,
+            'user_name': result.get('user_name')
+        })
+
+    @staticmethod
+    def _decode_entry(raw):
+        entry = json.loads(raw)
+        submitted_at = entry.pop('submitted_at')
+        entry['submitted_at'] = datetime.utcfromtimestamp(submitted_at / 1000) if submitted_at is not None else None
+        entry['_id'] = entry['user_id']
+        return entry
+
+    def is_ready(self, quiz_id):
+        return bool(self.redis.exists(self.READY_KEY.format(str(quiz_id))))
+
+    def record_results(self, quiz_id, results):
+        """
+        Add new results (not yet stored in Mongo) and return their ranks, in order.
+        Tied results share a rank, one more than the number of strictly better results
+        already recorded, wherever they are in the list.
+        Until the leaderboard is built (a rebuild is started in the background),
+        ranks are counted in Mongo.
+        """
+        ready = self.is_ready(quiz_id)
+        if not ready:
+            self.rebuild_in_background(quiz_id)
+
+        keys = [*self._keys(quiz_id), self.REBUILD_LOCK_KEY.format(str(quiz_id)), *self._rebuild_keys(quiz_id)]
+        pipeline = self.redis.pipeline(transaction=False)
+        for result in results:
+            self.record_script(
+                keys=keys,
+                args=[
+                    str(result['_id']),
+                    str(result['user_id']),
+                    self.composite_score(result['score'], result['time_spent_seconds']),
+                    self._encode_entry(result)
+                ],
+                client=pipeline
+            )
+        ranks = pipeline.execute()
+
+        if ready:
+            return ranks
+        return [self.result_model.calculate_user_rank(quiz_id, result['score'], result['time_spent_seconds'])
+                for result in results]
+
+    def discard_results(self, quiz_id, results):
+        """Forget results that could not be stored; best-per-user is fixed by the next rebuild"""
+        attempts_key, _, _ = self._keys(quiz_id)
+        self.redis.zrem(attempts_key, *[str(result['_id']) for result in results])
+        self.redis.delete(self.READY_KEY.format(str(quiz_id)))
+
+    def forget(self, quiz_id):
+        """Drop a quiz's leaderboard, e.g. once the quiz is deleted"""
+        self.redis.delete(self.READY_KEY.format(str(quiz_id)), *self._keys(quiz_id), *self._rebuild_keys(quiz_id))
+
+    def rename_user(self, quiz_id, user_id, user_name):
+        """Refresh the name stored with a user's leaderboard entry"""
+        _, _, entries_key = self._keys(quiz_id)
+        raw = self.redis.hget(entries_key, str(user_id))
+        if raw:
+            entry = json.loads(raw)
+            entry['user_name'] = user_name
+            self.redis.hset(entries_key, str(user_id), json.dumps(entry))
+
+    def top(self, quiz_id, limit=10):
+        """Best attempt of the top `limit` users"""
+        _, best_key, entries_key = self._keys(quiz_id)
+        user_ids = self.redis.zrevrange(best_key, 0, limit - 1)
+        if not user_ids:
+            return []
+        return [self._decode_entry(raw) for raw in self.redis.hmget(entries_key, user_ids) if raw]
+
+    def around(self, quiz_id, user_id, radius=5):
+        """Leaderboard rows around a user's best attempt, with 1-based positions"""
+        _, best_key, entries_key = self._keys(quiz_id)
+        position = self.redis.zrevrank(best_key, str(user_id))
+        if position is None:
+            return []
+
+        start = max(0, position - radius)
+        user_ids = self.redis.zrevrange(best_key, start, position + radius)
+        rows = []
+        for offset, raw in enumerate(self.redis.hmget(entries_key, user_ids)):
+            if raw:
+                entry = self._decode_entry(raw)
+                entry['position'] = start + offset + 1
+                rows.append(entry)
+        return rows
+
+    def _begin_rebuild(self, quiz_id):
+        """Take the rebuild lock and clear leftovers of an earlier rebuild; returns the lock token or None"""
+        token = uuid.uuid4().hex
+        keys = [self.REBUILD_LOCK_KEY.format(str(quiz_id)), *self._rebuild_keys(quiz_id)]
+        if self.begin_rebuild_script(keys=keys, args=[token, self.REBUILD_LOCK_SECONDS]):
+            return token
+        return None
+
+    def _build(self, quiz_id, token):
+        quiz_id = str(quiz_id)
+        lock_key = self.REBUILD_LOCK_KEY.format(quiz_id)
+        attempts_key, best_key, entries_key = self._rebuild_keys(quiz_id)
+        finish_keys = [lock_key, self.READY_KEY.format(quiz_id), *self._rebuild_keys(quiz_id), *self._keys(quiz_id)]
+        completed = False
+
+        try:
+            best = {}
+            pipeline = self.redis.pipeline(transaction=False)
+            for count, result in enumerate(self.result_model.iter_rank_rows(quiz_id), 1):
+                composite = self.composite_score(result['score'], result.get('time_spent_seconds'))
+                pipeline.zadd(attempts_key, {str(result['_id']): composite})
+
+                user_key = str(result['user_id'])
+                if user_key not in best or best[user_key][0] < composite:
+                    best[user_key] = (composite, result)
+
+                if count % 1000 == 0:
+                    pipeline.expire(lock_key, self.REBUILD_LOCK_SECONDS)
+                    pipeline.execute()
+
+            # Merged, not overwritten: a better attempt recorded during the rebuild wins
+            for count, (user_key, (composite, result)) in enumerate(best.items(), 1):
+                self.merge_best_script(keys=[best_key, entries_key], args=[user_key, composite, self._encode_entry(result)],
+                                       client=pipeline)
+                if count % 1000 == 0:
+                    pipeline.execute()
+            pipeline.execute()
+
+            completed = bool(self.finish_rebuild_script(keys=finish_keys, args=[token, 1]))
+            if completed:
+                print(f"[Leaderboard] Rebuilt quiz {quiz_id}: {len(best)} player(s)")
+            else:
+                print(f"[Leaderboard] Rebuild of quiz {quiz_id} outlived its lock, discarded")
+            return completed
+        finally:
+            if not completed:
+                self.finish_rebuild_script(keys=finish_keys, args=[token, 0])
+
+    def rebuild(self, quiz_id):
+        """Reload a quiz's leaderboard from the results collection; False if a rebuild is already running"""
+        token = self._begin_rebuild(quiz_id)
+        if not token:
+            return False
+        return self._build(quiz_id, token)
+
+    def rebuild_in_background(self, quiz_id):
+        """Start a rebuild on a daemon thread unless one is already running"""
+        token = self._begin_rebuild(quiz_id)
+        if not token:
+            return False
+
+        def run():
+            try:
+                self._build(quiz_id, token)
+            except Exception as e:
+                print(f"[Leaderboard] Rebuild of quiz {quiz_id} failed: {str(e)}")
+
+        threading.Thread(target=run, name=f"leaderboard-rebuild-{quiz_id}", daemon=True).start()
+        return True
+
+    def check(self, quiz_id, sample=100):
+        """Compare the Redis leaderboard with Mongo; returns a list of problems found"""
+        quiz_id = str(quiz_id)
+        attempts_key, best_key, _ = self._keys(quiz_id)
+        problems = []
+
+        if not self.is_ready(quiz_id):
+            return ["leaderboard is not built"]
+
+        stored = self.result_model.count_results_by_quiz(quiz_id)
+        ranked = self.redis.zcard(attempts_key)
+        if stored != ranked:
+            problems.append(f"{stored} result(s) in Mongo, {ranked} in Redis")
+
+        expected = self.result_model.get_leaderboard(quiz_id, sample)
+        actual = self.top(quiz_id, sample)
+        for position, (want, got) in enumerate(zip(expected, actual), 1):
+            # Users tied on score and time may be listed in either order
+            if (want['score'], want.get('time_spent_seconds')) != (got['score'], got.get('time_spent_seconds')):
+                problems.append(
+                    f"position {position}: Mongo has user {want['user_id']} ({want['score']}), "
+                    f"Redis has user {got['user_id']} ({got['score']})"
+                )
+        if len(expected) != len(actual):
+            problems.append(f"top {sample}: {len(expected)} row(s) in Mongo, {len(actual)} in Redis")
+
+        return problems
+
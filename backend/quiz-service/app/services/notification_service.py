@@ -23,6 +23,26 @@ class NotificationService:
             print(f"[Notification] Failed to send quiz created notification: {str(e)}")
             return False
 
+    @staticmethod
+    def notify_quizzes_imported(import_summary, author_id, author_email):
+        """Notify admins once about a whole bulk import"""
+        try:
+            response = requests.post(
+                f"{NotificationService.get_main_service_url()}/api/notify/quizzes-imported",
+                json={
+                    "count": import_summary['imported'],
+                    "titles": import_summary['titles'][:20],
+                    "author_id": author_id,
+                    "author_email": author_email
+                },
+                timeout=5
+            )
+            print(f"[Notification] Quizzes imported notification sent: {response.status_code}")
+            return response.status_code == 200
+        except Exception as e:
+            print(f"[Notification] Failed to send quizzes imported notification: {str(e)}")
+            return False
+
     @staticmethod
     def notify_quiz_approved(quiz_data, author_id):
         """Notify moderator that their quiz was approved"""
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from redis import RedisError, ResponseError
+from app.services.user_directory import UserDirectory
+
+
+class ProfileEventConsumer:
+    """
+    Consumes main-service's "user profile changed" stream and refreshes the
+    user names copied onto results, leaderboard entries and Redis leaderboards.
+    All app processes share one consumer group, so each event is applied once.
+    Events that fail are retried from the group's pending list; after
+    `max_deliveries` tries they are moved to a dead-letter stream.
+    """
+
+    GROUP = 'quiz-service'
+
+    def __init__(self, redis_client, result_model, entry_model, leaderboard, stream, store_email=False,
+                 retry_idle_seconds=60, max_deliveries=5):
+        self.redis = redis_client
+        self.result_model = result_model
+        self.entry_model = entry_model
+        self.leaderboard = leaderboard
+        self.stream = stream
+        self.dead_letter_stream = f"{stream}:dead-letter"
+        self.store_email = store_email
+        self.retry_idle_ms = int(retry_idle_seconds * 1000)
+        self.max_deliveries = max_deliveries
+        self.consumer = f"{os.uname().nodename}-{os.getpid()}"
+
+    def _ensure_group(self):
+        try:
+            self.redis.xgroup_create(self.stream, self.GROUP, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def apply(self, fields):
+        user_id = int(fields[b'user_id'])
+        user = {
+            'first_name': fields.get(b'first_name', b'').decode('utf-8'),
+            'last_name': fields.get(b'last_name', b'').decode('utf-8')
+        }
+        update = {'user_name': UserDirectory.full_name(user) or f"User {user_id}"}
+        if self.store_email and b'email' in fields:
+            update['user_email'] = fields[b'email'].decode('utf-8')
+
+        self.result_model.set_user_fields(user_id, update)
+        self.entry_model.set_user_fields(user_id, update)
+
+        for quiz_id in self.entry_model.find_quiz_ids_by_user(user_id):
+            self.leaderboard.rename_user(quiz_id, user_id, update['user_name'])
+
+    def _handle(self, event_id, fields):
+        try:
+            self.apply(fields)
+            self.redis.xack(self.stream, self.GROUP, event_id)
+        except Exception as e:
+            print(f"[ProfileEvents] Failed to apply event {event_id}: {str(e)}")
+
+    def retry_pending(self, count=100):
+        """
+        Claim events any consumer left unacknowledged for retry_idle_seconds and apply them again.
+        Events already delivered max_deliveries times go to the dead-letter stream instead.
+        """
+        pending = self.redis.xpending_range(self.stream, self.GROUP, min='-', max='+', count=count,
+                                            idle=self.retry_idle_ms)
+        if not pending:
+            return 0
+
+        retry_ids, dead_ids = [], []
+        for entry in pending:
+            (dead_ids if entry['times_delivered'] >= self.max_deliveries else retry_ids).append(entry['message_id'])
+
+        if dead_ids:
+            for event_id, fields in self.redis.xclaim(self.stream, self.GROUP, self.consumer, self.retry_idle_ms, dead_ids):
+                if fields:
+                    self.redis.xadd(self.dead_letter_stream, {**fields, b'event_id': event_id})
+                self.redis.xack(self.stream, self.GROUP, event_id)
+                print(f"[ProfileEvents] Gave up on event {event_id} after {self.max_deliveries} deliveries")
+
+        if retry_ids:
+            for event_id, fields in self.redis.xclaim(self.stream, self.GROUP, self.consumer, self.retry_idle_ms, retry_ids):
+                if fields:
+                    self._handle(event_id, fields)
+                else:
+                    # Trimmed from the stream while pending
+                    self.redis.xack(self.stream, self.GROUP, event_id)
+        return len(pending)
+
+    def consume(self, block_ms=5000, count=100):
+        """Apply events until the thread dies; starts with events this consumer left unacknowledged"""
+        self._ensure_group()
+        history = True
+        last_id = '0'
+        last_retry = time.monotonic()
+
+        while True:
+            batches = self.redis.xreadgroup(self.GROUP, self.consumer, {self.stream: last_id if history else '>'},
+                                            count=count, block=block_ms)
+            events = batches[0][1] if batches else []
+
+            if history:
+                if not events:
+                    history = False
+                    continue
+                last_id = events[-1][0]
+
+            for event_id, fields in events:
+                self._handle(event_id, fields)
+
+            if time.monotonic() - last_retry >= self.retry_idle_ms / 1000:
+                self.retry_pending(count)
+                last_retry = time.monotonic()
+
+
+def start_profile_event_consumer(consumer):
+    """Run the consumer in a daemon thread, reconnecting after Redis errors"""
+
+    def loop():
+        while True:
+            try:
+                consumer.consume()
+            except RedisError as e:
+                print(f"[ProfileEvents] Redis error, retrying: {str(e)}")
+                time.sleep(5)
+
+    thread = threading.Thread(target=loop, name='profile-event-consumer', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import threading
+import time
+
+import bson
+from redis import RedisError
+
+
+class _Flight:
+    """A load in progress that concurrent readers of the same quiz wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.failed = False
+
+
+class QuizCache:
+    """
+    Read-through cache of quiz documents in front of Mongo.
+
+    Two tiers hold the BSON bytes of a quiz: an LRU inside this process and a
+    Redis copy shared by all processes. Every quiz carries a `version` that
+    QuizModel increments on each write and publishes to Redis, so any entry
+    whose version differs from the published one is stale and reloaded.
+    Local entries also expire with the Redis copy, which bounds staleness if
+    a version could not be published. Concurrent misses for one quiz wait
+    for a single load.
+    """
+
+    KEY_PREFIX = 'quiz-cache'
+    VERSION_TTL = 86400
+
+    def __init__(self, redis_client, max_size=512, ttl_seconds=300):
+        self.redis = redis_client
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.loading = {}
+        self.counters = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'collapsed': 0, 'bypassed': 0}
+
+    def _keys(self, quiz_id):
+        prefix = f"{self.KEY_PREFIX}:{quiz_id}"
+        return f"{prefix}:version", f"{prefix}:doc"
+
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def _remember(self, quiz_id, version, data):
+        with self.lock:
+            self.local[quiz_id] = (version, data, time.monotonic() + self.ttl_seconds)
+            self.local.move_to_end(quiz_id)
+            if len(self.local) > self.max_size:
+                self.local.popitem(last=False)
+
+    def _lookup(self, quiz_id):
+        """Cached bytes of the current version, or None; raises RedisError when Redis is down"""
+        version_key, doc_key = self._keys(quiz_id)
+        version, stored = self.redis.mget(version_key, doc_key)
+        if version is None:
+            return None
+        version = int(version)
+
+        with self.lock:
+            entry = self.local.get(quiz_id)
+            if entry and entry[0] == version and entry[2] > time.monotonic():
+                self.local.move_to_end(quiz_id)
+                self.counters['local_hits'] += 1
+                return entry[1]
+
+        if stored:
+            stored_version, data = stored.split(b':', 1)
+            if int(stored_version) == version:
+                self._remember(quiz_id, version, data)
+                self._count('redis_hits')
+                return data
+        return None
+
+    def _publish(self, quiz_id, version, data):
+        """Share a freshly loaded quiz unless a newer version was published meanwhile"""
+        version_key, doc_key = self._keys(quiz_id)
+
+        self.redis.set(version_key, version, nx=True, ex=self.VERSION_TTL)
+        current = self.redis.get(version_key)
+        if current is not None and int(current) == version:
+            self.redis.set(doc_key, b'%d:' % version + data, ex=self.ttl_seconds)
+            self._remember(quiz_id, version, data)
+
+    def get(self, quiz_id, load_quiz):
+        quiz_id = str(quiz_id)
+        try:
+            data = self._lookup(quiz_id)
+        except RedisError as e:
+            print(f"[QuizCache] Redis unavailable, reading from Mongo: {str(e)}")
+            self._count('bypassed')
+            return load_quiz()
+        if data is not None:
+            return bson.decode(data)
+
+        with self.lock:
+            flight = self.loading.get(quiz_id)
+            leader = flight is None
+            if leader:
+                flight = self.loading[quiz_id] = _Flight()
+
+        if not leader:
+            self._count('collapsed')
+            if not flight.done.wait(timeout=5) or flight.failed:
+                return load_quiz()
+            return bson.decode(flight.data) if flight.data is not None else None
+
+        try:
+            self._count('misses')
+            quiz = load_quiz()
+            if quiz:
+                flight.data = bson.encode(quiz)
+                try:
+                    self._publish(quiz_id, quiz.get('version', 0), flight.data)
+                except RedisError as e:
+                    print(f"[QuizCache] Failed to cache quiz {quiz_id}: {str(e)}")
+            return quiz
+        except Exception:
+            flight.failed = True
+            raise
+        finally:
+            with self.lock:
+                del self.loading[quiz_id]
+            flight.done.set()
+
+    def prime(self, quiz):
+        """Cache a quiz just returned by a write, so the next read does not go to Mongo"""
+        try:
+            self._publish(str(quiz['_id']), quiz.get('version', 0), bson.encode(quiz))
+        except RedisError as e:
+            print(f"[QuizCache] Failed to cache quiz {quiz['_id']}: {str(e)}")
+
+    def invalidate(self, quiz_id, version=None):
+        """Publish a quiz's new version after a write, or forget it entirely (version None) after a delete"""
+        quiz_id = str(quiz_id)
+        version_key, doc_key = self._keys(quiz_id)
+        with self.lock:
+            self.local.pop(quiz_id, None)
+
+        try:
+            if version is None:
+                self.redis.delete(version_key, doc_key)
+            else:
+                pipe = self.redis.pipeline()
+                pipe.set(version_key, version, ex=self.VERSION_TTL)
+                pipe.delete(doc_key)
+                pipe.execute()
+        except RedisError as e:
+            print(f"[QuizCache] Failed to invalidate quiz {quiz_id}: {str(e)}")
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            counters['local_entries'] = len(self.local)
+        lookups = counters['local_hits'] + counters['redis_hits'] + counters['misses'] + counters['collapsed']
+        counters['hit_ratio'] = round((counters['local_hits'] + counters['redis_hits']) / lookups, 3) if lookups else None
+        return counters
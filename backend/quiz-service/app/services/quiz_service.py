@@ -1,6 +1,16 @@
 from bson import ObjectId
 from flask import current_app
-from datetime import datetime
+from datetime import datetime, timedelta
+import base64
+import json
+from marshmallow import ValidationError
+from redis import RedisError
+from app.schemas.quiz_schema import ImportQuizSchema
+from app.utils.player_view import render_player_view
+
+EPOCH = datetime(1970, 1, 1)
+
+import_quiz_schema = ImportQuizSchema()
 
 
 class QuizService:
@@ -8,6 +18,11 @@ class QuizService:
     def create_quiz(quiz_data, author_id, author_email=None):
         quiz_model = current_app.quiz_model
 
+        QuizService._prepare_quiz(quiz_data, author_id, author_email)
+        return quiz_model.create_quiz(quiz_data)
+
+    @staticmethod
+    def _prepare_quiz(quiz_data, author_id, author_email):
         quiz_data['author_id'] = author_id
         quiz_data['author_email'] = author_email or 'unknown@mail.com'
         quiz_data['status'] = 'PENDING'
@@ -17,10 +32,56 @@ class QuizService:
             for answer in question.get('answers', []):
                 answer['_id'] = ObjectId()
 
-        quiz_id = quiz_model.create_quiz(quiz_data)
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
+    @staticmethod
+    def import_quizzes(lines, author_id, author_email=None, batch_size=500):
+        """
+        Validate NDJSON quiz records as they arrive and insert them in batches.
+        Returns counts, the new quiz ids and an error entry for every rejected line.
+        """
+        quiz_model = current_app.quiz_model
+        summary = {'imported': 0, 'failed': 0, 'quiz_ids': [], 'titles': [], 'errors': []}
+        batch = []
+
+        def reject(line_number, errors):
+            summary['failed'] += 1
+            summary['errors'].append({'line': line_number, 'errors': errors})
+
+        def flush():
+            failed = quiz_model.create_quizzes([quiz_data for _, quiz_data in batch])
+            for index, (line_number, quiz_data) in enumerate(batch):
+                if index in failed:
+                    reject(line_number, {'_schema': [failed[index]]})
+                    continue
+                summary['imported'] += 1
+                summary['quiz_ids'].append(str(quiz_data['_id']))
+                summary['titles'].append(quiz_data['title'])
+            batch.clear()
+
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                quiz_data = import_quiz_schema.load(json.loads(line))
+            except ValueError:
+                reject(line_number, {'_schema': ['Invalid JSON']})
+                continue
+            except ValidationError as err:
+                reject(line_number, err.messages)
+                continue
+
+            QuizService._prepare_quiz(quiz_data, author_id, author_email)
+            batch.append((line_number, quiz_data))
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+        return summary
 
-        return quiz
+    @staticmethod
+    def export_quizzes(status=None):
+        """Cursor over every quiz (optionally of one status) for streaming out"""
+        return current_app.quiz_model.iter_quizzes(current_app.quiz_model.quiz_filter(status=status))
 
     @staticmethod
     def get_quiz(quiz_id):
@@ -35,88 +96,150 @@ class QuizService:
     @staticmethod
     def list_quizzes(status=None, author_id=None):
         quiz_model = current_app.quiz_model
+        quizzes = quiz_model.find_all_quizzes(quiz_model.quiz_filter(status=status, author_id=author_id or None))
+        return quizzes
 
-        filter_dict = {}
-        if status:
-            filter_dict['status'] = status
-        if author_id:
-            filter_dict['author_id'] = author_id
+    @staticmethod
+    def list_quiz_summaries(status=None, limit=20, cursor=None):
+        """
+        Page through quiz summaries; returns (summaries, next_cursor).
+        The cursor is opaque to clients and raises ValueError when malformed.
+        """
+        quiz_model = current_app.quiz_model
 
-        quizzes = quiz_model.find_all_quizzes(filter_dict)
-        return quizzes
+        statuses = [status] if status else quiz_model.STATUSES
+        after = QuizService._decode_cursor(cursor) if cursor else None
+
+        summaries = quiz_model.find_quiz_summaries(statuses, limit + 1, after)
+        next_cursor = None
+        if len(summaries) > limit:
+            summaries = summaries[:limit]
+            next_cursor = QuizService._encode_cursor(summaries[-1])
+
+        return summaries, next_cursor
+
+    @staticmethod
+    def _encode_cursor(quiz):
+        created_at = (quiz['created_at'] - EPOCH) // timedelta(milliseconds=1)
+        token = f"{created_at}:{quiz['_id']}".encode('utf-8')
+        return base64.urlsafe_b64encode(token).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            created_at, quiz_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':')
+            return EPOCH + timedelta(milliseconds=int(created_at)), ObjectId(quiz_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def search_quizzes(text, status=None, author_id=None, limit=20, cursor=None):
+        """Relevance-ranked page of quiz summaries; returns (summaries, next_cursor)"""
+        quiz_model = current_app.quiz_model
+
+        statuses = [status] if status else quiz_model.STATUSES
+        after = QuizService._decode_search_cursor(cursor) if cursor else None
+
+        summaries = quiz_model.search_quiz_summaries(text, statuses, author_id, limit + 1, after)
+        next_cursor = None
+        if len(summaries) > limit:
+            summaries = summaries[:limit]
+            last = summaries[-1]
+            token = f"{last['relevance']!r}:{last['_id']}".encode('utf-8')
+            next_cursor = base64.urlsafe_b64encode(token).decode('ascii')
+
+        return summaries, next_cursor
+
+    @staticmethod
+    def _decode_search_cursor(cursor):
+        try:
+            relevance, quiz_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':')
+            return float(relevance), ObjectId(quiz_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
 
     @staticmethod
     def get_quizzes_by_author(author_id):
         quiz_model = current_app.quiz_model
-        quizzes = quiz_model.find_all_quizzes({'author_id': author_id})
+        quizzes = quiz_model.find_all_quizzes(quiz_model.quiz_filter(author_id=author_id))
         return quizzes
 
+    @staticmethod
+    def _transition_error(quiz_id, message):
+        """Explain why a conditional write matched nothing"""
+        if not current_app.quiz_model.find_quiz_stamp(quiz_id):
+            return ValueError("Quiz not found")
+        return ValueError(message)
+
     @staticmethod
     def update_quiz(quiz_id, update_data, user_id):
+        """
+        Update a pending or rejected quiz; a rejected quiz goes back to pending.
+        Returns (quiz, resubmitted) where resubmitted tells whether it had been rejected.
+        """
         quiz_model = current_app.quiz_model
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
 
-        if not quiz:
-            raise ValueError("Quiz not found")
+        quiz = quiz_model.update_quiz(quiz_id, dict(update_data), expected_status='PENDING')
+        if quiz:
+            return quiz, False
 
-        if quiz['status'] == 'APPROVED':
-            raise ValueError("Cannot update approved quiz")
+        resubmission = dict(update_data, status='PENDING', rejection_reason=None, rejected_by_admin_id=None)
+        quiz = quiz_model.update_quiz(quiz_id, resubmission, expected_status='REJECTED')
+        if quiz:
+            return quiz, True
 
-        if quiz['status'] == 'REJECTED':
-            update_data['status'] = 'PENDING'
-            update_data['rejection_reason'] = None
-            update_data['rejected_by_admin_id'] = None
-
-        success = quiz_model.update_quiz(quiz_id, update_data)
-        if not success:
-            raise ValueError("Failed to update quiz")
-
-        return quiz_model.find_quiz_by_id(quiz_id)
+        raise QuizService._transition_error(quiz_id, "Cannot update approved quiz")
 
     @staticmethod
     def delete_quiz(quiz_id, user_id):
         quiz_model = current_app.quiz_model
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
 
-        if not quiz:
+        if not quiz_model.delete_quiz(quiz_id):
             raise ValueError("Quiz not found")
 
-        success = quiz_model.delete_quiz(quiz_id)
-        if not success:
-            raise ValueError("Failed to delete quiz")
+        current_app.player_view_model.delete_view(quiz_id)
+        try:
+            current_app.leaderboard.forget(quiz_id)
+        except RedisError as e:
+            print(f"[QuizService] Failed to drop leaderboard of quiz {quiz_id}: {str(e)}")
 
         return True
 
     @staticmethod
     def approve_quiz(quiz_id, admin_id, notes=None):
-        quiz_model = current_app.quiz_model
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
-
+        quiz = current_app.quiz_model.approve_quiz(quiz_id, admin_id, notes)
         if not quiz:
-            raise ValueError("Quiz not found")
+            raise QuizService._transition_error(quiz_id, "Can only approve pending quizzes")
 
-        if quiz['status'] != 'PENDING':
-            raise ValueError("Can only approve pending quizzes")
+        current_app.quiz_version_model.create_snapshot(quiz)
+        QuizService._save_player_view(quiz)
+        return quiz
 
-        success = quiz_model.approve_quiz(quiz_id, admin_id, notes)
-        if not success:
-            raise ValueError("Failed to approve quiz")
+    @staticmethod
+    def _save_player_view(quiz):
+        etag, body = render_player_view(quiz)
+        current_app.player_view_model.save_view(quiz['_id'], quiz.get('version', 0), etag, body)
+        return {'etag': etag, 'body': body}
 
-        return quiz_model.find_quiz_by_id(quiz_id)
+    @staticmethod
+    def get_player_view(quiz_id, include_body=True):
+        """
+        Stored player rendition of an approved quiz ({'etag', 'body'}).
+        Quizzes approved before renditions existed are rendered on first request.
+        """
+        view = current_app.player_view_model.find_view(quiz_id, include_body)
+        if view:
+            return view
+
+        quiz = QuizService.get_quiz(quiz_id)
+        if quiz['status'] != 'APPROVED':
+            raise ValueError("Quiz not available")
+        return QuizService._save_player_view(quiz)
 
     @staticmethod
     def reject_quiz(quiz_id, admin_id, reason):
-        quiz_model = current_app.quiz_model
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
-
+        quiz = current_app.quiz_model.reject_quiz(quiz_id, admin_id, reason)
         if not quiz:
-            raise ValueError("Quiz not found")
+            raise QuizService._transition_error(quiz_id, "Can only reject pending quizzes")
 
-        if quiz['status'] != 'PENDING':
-            raise ValueError("Can only reject pending quizzes")
-
-        success = quiz_model.reject_quiz(quiz_id, admin_id, reason)
-        if not success:
-            raise ValueError("Failed to reject quiz")
-
-        return quiz_model.find_quiz_by_id(quiz_id)
+        return quiz
@@ -0,0 +1,81 @@
+from datetime import datetime
+import glob
+import os
+import time
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class ReportArtifactStore:
+    """
+    Finished quiz report PDFs on local disk, named after what they were rendered
+    from (quiz, quiz version, latest result), so an unchanged quiz is rendered once.
+    A lock file next to the artifact keeps concurrent jobs from rendering the same one.
+    """
+
+    def __init__(self, root, lock_timeout_seconds=300):
+        self.root = root
+        self.lock_timeout_seconds = lock_timeout_seconds
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def artifact_key(quiz_id, quiz_version, latest_submitted_at):
+        stamp = int((latest_submitted_at - EPOCH).total_seconds() * 1000)
+        return f"quiz-{quiz_id}-v{quiz_version}-{stamp}"
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.pdf")
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def _acquire(self, key):
+        """True once the caller holds the render lock, False if the artifact appeared meanwhile"""
+        lock_path = self.path(key) + '.lock'
+        while True:
+            if self.exists(key):
+                return False
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                pass
+
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.lock_timeout_seconds:
+                    # The renderer died without cleaning up
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.2)
+
+    def get_or_render(self, key, render):
+        """
+        Path of the artifact, calling render(path) to write it unless it exists.
+        Returns (path, rendered).
+        """
+        path = self.path(key)
+        if not self._acquire(key):
+            return path, False
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            render(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            os.remove(path + '.lock')
+        return path, True
+
+    def prune(self, quiz_id, keep_key):
+        """Remove a quiz's superseded artifacts, leaving recent ones to jobs that may still be sending them"""
+        cutoff = time.time() - self.lock_timeout_seconds
+        for path in glob.glob(os.path.join(self.root, f"quiz-{quiz_id}-*.pdf")):
+            if path != self.path(keep_key):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import atexit
+import os
+import threading
+import time
+
+# Per-process state of a report worker, set up once by _init_report_worker
+_worker = {}
+
+
+def _init_report_worker(app_config):
+    from pymongo import MongoClient
+    from app.models.quiz import QuizModel
+    from app.models.result import ResultModel
+    from app.models.report_job import ReportJobModel
+    from app.services.report_artifacts import ReportArtifactStore
+    from app.services.user_directory import UserDirectory
+
+    mongo_db = MongoClient(app_config['MONGO_URI'])[app_config['MONGO_DB']]
+    _worker.update(
+        config=app_config,
+        quiz_model=QuizModel(mongo_db),
+        result_model=ResultModel(mongo_db),
+        job_model=ReportJobModel(mongo_db),
+        artifacts=ReportArtifactStore(app_config['REPORT_ARTIFACT_DIR'], app_config['REPORT_RENDER_LOCK_SECONDS']),
+        user_directory=UserDirectory(
+            app_config['MAIN_SERVICE_URL'],
+            chunk_size=app_config['USER_DIRECTORY_CHUNK_SIZE'],
+            max_workers=app_config['USER_DIRECTORY_CONCURRENCY'],
+            timeout=app_config['USER_DIRECTORY_TIMEOUT'],
+            service_token=app_config['USER_DIRECTORY_SERVICE_TOKEN']
+        )
+    )
+    print(f"[ReportWorker] Started (pid {os.getpid()})")
+
+
+def _render_artifact(quiz, artifact_key):
+    from app.services.report_service import ReportService
+
+    artifacts = _worker['artifacts']
+    path, rendered = artifacts.get_or_render(
+        artifact_key,
+        lambda output_path: ReportService.render_quiz_report(
+            quiz, _worker['result_model'], _worker['user_directory'], output_path
+        )
+    )
+    if rendered:
+        artifacts.prune(str(quiz['_id']), artifact_key)
+    return path, rendered
+
+
+def run_report_job(job_id):
+    """Render a report unless its artifact already exists, then deliver it"""
+    from app.services.report_service import ReportService
+
+    job_model = _worker['job_model']
+    try:
+        job_model.mark_running(job_id)
+        job = job_model.find_job_by_id(job_id)
+        quiz = _worker['quiz_model'].find_quiz_by_id(str(job['quiz_id']))
+        if not quiz:
+            raise ValueError("Quiz not found")
+
+        path, rendered = _render_artifact(quiz, job['artifact_key'])
+
+        ReportService.send_quiz_report(
+            _worker['config']['MAIN_SERVICE_URL'], job['requested_by'], quiz.get('title', 'quiz_report'), path
+        )
+        job_model.mark_done(job_id, rendered, os.path.getsize(path))
+    except Exception as e:
+        print(f"[ReportWorker] Job {job_id} failed: {str(e)}")
+        job_model.mark_failed(job_id, str(e))
+
+
+def render_quiz_artifact(quiz_id, artifact_key):
+    """Path of a quiz's report artifact, rendering it if needed; used by bulk reports"""
+    quiz = _worker['quiz_model'].find_quiz_by_id(quiz_id)
+    if not quiz:
+        raise ValueError("Quiz not found")
+    return _render_artifact(quiz, artifact_key)[0]
+
+
+class ReportJobRunner:
+    """
+    Renders quiz reports in a process pool (one process per core by default)
+    so ReportLab never runs in a web worker.
+    The pool is started on the first report and replaced if a worker process dies.
+    Jobs live only in this process, so their heartbeat is kept fresh while they
+    are queued or running here, and other jobs whose heartbeat went stale are failed.
+    """
+
+    def __init__(self, app_config, job_model, max_workers):
+        self.app_config = app_config
+        self.job_model = job_model
+        self.max_workers = max_workers
+        self.executor = None
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_report_worker,
+                    initargs=(self.app_config,)
+                )
+            return self.executor
+
+    def _submit(self, fn, *args):
+        executor = self._executor()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            executor = self._executor()
+            return executor, executor.submit(fn, *args)
+
+    def submit(self, job_id):
+        with self.lock:
+            self.in_flight.add(job_id)
+        try:
+            executor, future = self._submit(run_report_job, job_id)
+        except Exception:
+            with self.lock:
+                self.in_flight.discard(job_id)
+            raise
+        future.add_done_callback(lambda done: self._finished(job_id, executor, done))
+
+    def render(self, quiz_id, artifact_key):
+        """Future of a report artifact's path"""
+        executor, future = self._submit(render_quiz_artifact, quiz_id, artifact_key)
+        future.add_done_callback(
+            lambda done: self._discard(executor)
+            if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool) else None
+        )
+        return future
+
+    def _discard(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def _finished(self, job_id, executor, future):
+        with self.lock:
+            self.in_flight.discard(job_id)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            return
+
+        print(f"[ReportJobs] Job {job_id} crashed: {str(error)}")
+        try:
+            self.job_model.mark_failed(job_id, str(error) or type(error).__name__)
+        except Exception as e:
+            print(f"[ReportJobs] Failed to record crash of job {job_id}: {str(e)}")
+        if isinstance(error, BrokenProcessPool):
+            self._discard(executor)
+
+    def start_heartbeat(self, interval_seconds):
+        """
+        Every `interval_seconds`, refresh the heartbeat of this process's jobs and fail
+        jobs no process has refreshed for four intervals, such as ones lost in a restart
+        """
+
+        def loop():
+            while True:
+                try:
+                    with self.lock:
+                        job_ids = list(self.in_flight)
+                    self.job_model.touch(job_ids)
+                    failed = self.job_model.fail_orphaned(datetime.utcnow() - timedelta(seconds=4 * interval_seconds))
+                    if failed:
+                        print(f"[ReportJobs] Failed {failed} orphaned report job(s)")
+                except Exception as e:
+                    print(f"[ReportJobs] Heartbeat failed: {str(e)}")
+                time.sleep(interval_seconds)
+
+        thread = threading.Thread(target=loop, name='report-job-heartbeat', daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'started': self.executor is not None,
+            'in_flight': len(self.in_flight)
+        }
@@ -1,45 +1,191 @@
 from flask import current_app
 from app.utils.pdf_generator import PDFGenerator
+from app.utils.question_stats import merge_increments, question_analytics, summarize_by_version
+from app.utils.result_export import csv_chunks, parquet_chunks
+from app.services.report_artifacts import ReportArtifactStore
+from app.services.user_directory import UserDirectory
+from app.utils.zip_stream import stream_zip
 from bson import ObjectId
+from concurrent.futures import as_completed
 import os
+import re
 import requests
 
 
 class ReportService:
 
     @staticmethod
-    def generate_quiz_report(quiz_id):
-        """Generate a PDF report for a quiz with all results"""
-        quiz_model = current_app.quiz_model
-        result_model = current_app.result_model
-
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
+    def request_quiz_report(quiz_id, user_id):
+        """Queue a quiz report for rendering and delivery; returns the job"""
+        quiz = current_app.quiz_model.find_quiz_by_id(quiz_id)
         if not quiz:
             raise ValueError("Quiz not found")
 
-        results = result_model.find_results_by_quiz(quiz_id)
-
-        if not results:
+        latest_submitted_at = current_app.result_model.find_latest_submission_time(quiz_id)
+        if latest_submitted_at is None:
             raise ValueError("No results found for this quiz")
 
-        main_service_url = current_app.config.get('MAIN_SERVICE_URL', 'http://localhost:5000')
-        for result in results:
-            user_id = result.get('user_id')
+        artifact_key = ReportArtifactStore.artifact_key(quiz_id, quiz.get('version', 0), latest_submitted_at)
+        job = current_app.report_job_model.create_job(quiz_id, user_id, artifact_key)
+        current_app.report_jobs.submit(str(job['_id']))
+        return job
+
+    @staticmethod
+    def bulk_quiz_reports(quiz_ids=None, status=None, author_id=None):
+        """
+        Start rendering the reports of many quizzes in the report process pool and
+        return a generator of a zip archive that takes each PDF as soon as it is ready
+        """
+        filter_dict = current_app.quiz_model.quiz_filter(quiz_ids=quiz_ids, status=status, author_id=author_id)
+        quizzes = current_app.quiz_model.find_quiz_titles(filter_dict, current_app.config['REPORT_BULK_MAX_QUIZZES'])
+        if not quizzes:
+            raise ValueError("No quizzes found")
+
+        latest = current_app.result_model.find_latest_submission_times([str(quiz['_id']) for quiz in quizzes])
+
+        renders = {}
+        problems = []
+        for quiz in quizzes:
+            quiz_id = str(quiz['_id'])
+            if quiz_id not in latest:
+                problems.append(f"{quiz_id} {quiz.get('title', '')}: no results")
+                continue
+            artifact_key = ReportArtifactStore.artifact_key(quiz_id, quiz.get('version', 0), latest[quiz_id])
+            renders[current_app.report_jobs.render(quiz_id, artifact_key)] = quiz
+
+        return stream_zip(ReportService._bulk_report_entries(renders, problems))
+
+    @staticmethod
+    def _bulk_report_entries(renders, problems):
+        for future in as_completed(renders):
+            quiz = renders[future]
             try:
-                response = requests.get(f"{main_service_url}/users/{user_id}/public")
-                if response.status_code == 200:
-                    user_data = response.json().get('user', {})
-                    first_name = user_data.get('first_name', '')
-                    last_name = user_data.get('last_name', '')
-                    result['user_name'] = f"{first_name} {last_name}".strip() or f"User {user_id}"
-                else:
-                    result['user_name'] = f"User {user_id}"
+                path = future.result()
             except Exception as e:
-                result['user_name'] = f"User {user_id}"
+                problems.append(f"{quiz['_id']} {quiz.get('title', '')}: {str(e)}")
+                continue
+            safe_title = re.sub(r'[^\w.-]+', '_', quiz.get('title', 'quiz'))[:80]
+            yield f"{safe_title}_{quiz['_id']}.pdf", path
+
+        if problems:
+            yield 'errors.txt', ('\n'.join(problems) + '\n').encode('utf-8')
+
+    @staticmethod
+    def get_report_job(job_id):
+        if not ObjectId.is_valid(job_id):
+            raise ValueError("Report job not found")
+
+        job = current_app.report_job_model.find_job_by_id(job_id)
+        if not job:
+            raise ValueError("Report job not found")
+        return job
+
+    @staticmethod
+    def get_report_artifact(job_id):
+        """Path and download name of a finished job's PDF"""
+        job = ReportService.get_report_job(job_id)
+        path = current_app.report_artifacts.path(job['artifact_key'])
+        if job['status'] != current_app.report_job_model.DONE or not os.path.exists(path):
+            raise ValueError("Report is not available")
+
+        quiz = current_app.quiz_model.find_quiz_by_id(str(job['quiz_id']))
+        return path, (quiz or {}).get('title', 'quiz_report')
 
-        pdf_buffer = PDFGenerator.generate_quiz_report(quiz, results)
+    @staticmethod
+    def render_quiz_report(quiz, result_model, user_directory, output_path):
+        """Render a quiz's report to `output_path`; runs in a report worker process"""
+        quiz_id = str(quiz['_id'])
+        statistics = result_model.get_quiz_statistics(quiz_id)
+        if not statistics:
+            raise ValueError("No results found for this quiz")
+
+        results = result_model.find_top_results(quiz_id, PDFGenerator.LEADERBOARD_ROWS)
+
+        # Names are stored on results; only older rows need a lookup
+        unnamed = [result.get('user_id') for result in results if not result.get('user_name')]
+        users = user_directory.get_users(unnamed) if unnamed else {}
+        for result in results:
+            if not result.get('user_name'):
+                user_id = result.get('user_id')
+                result['user_name'] = UserDirectory.full_name(users.get(user_id)) or f"User {user_id}"
+
+        PDFGenerator.generate_quiz_report(quiz, results, statistics, output_path=output_path)
+
+    @staticmethod
+    def send_quiz_report(main_service_url, user_id, quiz_title, pdf_path):
+        """Email a rendered report to the admin who asked for it"""
+        response = requests.get(f"{main_service_url}/users/{user_id}/public", timeout=10)
+        if response.status_code != 200:
+            raise ValueError("Failed to fetch user information")
+
+        admin_email = response.json().get('user', {}).get('email')
+        if not admin_email:
+            raise ValueError("Admin email not found")
+
+        admin_email = 'REPLACE@gmail.com'
 
-        return pdf_buffer, quiz.get('title', 'quiz_report')
+        # main-service reads the PDF from the shared spool, only its name is sent
+        email_data = {
+            'recipient_email': admin_email,
+            'quiz_title': quiz_title,
+            'pdf_file': os.path.basename(pdf_path)
+        }
+        email_response = requests.post(f"{main_service_url}/api/notify/send-pdf-report", json=email_data, timeout=60)
+
+        if email_response.status_code == 404:
+            raise ValueError(f"main-service cannot find {email_data['pdf_file']} in the report spool")
+        if email_response.status_code != 200:
+            raise ValueError("Failed to send PDF report")
+
+    @staticmethod
+    def get_question_analytics(quiz, version=None):
+        """Per-question difficulty, answer picks and discrimination for one version of a quiz"""
+        quiz_id = str(quiz['_id'])
+        if version is None:
+            version = quiz.get('version', 0)
+        elif version != quiz.get('version', 0):
+            quiz = current_app.quiz_version_model.find_version(quiz_id, version)
+            if not quiz:
+                raise ValueError("Quiz version not found")
+
+        stats = current_app.question_stats_model.find_stats(quiz_id, version)
+        return {
+            'quiz_id': quiz_id,
+            'version': version,
+            'versions': current_app.question_stats_model.find_versions(quiz_id),
+            'attempts': stats['attempts'] if stats else 0,
+            'questions': question_analytics(stats, quiz)
+        }
+
+    @staticmethod
+    def rebuild_question_stats(quiz_id, chunk_size=5000):
+        """
+        Recompute a quiz's question statistics from its results in fixed-size chunks.
+        Results stored while this runs may be counted twice or not at all.
+        """
+        totals = {}
+        chunk = []
+        for row in current_app.result_model.iter_question_rows(quiz_id):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                for key, increments in summarize_by_version(chunk).items():
+                    merge_increments(totals.setdefault(key, {}), increments)
+                chunk = []
+        if chunk:
+            for key, increments in summarize_by_version(chunk).items():
+                merge_increments(totals.setdefault(key, {}), increments)
+
+        current_app.question_stats_model.delete_stats(quiz_id)
+        current_app.question_stats_model.record(totals)
+        return sum(increments['attempts'] for increments in totals.values())
+
+    @staticmethod
+    def export_results(quiz, fmt):
+        """Chunks of a CSV or Parquet file with one row per result of a quiz, oldest first"""
+        chunk_size = current_app.config['REPORT_EXPORT_CHUNK_SIZE']
+        exporter = parquet_chunks if fmt == 'parquet' else csv_chunks
+        cursor = current_app.result_model.iter_export_rows(str(quiz['_id']), chunk_size)
+        return exporter(cursor, quiz, chunk_size)
 
     @staticmethod
     def generate_user_report(result_id, user_info):
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import os
+import threading
+import time
+
+
+class RerankJob:
+    """
+    Keeps results' ranked_position current as more players submit.
+
+    Each run only re-ranks quizzes that received results since the previous run,
+    walks each one once in index order and writes back only the ranks that changed.
+    The run is guarded by a lease in Mongo so only one app process does it at a time.
+    """
+
+    STATE_ID = 'rerank'
+
+    def __init__(self, mongo_db, result_model, lease_seconds=300, lag_seconds=30):
+        self.state = mongo_db.job_state
+        self.result_model = result_model
+        self.lease_seconds = lease_seconds
+        self.lag_seconds = lag_seconds
+        self.owner = f"{os.uname().nodename}-{os.getpid()}"
+
+    def _acquire(self):
+        now = datetime.utcnow()
+        try:
+            return self.state.find_one_and_update(
+                {'_id': self.STATE_ID, '$or': [
+                    {'lease_until': {'$lt': now}},
+                    {'lease_until': None}
+                ]},
+                {'$set': {'lease_until': now + timedelta(seconds=self.lease_seconds), 'owner': self.owner}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return None
+
+    def _release(self, watermark, metrics):
+        update = {'lease_until': None, 'last_run': metrics}
+        if watermark:
+            update['watermark'] = watermark
+        self.state.update_one({'_id': self.STATE_ID, 'owner': self.owner}, {'$set': update})
+
+    def rerank_quiz(self, quiz_id):
+        """Recompute one quiz's ranks (ties share a rank); returns (rows scanned, rows updated)"""
+        changes = []
+        updated = 0
+        scanned = 0
+        previous = None
+        rank = 0
+
+        for scanned, row in enumerate(self.result_model.iter_ranked_rows(quiz_id), 1):
+            key = (row['score'], row.get('time_spent_seconds'))
+            if key != previous:
+                rank = scanned
+                previous = key
+
+            if row.get('ranked_position') != rank:
+                changes.append((row['_id'], rank))
+                if len(changes) >= 1000:
+                    updated += self.result_model.update_result_ranks(changes)
+                    changes = []
+
+        updated += self.result_model.update_result_ranks(changes)
+        return scanned, updated
+
+    def run(self, all_quizzes=False):
+        """Run one pass; returns its metrics, or None if another process holds the lease"""
+        state = self._acquire()
+        if state is None:
+            return None
+
+        started = time.monotonic()
+        since = None if all_quizzes else state.get('watermark')
+        until = datetime.utcnow() - timedelta(seconds=self.lag_seconds)
+        metrics = {'quizzes': 0, 'rows_scanned': 0, 'rows_updated': 0, 'finished_at': None}
+
+        try:
+            for quiz_id in self.result_model.find_quizzes_with_results_between(since, until):
+                scanned, updated = self.rerank_quiz(quiz_id)
+                metrics['quizzes'] += 1
+                metrics['rows_scanned'] += scanned
+                metrics['rows_updated'] += updated
+        except Exception:
+            self._release(None, state.get('last_run'))
+            raise
+
+        metrics['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+        metrics['finished_at'] = datetime.utcnow()
+        self._release(until, metrics)
+
+        print(f"[Rerank] {metrics['quizzes']} quiz(zes), {metrics['rows_scanned']} row(s) scanned, "
+              f"{metrics['rows_updated']} updated in {metrics['duration_ms']} ms")
+        return metrics
+
+    def last_run(self):
+        state = self.state.find_one({'_id': self.STATE_ID}, {'last_run': 1, 'watermark': 1})
+        if not state:
+            return None
+        return {'watermark': state.get('watermark'), **(state.get('last_run') or {})}
+
+
+def start_rerank_scheduler(rerank_job, interval_seconds):
+    """Run the re-ranking job periodically in a daemon thread"""
+
+    def loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                rerank_job.run()
+            except Exception as e:
+                print(f"[Rerank] Run failed: {str(e)}")
+
+    thread = threading.Thread(target=loop, name='rerank-scheduler', daemon=True)
+    thread.start()
+    return thread
@@ -1,146 +1,439 @@
-from multiprocessing import Process
 from flask import current_app
 from bson import ObjectId
-from app.utils.scoring import calculate_quiz_score
-import time
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+from redis import RedisError
+from app.models.quiz import QuizModel
+from app.models.quiz_version import QuizVersionModel
+from app.models.result import ResultModel
+from app.models.leaderboard_entry import LeaderboardEntryModel
+from app.models.question_stats import QuestionStatsModel
+from app.models.score_sketch import ScoreSketchModel
+from app.services.leaderboard_engine import LeaderboardEngine
+from app.services.user_directory import UserDirectory
+from app.utils.answer_key import AnswerKeyCache
+from app.utils.question_stats import merge_increments, summarize_by_version
+from app.utils.score_sketch import ScoreSketch, score_percents, sketch_increments
+from concurrent.futures import ThreadPoolExecutor
+import bisect
+import threading
 
-def process_quiz_result_async(quiz_id, user_id, submitted_answers, time_spent_seconds, app_config):
-    """
-    Async function to process quiz results in background
-    This runs in a separate process
-    """
-    from pymongo import MongoClient
-    from app.models.result import ResultModel
-    from app.models.quiz import QuizModel
 
-    mongo_client = MongoClient(app_config['MONGO_URI'])
-    mongo_db = mongo_client[app_config['MONGO_DB']]
+class QueueFullError(Exception):
+    """Raised when the submission queue is at capacity"""
 
-    quiz_model = QuizModel(mongo_db)
-    result_model = ResultModel(mongo_db)
+    def __init__(self, retry_after):
+        super().__init__("Submission queue is full")
+        self.retry_after = retry_after
 
-    print(f"[ResultProcessor] Processing result for quiz {quiz_id}, user {user_id}")
 
+def send_result_email(app_config, user_id, quiz_title, score, max_score, rank):
     try:
-        quiz = quiz_model.find_quiz_by_id(quiz_id)
-        if not quiz:
-            print(f"[ResultProcessor] Quiz not found: {quiz_id}")
-            return
-
-        total_score, max_score, detailed_results = calculate_quiz_score(quiz, submitted_answers)
-
-        rank = result_model.calculate_user_rank(quiz_id, total_score, time_spent_seconds)
+        import requests
+        main_service_url = app_config.get('MAIN_SERVICE_URL', 'http://localhost:5000')
 
-        result_data = {
-            'quiz_id': ObjectId(quiz_id),
-            'quiz_title': quiz.get('title', 'Untitled Quiz'),
+        email_data = {
             'user_id': user_id,
-            'score': total_score,
+            'quiz_title': quiz_title,
+            'score': score,
             'max_score': max_score,
-            'time_spent_seconds': time_spent_seconds,
-            'submitted_answers': detailed_results,
-            'ranked_position': rank
+            'rank': rank
         }
 
-        result_id = result_model.create_result(result_data)
+        response = requests.post(
+            f"{main_service_url}/api/notify/send-quiz-result-email",
+            json=email_data,
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            print(f"[ResultProcessor] Result email sent successfully to user {user_id}")
+        else:
+            print(f"[ResultProcessor] Failed to send result email: HTTP {response.status_code}")
+    except Exception as email_error:
+        print(f"[ResultProcessor] Error sending result email: {str(email_error)}")
+
+
+class ResultMailer:
+    """
+    Sends result emails from a few background threads so a slow main-service
+    never holds up scoring. Emails past `max_backlog` waiting ones are dropped.
+    """
 
-        print(f"[ResultProcessor] Result saved with ID: {result_id}, Score: {total_score}/{max_score}, Rank: {rank}")
+    def __init__(self, app_config, max_workers=4, max_backlog=1000):
+        self.app_config = app_config
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='result-mailer')
+        self.backlog = threading.BoundedSemaphore(max_backlog)
 
+    def send(self, notifications):
+        for notification in notifications:
+            if not self.backlog.acquire(blocking=False):
+                print(f"[ResultProcessor] Email backlog full, not emailing user {notification['user_id']}")
+                continue
+            future = self.executor.submit(send_result_email, self.app_config, **notification)
+            future.add_done_callback(lambda _: self.backlog.release())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class ResultBatchProcessor:
+    """
+    Scores batches of queued submissions inside a result worker process.
+    Owns the worker's models, answer key cache and leaderboard engine.
+    """
+
+    def __init__(self, mongo_db, redis_client, app_config):
+        self.app_config = app_config
+        self.quiz_model = QuizModel(mongo_db)
+        self.quiz_version_model = QuizVersionModel(mongo_db)
+        self.result_model = ResultModel(mongo_db)
+        self.leaderboard_entry_model = LeaderboardEntryModel(mongo_db)
+        self.question_stats_model = QuestionStatsModel(mongo_db)
+        self.score_sketch_model = ScoreSketchModel(mongo_db)
+        self.answer_keys = AnswerKeyCache(app_config.get('RESULT_ANSWER_KEY_CACHE_SIZE', 256))
+        self.leaderboard = LeaderboardEngine(redis_client, self.result_model)
+        self.user_directory = UserDirectory(
+            app_config.get('MAIN_SERVICE_URL', 'http://localhost:5000'),
+            chunk_size=app_config.get('USER_DIRECTORY_CHUNK_SIZE', 1000),
+            max_workers=app_config.get('USER_DIRECTORY_CONCURRENCY', 4),
+            timeout=app_config.get('USER_DIRECTORY_TIMEOUT', 5),
+            service_token=app_config.get('USER_DIRECTORY_SERVICE_TOKEN', '')
+        )
+
+    def _stamp_users(self, results):
+        """Copy each user's display name (and optionally email) onto their results"""
+        users = self.user_directory.get_users([result['user_id'] for result in results])
+        store_email = self.app_config.get('RESULT_STORE_USER_EMAIL', False)
+
+        for result in results:
+            user_data = users.get(int(result['user_id']))
+            if not user_data:
+                continue
+            result['user_name'] = UserDirectory.full_name(user_data) or user_data.get('email') or f"User {result['user_id']}"
+            if store_email:
+                result['user_email'] = user_data.get('email')
+
+    def process(self, jobs):
+        """
+        Score a batch and store its results with one bulk insert.
+        Submissions for the same quiz share one answer key lookup.
+        A result takes its job's _id, so a job retried after its lease ran out
+        finds its result already stored instead of storing a second one.
+        Returns (job_id, result_id, error) for every job and the result emails to send
+        once the jobs are finished.
+        """
+        outcomes = {}
+        by_quiz = {}
+        for job in jobs:
+            job_id = str(job['_id'])
+            if not ObjectId.is_valid(job['quiz_id']):
+                outcomes[job_id] = (job_id, None, f"Quiz not found: {job['quiz_id']}")
+                continue
+            by_quiz.setdefault(job['quiz_id'], []).append(job)
+
+        stamps = self.quiz_model.find_quiz_stamps(list(by_quiz.keys())) if by_quiz else {}
+
+        scored = []
+        for quiz_id, quiz_jobs in by_quiz.items():
+            stamp = stamps.get(quiz_id)
+            answer_key = None
+            if stamp:
+                version = stamp.get('version', 0)
+                answer_key = self.answer_keys.get(
+                    quiz_id, version,
+                    lambda: self.quiz_version_model.find_version(quiz_id, version) or self.quiz_model.find_quiz_by_id(quiz_id)
+                )
+
+            if not answer_key:
+                for job in quiz_jobs:
+                    outcomes[str(job['_id'])] = (str(job['_id']), None, f"Quiz not found: {quiz_id}")
+                continue
+
+            quiz_results = []
+            for job in quiz_jobs:
+                total_score, max_score, detailed_results = answer_key.score(job['submitted_answers'])
+                quiz_results.append({
+                    '_id': job['_id'],
+                    'quiz_id': ObjectId(quiz_id),
+                    'quiz_title': answer_key.title,
+                    'quiz_version': answer_key.version,
+                    'user_id': job['user_id'],
+                    'score': total_score,
+                    'max_score': max_score,
+                    'time_spent_seconds': job['time_spent_seconds'],
+                    'submitted_answers': detailed_results,
+                    'submitted_at': datetime.utcnow()
+                })
+
+            for result_data, rank in zip(quiz_results, self._rank(quiz_id, quiz_results)):
+                result_data['ranked_position'] = rank
+
+            scored.extend(zip(quiz_jobs, quiz_results))
+
+        notifications = []
+        if scored:
+            self._stamp_users([result_data for _, result_data in scored])
+            result_ids, failed, existing = self.result_model.create_results([result_data for _, result_data in scored])
+
+            for index, (job, result_data) in enumerate(scored):
+                job_id = str(job['_id'])
+                if index in failed:
+                    outcomes[job_id] = (job_id, None, "Failed to store result")
+                    continue
+
+                outcomes[job_id] = (job_id, result_ids[index], None)
+                if index in existing:
+                    print(f"[ResultProcessor] Result {result_ids[index]} was already stored by an earlier attempt")
+                    continue
+
+                print(f"[ResultProcessor] Result saved with ID: {result_ids[index]}, "
+                      f"Score: {result_data['score']}/{result_data['max_score']}, Rank: {result_data['ranked_position']}")
+
+                if self.app_config.get('RESULT_SEND_EMAILS', True):
+                    notifications.append({
+                        'user_id': result_data['user_id'],
+                        'quiz_title': result_data['quiz_title'],
+                        'score': result_data['score'],
+                        'max_score': result_data['max_score'],
+                        'rank': result_data['ranked_position']
+                    })
+
+            if failed:
+                self._discard([scored[index][1] for index in failed])
+
+            stored = [result_data for index, (_, result_data) in enumerate(scored)
+                      if index not in failed and index not in existing]
+            self.leaderboard_entry_model.upsert_best(stored)
+            self._record_question_stats(stored)
+            self._record_score_sketches(stored)
+
+        return [outcomes[str(job['_id'])] for job in jobs], notifications
+
+    def _record_question_stats(self, results):
         try:
-            import requests
-            main_service_url = app_config.get('MAIN_SERVICE_URL', 'http://localhost:5000')
-
-            email_data = {
-                'user_id': user_id,
-                'quiz_title': quiz.get('title', 'Quiz'),
-                'score': total_score,
-                'max_score': max_score,
-                'rank': rank
-            }
+            self.question_stats_model.record(summarize_by_version(results))
+        except Exception as e:
+            # Analytics drift until `flask question-stats-rebuild`; the results themselves are stored
+            print(f"[ResultProcessor] Failed to update question statistics: {str(e)}")
 
-            response = requests.post(
-                f"{main_service_url}/api/notify/send-quiz-result-email",
-                json=email_data
-            )
+    def _record_score_sketches(self, results):
+        by_quiz = {}
+        for result_data in results:
+            by_quiz.setdefault(str(result_data['quiz_id']), []).append(result_data)
 
-            if response.status_code == 200:
-                print(f"[ResultProcessor] Result email sent successfully to user {user_id}")
-            else:
-                print(f"[ResultProcessor] Failed to send result email: HTTP {response.status_code}")
-        except Exception as email_error:
-            print(f"[ResultProcessor] Error sending result email: {str(email_error)}")
+        updates = {quiz_id: sketch_increments(score_percents(quiz_results)) for quiz_id, quiz_results in by_quiz.items()}
+        try:
+            self.score_sketch_model.record({quiz_id: update for quiz_id, update in updates.items() if update})
+        except Exception as e:
+            print(f"[ResultProcessor] Failed to update score sketches: {str(e)}")
+
+    def _rank(self, quiz_id, quiz_results):
+        try:
+            return self.leaderboard.record_results(quiz_id, quiz_results)
+        except RedisError as e:
+            print(f"[ResultProcessor] Leaderboard unavailable, ranking in Mongo: {str(e)}")
 
-    except Exception as e:
-        print(f"[ResultProcessor] Error processing result: {str(e)}")
-    finally:
-        mongo_client.close()
+        # Submissions earlier in the batch are not in Mongo yet but still outrank later ones
+        ranks = []
+        batch_keys = []
+        for result_data in quiz_results:
+            rank_key = (-result_data['score'], result_data['time_spent_seconds'])
+            rank = self.result_model.calculate_user_rank(quiz_id, result_data['score'], result_data['time_spent_seconds'])
+            ranks.append(rank + bisect.bisect_left(batch_keys, rank_key))
+            bisect.insort(batch_keys, rank_key)
+        return ranks
+
+    def _discard(self, results):
+        by_quiz = {}
+        for result_data in results:
+            by_quiz.setdefault(str(result_data['quiz_id']), []).append(result_data)
+        for quiz_id, quiz_results in by_quiz.items():
+            try:
+                self.leaderboard.discard_results(quiz_id, quiz_results)
+            except RedisError as e:
+                print(f"[ResultProcessor] Failed to discard unstored results from leaderboard: {str(e)}")
 
 
 class ResultProcessor:
     """Service to handle async quiz result processing"""
 
     @staticmethod
-    def submit_quiz_async(quiz_id, user_id, submitted_answers, time_spent_seconds):
+    def submit_quiz_async(quiz_id, user_id, submitted_answers, time_spent_seconds, submission_id=None):
         """
-        Submit quiz answers and process asynchronously
-        Returns immediately while processing happens in background
+        Queue quiz answers for the result worker pool
+        Returns immediately while processing happens in background.
+        With a `submission_id`, queueing is idempotent: a second call finds the job already queued.
         """
-        app_config = {
-            'MONGO_URI': current_app.config['MONGO_URI'],
-            'MONGO_DB': current_app.config['MONGO_DB'],
-            'MAIN_SERVICE_URL': current_app.config.get('MAIN_SERVICE_URL', 'http://localhost:5000')
-        }
+        job_model = current_app.submission_job_model
 
-        process = Process(
-            target=process_quiz_result_async,
-            args=(quiz_id, user_id, submitted_answers, time_spent_seconds, app_config)
-        )
-        process.start()
+        max_depth = current_app.config['RESULT_QUEUE_MAX_DEPTH']
+        if job_model.count_pending() >= max_depth:
+            print(f"[ResultProcessor] Queue full, rejecting submission for quiz {quiz_id}, user {user_id}")
+            raise QueueFullError(current_app.config['RESULT_QUEUE_RETRY_AFTER'])
+
+        job_data = {
+            'quiz_id': quiz_id,
+            'user_id': user_id,
+            'submitted_answers': submitted_answers,
+            'time_spent_seconds': time_spent_seconds
+        }
+        if submission_id:
+            job_data['_id'] = ObjectId(submission_id)
 
-        print(f"[ResultProcessor] Started async processing for quiz {quiz_id}, user {user_id}")
+        try:
+            submission_id = job_model.enqueue(job_data)
+            print(f"[ResultProcessor] Queued submission {submission_id} for quiz {quiz_id}, user {user_id}")
+        except DuplicateKeyError:
+            submission_id = str(job_data['_id'])
+            print(f"[ResultProcessor] Submission {submission_id} was already queued")
 
         return {
             'status': 'submitted',
+            'submission_id': submission_id,
             'message': 'Quiz submitted successfully. Results will be processed shortly.'
         }
 
+    @staticmethod
+    def get_submission_status(submission_id, user_id):
+        """Get the processing status of a queued submission"""
+        job = current_app.submission_job_model.find_job_by_id(submission_id)
+
+        if not job or job['user_id'] != user_id:
+            raise ValueError("Submission not found")
+
+        return {
+            'submission_id': submission_id,
+            'status': job['status'],
+            'result_id': job.get('result_id'),
+            'error': job.get('error')
+        }
+
     @staticmethod
     def get_user_results(user_id):
-        """Get all results for a user"""
+        """Get all results for a user, each with the share of players it beat"""
         result_model = current_app.result_model
         results = result_model.find_results_by_user(user_id)
+
+        sketches = current_app.score_sketch_model.find_sketches({str(result['quiz_id']) for result in results})
+        sketches = {quiz_id: ScoreSketch(sketch) for quiz_id, sketch in sketches.items()}
+        for result in results:
+            sketch = sketches.get(str(result['quiz_id']))
+            percents = score_percents([result])
+            if sketch and len(percents):
+                result['beat_percent'] = round(sketch.beat_percent(percents[0]), 2)
         return results
 
+    @staticmethod
+    def get_quiz_statistics(quiz_id, result_id=None, user_id=None):
+        """Score distribution of a quiz from its sketch, optionally with where one of the user's results stands"""
+        if not ObjectId.is_valid(quiz_id) or (result_id and not ObjectId.is_valid(result_id)):
+            raise ValueError("Quiz not found")
+
+        sketch_document = current_app.score_sketch_model.find_sketch(quiz_id)
+        if not sketch_document:
+            raise ValueError("No results found for this quiz")
+        sketch = ScoreSketch(sketch_document)
+
+        def percent(value):
+            return round(value, 2) if value is not None else None
+
+        statistics = {
+            'quiz_id': quiz_id,
+            'count': sketch.count,
+            'mean_percent': percent(sketch.mean()),
+            'stddev_percent': percent(sketch.stddev()),
+            'min_percent': percent(sketch.minimum),
+            'max_percent': percent(sketch.maximum),
+            'median_percent': percent(sketch.percentile(50)),
+            'percentiles': {f"p{q}": percent(sketch.percentile(q)) for q in (10, 25, 50, 75, 90, 95, 99)},
+            'histogram': sketch.histogram()
+        }
+
+        if result_id:
+            result = current_app.result_model.find_result_by_id(result_id)
+            if not result or result['user_id'] != user_id or str(result['quiz_id']) != quiz_id:
+                raise ValueError("Result not found")
+            percents = score_percents([result])
+            statistics['result'] = {
+                'result_id': result_id,
+                'score_percent': percent(percents[0]) if len(percents) else None,
+                'beat_percent': percent(sketch.beat_percent(percents[0])) if len(percents) else None
+            }
+        return statistics
+
+    @staticmethod
+    def rebuild_score_sketch(quiz_id, chunk_size=5000):
+        """Recompute a quiz's score sketch from its results in fixed-size chunks; returns the result count"""
+        inc, minimum, maximum = {}, None, None
+        chunk = []
+
+        def fold(rows):
+            nonlocal minimum, maximum
+            update = sketch_increments(score_percents(rows))
+            if update:
+                merge_increments(inc, update[0])
+                minimum = update[1] if minimum is None else min(minimum, update[1])
+                maximum = update[2] if maximum is None else max(maximum, update[2])
+
+        for row in current_app.result_model.iter_score_rows(quiz_id):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                fold(chunk)
+                chunk = []
+        fold(chunk)
+
+        current_app.score_sketch_model.replace_sketch(quiz_id, (inc, minimum, maximum) if inc else None)
+        return inc.get('count', 0)
+
+    @staticmethod
+    def _read_leaderboard(quiz_id, limit):
+        try:
+            if current_app.leaderboard.is_ready(quiz_id):
+                return current_app.leaderboard.top(quiz_id, limit)
+        except RedisError as e:
+            print(f"[Leaderboard] Redis unavailable, reading from Mongo: {str(e)}")
+        return current_app.leaderboard_entry_model.find_top(quiz_id, limit)
+
+    @staticmethod
+    def get_leaderboard_around_user(quiz_id, user_id, radius=5, auth_token=''):
+        """Leaderboard rows just above and below a user's best attempt"""
+        leaderboard = current_app.leaderboard
+        try:
+            if leaderboard.is_ready(quiz_id):
+                rows = leaderboard.around(quiz_id, user_id, radius)
+            else:
+                leaderboard.rebuild_in_background(quiz_id)
+                rows = current_app.leaderboard_entry_model.find_around(quiz_id, user_id, radius)
+        except RedisError as e:
+            print(f"[Leaderboard] Redis unavailable, reading from Mongo: {str(e)}")
+            rows = current_app.leaderboard_entry_model.find_around(quiz_id, user_id, radius)
+        ResultProcessor._attach_user_names(rows, auth_token)
+        return rows
+
     @staticmethod
     def get_quiz_leaderboard(quiz_id, limit=10, auth_token=''):
         """Get leaderboard for a quiz with user names"""
-        import requests
-        result_model = current_app.result_model
-        leaderboard = result_model.get_leaderboard(quiz_id, limit)
+        leaderboard = ResultProcessor._read_leaderboard(quiz_id, limit)
+        ResultProcessor._attach_user_names(leaderboard, auth_token)
+        return leaderboard
 
-        main_service_url = current_app.config.get('MAIN_SERVICE_URL', 'http://localhost:5000')
+    @staticmethod
+    def _attach_user_names(leaderboard, auth_token=''):
+        """Fill in names for rows without one stored on them (results older than name stamping)"""
+        missing = [entry for entry in leaderboard if not entry.get('user_name')]
+        if not missing:
+            return
 
         headers = {}
         if auth_token:
             headers['Authorization'] = auth_token
 
-        for entry in leaderboard:
-            user_id = entry.get('user_id')
-            try:
-                response = requests.get(
-                    f"{main_service_url}/users/{user_id}/public",
-                    headers=headers
-                )
-                if response.status_code == 200:
-                    user_data = response.json().get('user', {})
-                    entry['user_name'] = f"{user_data.get('first_name', '')} {user_data.get('last_name', '')}".strip()
-                    if not entry['user_name']:
-                        entry['user_name'] = user_data.get('email', f'User {user_id}')
-                else:
-                    print(f"[Leaderboard] Failed to fetch user {user_id}: HTTP {response.status_code}")
-                    entry['user_name'] = f'User {user_id}'
-            except Exception as e:
-                print(f"[Leaderboard] Failed to fetch user {user_id}: {str(e)}")
-                entry['user_name'] = f'User {user_id}'
+        users = current_app.user_directory.get_users([entry.get('user_id') for entry in missing], headers)
 
-        return leaderboard
+        for entry in missing:
+            user_id = entry.get('user_id')
+            user_data = users.get(user_id)
+            entry['user_name'] = UserDirectory.full_name(user_data)
+            if not entry['user_name']:
+                entry['user_name'] = (user_data or {}).get('email') or f'User {user_id}'
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UserDirectory:
+    """
+    Resolves user ids to public profiles through main-service's batch endpoint.
+    Ids are split into chunks that are fetched concurrently over pooled connections.
+    """
+
+    def __init__(self, main_service_url, chunk_size=1000, max_workers=4, timeout=5, service_token=''):
+        self.url = f"{main_service_url}/users/public/batch"
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers['X-Service-Token'] = service_token or ''
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=max_workers))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=max_workers))
+
+    def _fetch_chunk(self, user_ids, headers):
+        try:
+            response = self.session.post(self.url, json={'ids': user_ids}, headers=headers, timeout=self.timeout)
+            if response.status_code != 200:
+                print(f"[UserDirectory] Failed to fetch {len(user_ids)} user(s): HTTP {response.status_code}")
+                return []
+            return response.json().get('users', [])
+        except Exception as e:
+            print(f"[UserDirectory] Failed to fetch {len(user_ids)} user(s): {str(e)}")
+            return []
+
+    def get_users(self, user_ids, headers=None):
+        """Map of user id -> public profile; unknown or unreachable users are left out"""
+        user_ids = sorted({int(user_id) for user_id in user_ids if user_id is not None})
+        if not user_ids:
+            return {}
+
+        chunks = [user_ids[i:i + self.chunk_size] for i in range(0, len(user_ids), self.chunk_size)]
+        if len(chunks) == 1:
+            pages = [self._fetch_chunk(chunks[0], headers)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                pages = list(executor.map(lambda chunk: self._fetch_chunk(chunk, headers), chunks))
+
+        return {user['id']: user for page in pages for user in page}
+
+    @staticmethod
+    def full_name(user):
+        if not user:
+            return ''
+        return f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
@@ -0,0 +1,196 @@
+from multiprocessing import Process, Event
+import atexit
+import math
+import os
+import signal
+import threading
+import time
+
+
+def run_result_worker(worker_id, app_config, stop_event):
+    """
+    Long-lived worker process: pulls submissions from the durable queue until told to stop.
+    The Mongo connection pool is opened once per worker, not once per submission.
+    """
+    from pymongo import MongoClient
+    import redis
+    from app.models.submission_job import SubmissionJobModel
+    from app.services.result_processor import ResultBatchProcessor, ResultMailer
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    mongo_client = MongoClient(app_config['MONGO_URI'])
+    mongo_db = mongo_client[app_config['MONGO_DB']]
+    mongo_db.command('ping')
+
+    redis_client = redis.from_url(app_config['REDIS_URL'])
+
+    job_model = SubmissionJobModel(mongo_db)
+    processor = ResultBatchProcessor(mongo_db, redis_client, app_config)
+    mailer = ResultMailer(app_config, app_config['RESULT_EMAIL_CONCURRENCY'], app_config['RESULT_EMAIL_BACKLOG'])
+    lease_seconds = app_config['RESULT_QUEUE_LEASE_SECONDS']
+    max_attempts = app_config['RESULT_QUEUE_MAX_ATTEMPTS']
+    batch_size = app_config['RESULT_BATCH_SIZE']
+    batch_window = app_config['RESULT_BATCH_WINDOW_MS'] / 1000
+
+    print(f"[ResultWorker {worker_id}] Started (pid {os.getpid()})")
+
+    try:
+        while not stop_event.is_set():
+            try:
+                jobs = job_model.claim_batch(worker_id, lease_seconds, max_attempts, batch_size)
+                if jobs and len(jobs) < batch_size and batch_window > 0:
+                    # Give a burst a few milliseconds to fill the batch
+                    time.sleep(batch_window)
+                    jobs += job_model.claim_batch(worker_id, lease_seconds, max_attempts, batch_size - len(jobs))
+            except Exception as e:
+                print(f"[ResultWorker {worker_id}] Failed to claim jobs: {str(e)}")
+                stop_event.wait(app_config['RESULT_QUEUE_POLL_INTERVAL'])
+                continue
+
+            if not jobs:
+                stop_event.wait(app_config['RESULT_QUEUE_POLL_INTERVAL'])
+                continue
+
+            notifications = []
+            try:
+                outcomes, notifications = processor.process(jobs)
+            except Exception as e:
+                print(f"[ResultWorker {worker_id}] Error processing batch of {len(jobs)}: {str(e)}")
+                outcomes = [(str(job['_id']), None, str(e)) for job in jobs]
+
+            try:
+                job_model.finish_batch(outcomes)
+            except Exception as e:
+                # Leases expire and the jobs are retried
+                print(f"[ResultWorker {worker_id}] Failed to record batch outcome: {str(e)}")
+
+            # Only once the jobs are finished, so slow emails can't outlast the lease
+            mailer.send(notifications)
+    finally:
+        mailer.shutdown()
+        mongo_client.close()
+        redis_client.close()
+        print(f"[ResultWorker {worker_id}] Stopped")
+
+
+class ResultWorkerPool:
+    """
+    Fixed-bounds pool of pre-started result workers.
+    A supervisor thread keeps between min and max workers alive,
+    scaling with the number of pending submissions.
+    """
+
+    def __init__(self, app_config, job_model):
+        self.app_config = app_config
+        self.job_model = job_model
+        self.min_workers = app_config['RESULT_WORKERS_MIN']
+        self.max_workers = max(app_config['RESULT_WORKERS_MAX'], self.min_workers)
+        self.jobs_per_worker = app_config['RESULT_JOBS_PER_WORKER']
+        self.scale_interval = app_config['RESULT_POOL_SCALE_INTERVAL']
+        self.drain_timeout = app_config['RESULT_POOL_DRAIN_TIMEOUT']
+
+        self.workers = {}
+        self.next_worker = 0
+        self.queue_depth = 0
+        self.lock = threading.Lock()
+        self.shutting_down = threading.Event()
+        self.supervisor = None
+
+    def start(self):
+        with self.lock:
+            for _ in range(self.min_workers):
+                self._spawn_worker()
+
+        self.supervisor = threading.Thread(target=self._supervise, name='result-pool-supervisor', daemon=True)
+        self.supervisor.start()
+
+        atexit.register(self.shutdown)
+        if threading.current_thread() is threading.main_thread() \
+                and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, self._handle_sigterm)
+
+        print(f"[ResultPool] Started with {self.min_workers} worker(s), max {self.max_workers}")
+
+    def _spawn_worker(self):
+        worker_id = f"{os.getpid()}-{self.next_worker}"
+        self.next_worker += 1
+
+        stop_event = Event()
+        process = Process(
+            target=run_result_worker,
+            args=(worker_id, self.app_config, stop_event),
+            name=f"result-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = (process, stop_event)
+
+    def _retire_worker(self):
+        for worker_id, (process, stop_event) in self.workers.items():
+            if not stop_event.is_set():
+                stop_event.set()
+                print(f"[ResultPool] Retiring worker {worker_id}")
+                return
+
+    def _supervise(self):
+        while not self.shutting_down.wait(self.scale_interval):
+            try:
+                self.queue_depth = self.job_model.count_pending()
+                self.job_model.fail_abandoned(self.app_config['RESULT_QUEUE_MAX_ATTEMPTS'])
+            except Exception as e:
+                print(f"[ResultPool] Failed to read queue depth: {str(e)}")
+                continue
+
+            with self.lock:
+                if self.shutting_down.is_set():
+                    return
+
+                for worker_id in [w for w, (p, _) in self.workers.items() if not p.is_alive()]:
+                    self.workers.pop(worker_id)[0].join()
+
+                active = sum(1 for _, stop_event in self.workers.values() if not stop_event.is_set())
+                desired = math.ceil(self.queue_depth / self.jobs_per_worker)
+                desired = min(max(desired, self.min_workers), self.max_workers)
+
+                if desired > active:
+                    print(f"[ResultPool] Queue depth {self.queue_depth}, scaling up to {desired} worker(s)")
+                    for _ in range(desired - active):
+                        self._spawn_worker()
+                elif desired < active:
+                    self._retire_worker()
+
+    def _handle_sigterm(self, signum, frame):
+        self.shutdown()
+        raise SystemExit(0)
+
+    def shutdown(self):
+        """Stop taking new jobs and let in-flight submissions finish; queued ones stay in Mongo"""
+        if self.shutting_down.is_set():
+            return
+        self.shutting_down.set()
+
+        with self.lock:
+            print(f"[ResultPool] Draining {len(self.workers)} worker(s)")
+            for _, stop_event in self.workers.values():
+                stop_event.set()
+
+            deadline = time.monotonic() + self.drain_timeout
+            for worker_id, (process, _) in self.workers.items():
+                process.join(max(0, deadline - time.monotonic()))
+                if process.is_alive():
+                    print(f"[ResultPool] Worker {worker_id} did not drain in time, terminating")
+                    process.terminate()
+                    process.join()
+            self.workers.clear()
+
+    def stats(self):
+        with self.lock:
+            alive = sum(1 for process, _ in self.workers.values() if process.is_alive())
+        return {
+            'workers': alive,
+            'min_workers': self.min_workers,
+            'max_workers': self.max_workers,
+            'queue_depth': self.queue_depth,
+            'draining': self.shutting_down.is_set()
+        }
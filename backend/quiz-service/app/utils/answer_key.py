@@ -0,0 +1,142 @@
+from collections import OrderedDict
+
+
+class QuestionKey:
+    """A question's answers as bit positions, so a submission is scored with integer masks"""
+
+    __slots__ = ('question_id', 'answer_bits', 'correct_mask', 'correct_total', 'correct_answer_ids', 'points',
+                 'penalty_points', 'points_per_correct')
+
+    def __init__(self, question_id, answer_ids, correct_answer_ids, points, penalty_points):
+        self.question_id = question_id
+        self.answer_bits = {answer_id: 1 << position for position, answer_id in enumerate(answer_ids)}
+        self.correct_answer_ids = correct_answer_ids
+        self.correct_mask = 0
+        for answer_id in correct_answer_ids:
+            self.correct_mask |= self.answer_bits[answer_id]
+        self.correct_total = self.correct_mask.bit_count()
+        self.points = points
+        self.penalty_points = penalty_points
+        self.points_per_correct = points / len(correct_answer_ids) if correct_answer_ids else 0
+
+
+class AnswerKey:
+    """
+    Correct answers and points of a quiz, compiled once so that scoring
+    a submission needs no ObjectId conversions or per-call set building
+    """
+
+    def __init__(self, quiz):
+        self.title = quiz.get('title', 'Untitled Quiz')
+        self.version = quiz.get('version', 0)
+        self.questions = []
+        self.max_score = 0
+
+        for idx, question in enumerate(quiz.get('questions', [])):
+            if '_id' in question:
+                question_id = str(question['_id'])
+            else:
+                question_id = str(idx)
+                print(f"[Scoring] Warning: Question at index {idx} has no _id, using index")
+
+            answer_ids = []
+            correct_answer_ids = []
+            for ans_idx, ans in enumerate(question.get('answers', [])):
+                if '_id' in ans:
+                    answer_id = str(ans['_id'])
+                else:
+                    answer_id = str(ans_idx)
+                    if ans.get('correct', False):
+                        print(f"[Scoring] Warning: Answer at index {ans_idx} in question {idx} has no _id, using index")
+                answer_ids.append(answer_id)
+                if ans.get('correct', False):
+                    correct_answer_ids.append(answer_id)
+
+            points = question.get('points', 0)
+            self.max_score += points
+            self.questions.append(
+                QuestionKey(question_id, answer_ids, correct_answer_ids, points, question.get('penalty_points', 0))
+            )
+
+    def score(self, submitted_answers):
+        total_score = 0
+        detailed_results = []
+
+        answer_map = {ans['question_id']: ans['answer_ids'] for ans in submitted_answers}
+
+        for key in self.questions:
+            submitted_answer_ids = answer_map.get(key.question_id, [])
+
+            # Ids that are not answers of the question are wrong; they are rare, so only they get a set
+            submitted_mask = 0
+            unknown = None
+            for answer_id in submitted_answer_ids:
+                bit = key.answer_bits.get(answer_id)
+                if bit is not None:
+                    submitted_mask |= bit
+                elif unknown is None:
+                    unknown = {answer_id}
+                else:
+                    unknown.add(answer_id)
+
+            correct_count = (submitted_mask & key.correct_mask).bit_count()
+            wrong_count = (submitted_mask & ~key.correct_mask).bit_count() + (len(unknown) if unknown else 0)
+
+            points_earned = 0
+            if key.correct_answer_ids:
+                points_earned = correct_count * key.points_per_correct
+                if wrong_count > 0 and key.penalty_points > 0:
+                    points_earned -= wrong_count * key.penalty_points
+                points_earned = max(0, points_earned)
+
+            total_score += points_earned
+
+            detailed_results.append({
+                'question_id': key.question_id,
+                'submitted_answer_ids': submitted_answer_ids,
+                'correct_answer_ids': key.correct_answer_ids,
+                'correct': wrong_count == 0 and correct_count == key.correct_total,
+                'points_earned': round(points_earned, 2),
+                'points_possible': key.points,
+                'correct_count': correct_count,
+                'wrong_count': wrong_count
+            })
+
+        return round(total_score, 2), self.max_score, detailed_results
+
+
+class AnswerKeyCache:
+    """
+    LRU cache of compiled answer keys, keyed by quiz id and version.
+    Versions never change once written, so entries need no invalidation.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, cache_key, answer_key):
+        self.keys[cache_key] = answer_key
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+
+    def get(self, quiz_id, version, load_quiz):
+        cache_key = (str(quiz_id), version)
+
+        answer_key = self.keys.get(cache_key)
+        if answer_key is not None:
+            self.hits += 1
+            self.keys.move_to_end(cache_key)
+            return answer_key
+
+        self.misses += 1
+        quiz = load_quiz()
+        if not quiz:
+            return None
+
+        # The quiz may have been edited since `version` was read; file the key under what was loaded
+        answer_key = AnswerKey(quiz)
+        self._store((str(quiz_id), answer_key.version), answer_key)
+        return answer_key
@@ -5,15 +5,69 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from datetime import datetime
+from functools import lru_cache
 import io
 
 
+@lru_cache(maxsize=None)
+def report_styles():
+    """
+    Paragraph and table styles shared by every report, built once per process;
+    getSampleStyleSheet() and the style objects are costly next to a small document
+    """
+    styles = getSampleStyleSheet()
+    return {
+        'sample': styles,
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#34495e'),
+            spaceAfter=12
+        ),
+        'info_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#bdc3c7'))
+        ]),
+        'leaderboard_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#95a5a6')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
+        ]),
+        'result_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8f4f8')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+        ])
+    }
+
+
 class PDFGenerator:
 
+    LEADERBOARD_ROWS = 20
+
     @staticmethod
-    def generate_quiz_report(quiz, results, output_path=None):
+    def generate_quiz_report(quiz, results, statistics, output_path=None):
         """
-        Generate a PDF report for a quiz with all results
+        Generate a PDF report for a quiz from its top results and overall statistics
         """
         if output_path:
             doc = SimpleDocTemplate(output_path, pagesize=A4)
@@ -23,53 +77,34 @@ class PDFGenerator:
 
         elements = []
 
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#34495e'),
-            spaceAfter=12
-        )
+        styles = report_styles()
 
-        title = Paragraph(f"Quiz Report: {quiz.get('title', 'Untitled Quiz')}", title_style)
+        title = Paragraph(f"Quiz Report: {quiz.get('title', 'Untitled Quiz')}", styles['title'])
         elements.append(title)
         elements.append(Spacer(1, 0.2 * inch))
 
         quiz_info = [
             ['Time Limit:', f"{quiz.get('duration_seconds', 0)} seconds"],
             ['Total Questions:', str(len(quiz.get('questions', [])))],
-            ['Total Results:', str(len(results))],
+            ['Total Results:', str(statistics['total'])],
+            ['Participants:', str(statistics['participants'])],
+            ['Average Score:', f"{statistics['average_score']:.1f}/{statistics['max_score']}"],
+            ['Highest / Lowest Score:', f"{statistics['highest_score']} / {statistics['lowest_score']}"],
+            ['Average Time:', f"{statistics['average_time_seconds']:.0f} seconds"],
             ['Report Generated:', datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')]
         ]
 
         info_table = Table(quiz_info, colWidths=[2 * inch, 4 * inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#bdc3c7'))
-        ]))
+        info_table.setStyle(styles['info_table'])
         elements.append(info_table)
         elements.append(Spacer(1, 0.3 * inch))
 
-        leaderboard_heading = Paragraph("Leaderboard - Top Performers", heading_style)
+        leaderboard_heading = Paragraph("Leaderboard - Top Performers", styles['heading'])
         elements.append(leaderboard_heading)
 
         leaderboard_data = [['Rank', 'User ID', 'User', 'Score', 'Time (seconds)', 'Submitted At']]
 
-        for idx, result in enumerate(results[:20], 1):  
+        for idx, result in enumerate(results[:PDFGenerator.LEADERBOARD_ROWS], 1):
             leaderboard_data.append([
                 str(idx),
                 str(result.get('user_id', 'N/A')),
@@ -80,17 +115,7 @@ class PDFGenerator:
             ])
 
         leaderboard_table = Table(leaderboard_data, colWidths=[0.5 * inch, 0.9 * inch, 1.5 * inch, 0.9 * inch, 1.2 * inch, 1.5 * inch])
-        leaderboard_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#95a5a6')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
-        ]))
+        leaderboard_table.setStyle(styles['leaderboard_table'])
         elements.append(leaderboard_table)
 
         doc.build(elements)
@@ -113,9 +138,9 @@ class PDFGenerator:
             doc = SimpleDocTemplate(buffer, pagesize=A4)
 
         elements = []
-        styles = getSampleStyleSheet()
+        styles = report_styles()
 
-        title = Paragraph(f"Quiz Result Report", styles['Title'])
+        title = Paragraph(f"Quiz Result Report", styles['sample']['Title'])
         elements.append(title)
         elements.append(Spacer(1, 0.3 * inch))
 
@@ -129,10 +154,7 @@ class PDFGenerator:
         ]
 
         info_table = Table(info, colWidths=[2 * inch, 4 * inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8f4f8')),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-        ]))
+        info_table.setStyle(styles['result_table'])
         elements.append(info_table)
 
         doc.build(elements)
@@ -0,0 +1,31 @@
+import gzip
+import hashlib
+
+from app.utils.serializers import encode_body
+
+QUIZ_FIELDS = ['_id', 'title', 'description', 'duration_seconds', 'author_id', 'status',
+               'question_count', 'total_points', 'created_at', 'updated_at']
+QUESTION_FIELDS = ['_id', 'order', 'text', 'points']
+ANSWER_FIELDS = ['_id', 'order', 'text']
+
+
+def _pick(document, fields):
+    return {field: document[field] for field in fields if field in document}
+
+
+def strip_for_player(quiz):
+    """Copy of a quiz without correct flags, moderation notes or the author's email"""
+    player_quiz = _pick(quiz, QUIZ_FIELDS)
+    player_quiz['questions'] = [
+        {**_pick(question, QUESTION_FIELDS),
+         'answers': [_pick(answer, ANSWER_FIELDS) for answer in question.get('answers', [])]}
+        for question in quiz.get('questions', [])
+    ]
+    return player_quiz
+
+
+def render_player_view(quiz):
+    """Returns (etag, gzip-compressed response body) of the player's GET /quizzes/<id>"""
+    body = encode_body({"quiz": strip_for_player(quiz)})
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return etag, gzip.compress(body, compresslevel=9, mtime=0)
@@ -0,0 +1,133 @@
+"""
+Per-question item statistics of quiz results.
+
+Results are reduced to additive sums (counts, points, score products), so a
+batch can be folded into the stored totals with a single $inc and the
+analytics are derived from the totals in O(questions).
+"""
+from bson import ObjectId
+import numpy as np
+
+
+def _countable_answer_id(answer_id):
+    # Answer ids become field names; anything else a client sent is not a real answer anyway
+    return isinstance(answer_id, str) and (ObjectId.is_valid(answer_id) or answer_id.isdigit())
+
+
+def summarize_results(results):
+    """
+    Sums of a batch of results of one quiz version, as $inc updates:
+    attempts, score_sum, score_sq_sum and per question `questions.<id>.<sum>`
+    plus `questions.<id>.answers.<answer_id>` pick counts
+    """
+    columns = {}
+    answer_columns = {}
+    rows, cols, earned, correct_flags, picked = [], [], [], [], []
+
+    for row, result in enumerate(results):
+        for answer in result.get('submitted_answers', []):
+            column = columns.setdefault(answer['question_id'], len(columns))
+            rows.append(row)
+            cols.append(column)
+            earned.append(answer.get('points_earned', 0))
+            correct_flags.append(bool(answer.get('correct')))
+            for answer_id in set(answer.get('submitted_answer_ids', [])):
+                if _countable_answer_id(answer_id):
+                    picked.append(answer_columns.setdefault((answer['question_id'], answer_id), len(answer_columns)))
+
+    scores = np.fromiter((result['score'] for result in results), dtype=np.float64, count=len(results))
+    correct = np.zeros((len(results), len(columns)))
+    points = np.zeros((len(results), len(columns)))
+    correct[rows, cols] = correct_flags
+    points[rows, cols] = earned
+
+    sums = {
+        'correct': correct.sum(axis=0),
+        'points': points.sum(axis=0),
+        'points_sq': (points * points).sum(axis=0),
+        'points_score': scores @ points,
+        'correct_score': scores @ correct,
+        'correct_points': (correct * points).sum(axis=0)
+    }
+    picks = np.bincount(np.asarray(picked, dtype=np.int64), minlength=len(answer_columns))
+
+    increments = {
+        'attempts': len(results),
+        'score_sum': float(scores.sum()),
+        'score_sq_sum': float(scores @ scores)
+    }
+    for question_id, column in columns.items():
+        for name, values in sums.items():
+            increments[f"questions.{question_id}.{name}"] = float(values[column])
+    for (question_id, answer_id), column in answer_columns.items():
+        increments[f"questions.{question_id}.answers.{answer_id}"] = int(picks[column])
+    return increments
+
+
+def summarize_by_version(results):
+    """summarize_results for every (quiz_id, quiz_version) in a mixed batch"""
+    groups = {}
+    for result in results:
+        groups.setdefault((str(result['quiz_id']), result.get('quiz_version', 0)), []).append(result)
+    return {key: summarize_results(group) for key, group in groups.items()}
+
+
+def merge_increments(total, increments):
+    for field, value in increments.items():
+        total[field] = total.get(field, 0) + value
+    return total
+
+
+def question_analytics(stats, quiz):
+    """
+    Difficulty and discrimination of every question of `quiz` from its stored sums.
+    Discrimination is the point-biserial correlation between answering the question
+    fully correctly and the score on the rest of the quiz.
+    """
+    questions = quiz.get('questions', [])
+    attempts = stats.get('attempts', 0) if stats else 0
+    question_stats = (stats or {}).get('questions', {})
+
+    def column(name):
+        return np.array([question_stats.get(str(question.get('_id')), {}).get(name, 0.0) for question in questions],
+                        dtype=np.float64)
+
+    correct = column('correct')
+    points = column('points')
+    n = max(attempts, 1)
+    score_sum = stats.get('score_sum', 0.0) if stats else 0.0
+    score_sq_sum = stats.get('score_sq_sum', 0.0) if stats else 0.0
+
+    rest_sum = score_sum - points
+    rest_sq_sum = score_sq_sum - 2 * column('points_score') + column('points_sq')
+    rest_sd = np.sqrt(np.maximum(rest_sq_sum / n - (rest_sum / n) ** 2, 0))
+    correct_rest_sum = column('correct_score') - column('correct_points')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = correct / n
+        mean_correct = correct_rest_sum / correct
+        mean_incorrect = (rest_sum - correct_rest_sum) / (n - correct)
+        discrimination = (mean_correct - mean_incorrect) / rest_sd * np.sqrt(p * (1 - p))
+    defined = (correct > 0) & (correct < attempts) & (rest_sd > 0)
+
+    analytics = []
+    for index, question in enumerate(questions):
+        question_id = str(question.get('_id'))
+        picks = question_stats.get(question_id, {}).get('answers', {})
+        analytics.append({
+            'question_id': question_id,
+            'order': question.get('order'),
+            'text': question.get('text'),
+            'points_possible': question.get('points', 0),
+            'percent_correct': round(float(p[index]) * 100, 2) if attempts else None,
+            'average_points': round(float(points[index]) / attempts, 2) if attempts else None,
+            'discrimination': round(float(discrimination[index]), 3) if defined[index] else None,
+            'answers': [{
+                'answer_id': str(answer.get('_id')),
+                'text': answer.get('text'),
+                'correct': answer.get('correct', False),
+                'picked': picks.get(str(answer.get('_id')), 0),
+                'pick_rate': round(picks.get(str(answer.get('_id')), 0) / attempts * 100, 2) if attempts else None
+            } for answer in question.get('answers', [])]
+        })
+    return analytics
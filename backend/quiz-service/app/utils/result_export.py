@@ -0,0 +1,116 @@
+"""
+Row exports of a quiz's results as CSV or Parquet.
+
+Rows are read from a projected cursor and written in fixed-size chunks, so
+memory depends on the chunk size and not on the number of attempts. Every
+question of the quiz gets a `q<n>_correct` column (empty when a result has
+no answer for it, e.g. one scored against an older version).
+"""
+from datetime import datetime
+import csv
+import io
+
+from app.utils.zip_stream import ChunkSink
+
+BASE_COLUMNS = ['result_id', 'user_id', 'user_name', 'score', 'max_score', 'time_spent_seconds',
+                'submitted_at', 'quiz_version', 'ranked_position']
+
+
+class ParquetUnavailableError(Exception):
+    """Raised when a Parquet export is asked for without pyarrow installed"""
+
+
+def question_columns(quiz):
+    """(question id, column name) for every question, in quiz order"""
+    return [(str(question.get('_id')), f"q{index}_correct")
+            for index, question in enumerate(quiz.get('questions', []), 1)]
+
+
+def _chunks(cursor, questions, chunk_size):
+    """Lists of flat row tuples, `chunk_size` results at a time"""
+    chunk = []
+    for result in cursor:
+        correct = {answer['question_id']: answer.get('correct') for answer in result.get('submitted_answers', [])}
+        chunk.append((
+            str(result['_id']),
+            result.get('user_id'),
+            result.get('user_name'),
+            result.get('score'),
+            result.get('max_score'),
+            result.get('time_spent_seconds'),
+            result.get('submitted_at'),
+            result.get('quiz_version', 0),
+            result.get('ranked_position'),
+            *(correct.get(question_id) for question_id, _ in questions)
+        ))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_chunks(cursor, quiz, chunk_size=5000):
+    questions = question_columns(quiz)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(BASE_COLUMNS + [name for _, name in questions])
+    for chunk in _chunks(cursor, questions, chunk_size):
+        for row in chunk:
+            writer.writerow([
+                value.isoformat() if isinstance(value, datetime)
+                else int(value) if isinstance(value, bool)
+                else value
+                for value in row
+            ])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def parquet_schema(quiz):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ('result_id', pa.string()),
+            ('user_id', pa.int64()),
+            ('user_name', pa.string()),
+            ('score', pa.float64()),
+            ('max_score', pa.float64()),
+            ('time_spent_seconds', pa.int64()),
+            ('submitted_at', pa.timestamp('ms')),
+            ('quiz_version', pa.int64()),
+            ('ranked_position', pa.int64())
+        ] + [(name, pa.bool_()) for _, name in question_columns(quiz)]
+    )
+
+
+def parquet_chunks(cursor, quiz, chunk_size=5000):
+    """One row group per chunk; pyarrow is only imported when a Parquet export is requested"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ParquetUnavailableError("Parquet export requires pyarrow")
+
+    schema = parquet_schema(quiz)
+    questions = question_columns(quiz)
+
+    def generate():
+        sink = ChunkSink()
+        with pq.ParquetWriter(sink, schema, compression='snappy') as writer:
+            for chunk in _chunks(cursor, questions, chunk_size):
+                columns = list(zip(*chunk))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                yield sink.drain()
+        yield sink.drain()
+
+    return generate()
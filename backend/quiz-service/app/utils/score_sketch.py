@@ -0,0 +1,88 @@
+"""
+Fixed-bin score histogram of a quiz's results.
+
+Scores are recorded as a percentage of the quiz's max score in BINS equal
+bins, so sketches of different quiz versions (and of different batches) merge
+by adding counts. Percentiles are interpolated within a bin and are off by at
+most one bin width (100 / BINS percentage points).
+"""
+import numpy as np
+
+BINS = 1000
+BIN_WIDTH = 100 / BINS
+
+
+def score_percents(results):
+    """Score of each result as a percentage of its max score; results without points are skipped"""
+    return np.array([result['score'] / result['max_score'] * 100 for result in results if result.get('max_score')],
+                    dtype=np.float64)
+
+
+def bin_indexes(percents):
+    return np.clip((np.asarray(percents) / BIN_WIDTH).astype(np.int64), 0, BINS - 1)
+
+
+def sketch_increments(percents):
+    """
+    $inc/$min/$max updates that add a batch of score percentages to a stored sketch:
+    (inc, minimum, maximum), or None for an empty batch
+    """
+    percents = np.asarray(percents, dtype=np.float64)
+    if not len(percents):
+        return None
+
+    counts = np.bincount(bin_indexes(percents), minlength=BINS)
+    inc = {'count': int(len(percents)), 'sum': float(percents.sum()), 'sum_sq': float(percents @ percents)}
+    for index in np.flatnonzero(counts):
+        inc[f"bins.{index}"] = int(counts[index])
+    return inc, float(percents.min()), float(percents.max())
+
+
+class ScoreSketch:
+    """Read side of a stored sketch document"""
+
+    def __init__(self, document):
+        self.count = document.get('count', 0)
+        self.total = document.get('sum', 0.0)
+        self.total_sq = document.get('sum_sq', 0.0)
+        self.minimum = document.get('min')
+        self.maximum = document.get('max')
+
+        self.counts = np.zeros(BINS, dtype=np.int64)
+        for index, count in document.get('bins', {}).items():
+            self.counts[int(index)] = count
+        self.cumulative = np.cumsum(self.counts)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def stddev(self):
+        if not self.count:
+            return None
+        return max(self.total_sq / self.count - (self.total / self.count) ** 2, 0) ** 0.5
+
+    def percentile(self, q):
+        """Score percentage below which q percent of the results fall"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        index = min(int(np.searchsorted(self.cumulative, rank, side='left')), BINS - 1)
+        before = self.cumulative[index - 1] if index else 0
+        within = (rank - before) / self.counts[index] if self.counts[index] else 0
+        value = (index + within) * BIN_WIDTH
+        return min(max(value, self.minimum), self.maximum)
+
+    def beat_percent(self, percent):
+        """Share of results in lower bins than a score percentage, i.e. the players it beat"""
+        if not self.count:
+            return None
+        index = int(bin_indexes(percent))
+        below = self.cumulative[index - 1] if index else 0
+        return float(below) / self.count * 100
+
+    def histogram(self, buckets=20):
+        """Counts in `buckets` equal score ranges (BINS must be a multiple of `buckets`)"""
+        counts = self.counts.reshape(buckets, -1).sum(axis=1)
+        width = 100 / buckets
+        return [{'from_percent': round(i * width, 2), 'to_percent': round((i + 1) * width, 2), 'count': int(count)}
+                for i, count in enumerate(counts)]
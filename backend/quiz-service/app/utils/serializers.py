@@ -0,0 +1,118 @@
+"""
+Encoding of Mongo documents for HTTP responses.
+
+Produces the same relaxed extended JSON as `json_util.dumps` (ObjectId as
+{"$oid": ...}, datetimes as {"$date": ...}) but converts each value while it
+is being encoded instead of round-tripping the document through a string.
+"""
+from datetime import datetime, timezone
+import calendar
+import json
+
+from bson import ObjectId, json_util
+from flask import Response, current_app, stream_with_context
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _datetime_millis(value):
+    if value.utcoffset() is not None:
+        value = value - value.utcoffset()
+    return calendar.timegm(value.timetuple()) * 1000 + value.microsecond // 1000
+
+
+def _encode_datetime(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    if value.year >= 1970:
+        offset = value.utcoffset()
+        tz_string = 'Z' if not offset else value.strftime('%z')
+        millis = value.microsecond // 1000
+        fraction = '.%03d' % millis if millis else ''
+        return {'$date': f"{value.strftime('%Y-%m-%dT%H:%M:%S')}{fraction}{tz_string}"}
+
+    return {'$date': {'$numberLong': str(_datetime_millis(value))}}
+
+
+def encode_default(value):
+    """`default` hook for the json module covering the BSON types stored by this service"""
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    return json_util.default(value, json_util.RELAXED_JSON_OPTIONS)
+
+
+def to_jsonable(value):
+    """Plain-Python copy of a document, for payloads handed to other libraries (e.g. requests)"""
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return to_jsonable(encode_default(value))
+
+
+def _encoder():
+    return json.JSONEncoder(
+        default=encode_default,
+        separators=(',', ':'),
+        sort_keys=current_app.json.sort_keys,
+        ensure_ascii=current_app.json.ensure_ascii
+    )
+
+
+def encode_body(payload):
+    """Complete response body as bytes, identical to the streamed form"""
+    return ''.join(_iter_payload(_encoder(), payload)).encode('utf-8') + b'\n'
+
+
+def _iter_payload(encoder, payload):
+    # The C encoder only runs for whole-value encodes, so lists in the envelope
+    # are emitted element by element rather than through iterencode
+    if not isinstance(payload, dict):
+        yield encoder.encode(payload)
+        return
+
+    keys = sorted(payload) if encoder.sort_keys else list(payload)
+    yield '{'
+    for index, key in enumerate(keys):
+        value = payload[key]
+        yield f"{',' if index else ''}{encoder.encode(key)}:"
+        if isinstance(value, list):
+            yield '['
+            for item_index, item in enumerate(value):
+                yield f"{',' if item_index else ''}{encoder.encode(item)}"
+            yield ']'
+        else:
+            yield encoder.encode(value)
+    yield '}'
+
+
+def _buffered(chunks, tail='\n'):
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(tail)
+    yield ''.join(buffer)
+
+
+def json_response(payload, status=200):
+    """Response whose body is encoded incrementally while it is being sent, like `jsonify` output"""
+    body = _buffered(_iter_payload(_encoder(), payload))
+    return Response(body, status=status, mimetype=current_app.json.mimetype)
+
+
+def ndjson_response(documents, status=200):
+    """Newline-delimited JSON, one document per line, encoded as the iterable is consumed"""
+    encoder = _encoder()
+    lines = (encoder.encode(document) + '\n' for document in documents)
+    return Response(stream_with_context(_buffered(lines, tail='')), status=status, mimetype='application/x-ndjson')
@@ -0,0 +1,56 @@
+"""
+Zip archives written straight into a streamed response.
+
+zipfile can write to an unseekable file (it switches to data descriptors),
+so members are compressed into a small in-memory sink that is drained after
+every piece; nothing but the central directory is held for the whole archive.
+"""
+from datetime import datetime
+import io
+import zipfile
+
+READ_SIZE = 1024 * 1024
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """Yield a zip archive of (name, path or bytes) entries piece by piece"""
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for name, content in entries:
+            info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            if isinstance(content, bytes):
+                archive.writestr(info, content)
+            else:
+                with open(content, 'rb') as source, archive.open(info, 'w', force_zip64=True) as member:
+                    for piece in iter(lambda: source.read(READ_SIZE), b''):
+                        member.write(piece)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,84 @@
+"""
+Score sketch accuracy and size against exact statistics.
+
+Feeds BENCH_ATTEMPTS synthetic results through sketch_increments in result
+worker sized batches (folding the $inc updates the way Mongo would), then
+compares the sketch's percentiles and "beat X%" answers with exact values
+computed over the full sorted score array. No database is needed.
+
+    cd backend/quiz-service
+    python -m benchmarks.bench_score_sketch
+"""
+import os
+import time
+
+import bson
+import numpy as np
+
+from app.utils.question_stats import merge_increments
+from app.utils.score_sketch import ScoreSketch, sketch_increments
+
+ATTEMPTS = int(os.environ.get("BENCH_ATTEMPTS", 1000000))
+BATCH_SIZE = 100
+MAX_SCORE = 40
+PERCENTILES = (1, 10, 25, 50, 75, 90, 95, 99)
+BEAT_SAMPLES = 10000
+
+
+def synthetic_scores(rng):
+    """Scores in half points, skewed towards the upper middle like real quizzes"""
+    return np.round(rng.beta(5, 3, ATTEMPTS) * MAX_SCORE * 2) / 2
+
+
+def build_sketch(percents):
+    inc, minimum, maximum = {}, None, None
+    for start in range(0, len(percents), BATCH_SIZE):
+        batch_inc, batch_min, batch_max = sketch_increments(percents[start:start + BATCH_SIZE])
+        merge_increments(inc, batch_inc)
+        minimum = batch_min if minimum is None else min(minimum, batch_min)
+        maximum = batch_max if maximum is None else max(maximum, batch_max)
+
+    return {
+        'count': inc['count'], 'sum': inc['sum'], 'sum_sq': inc['sum_sq'], 'min': minimum, 'max': maximum,
+        'bins': {field.split('.', 1)[1]: count for field, count in inc.items() if field.startswith('bins.')}
+    }
+
+
+def main():
+    rng = np.random.default_rng(42)
+    percents = synthetic_scores(rng) / MAX_SCORE * 100
+
+    started = time.perf_counter()
+    document = build_sketch(percents)
+    ingest = time.perf_counter() - started
+    print(f"Ingested {ATTEMPTS} attempts in batches of {BATCH_SIZE}: {ingest:.2f} s "
+          f"({ingest / (ATTEMPTS / BATCH_SIZE) * 1e6:.0f} us per batch)")
+
+    started = time.perf_counter()
+    sketch = ScoreSketch(document)
+    load = time.perf_counter() - started
+
+    exact = np.sort(percents)
+    print(f"\nMemory: exact {exact.nbytes / 1024:.0f} KiB, "
+          f"sketch document {len(bson.encode(document)) / 1024:.1f} KiB, loaded in {load * 1000:.2f} ms")
+
+    print(f"\n{'':>6} {'exact':>9} {'sketch':>9} {'error':>8}")
+    print(f"{'mean':>6} {exact.mean():9.3f} {sketch.mean():9.3f} {abs(exact.mean() - sketch.mean()):8.4f}")
+    print(f"{'std':>6} {exact.std():9.3f} {sketch.stddev():9.3f} {abs(exact.std() - sketch.stddev()):8.4f}")
+    for q in PERCENTILES:
+        exact_value = np.percentile(exact, q)
+        sketch_value = sketch.percentile(q)
+        print(f"{'p' + str(q):>6} {exact_value:9.3f} {sketch_value:9.3f} {abs(exact_value - sketch_value):8.4f}")
+
+    samples = rng.choice(percents, BEAT_SAMPLES)
+    exact_beat = np.searchsorted(exact, samples, side='left') / len(exact) * 100
+    started = time.perf_counter()
+    sketch_beat = np.array([sketch.beat_percent(value) for value in samples])
+    per_query = (time.perf_counter() - started) / BEAT_SAMPLES
+    errors = np.abs(exact_beat - sketch_beat)
+    print(f"\nbeat %: mean error {errors.mean():.4f} pts, max error {errors.max():.4f} pts, "
+          f"{per_query * 1e6:.1f} us per query")
+
+
+if __name__ == '__main__':
+    main()
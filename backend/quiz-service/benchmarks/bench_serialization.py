@@ -0,0 +1,84 @@
+"""
+Response encoding of large quizzes: json_util round trip + jsonify versus
+the single-pass encoder in app.utils.serializers.
+
+Needs no database; documents are built in memory the way Mongo returns them.
+
+    cd backend/quiz-service
+    python -m benchmarks.bench_serialization
+"""
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from flask import Flask, jsonify
+
+from app.utils.serializers import json_response
+
+QUESTIONS = int(os.environ.get("BENCH_QUESTIONS", 1000))
+QUIZZES = int(os.environ.get("BENCH_QUIZZES", 10))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", 5))
+
+
+def build_quiz(index):
+    created_at = datetime(2024, 1, 1) + timedelta(minutes=index, microseconds=123000 * (index % 2))
+    questions = []
+    for q in range(QUESTIONS):
+        answers = [{'_id': ObjectId(), 'text': f"Answer {a} of question {q}", 'correct': a == 0, 'order': a}
+                   for a in range(4)]
+        questions.append({'_id': ObjectId(), 'order': q, 'text': f"Question {q} of quiz {index}",
+                          'points': 5, 'answers': answers})
+    return {
+        '_id': ObjectId(),
+        'title': f"Benchmark quiz {index}",
+        'description': 'Quiz with ščćžđ characters',
+        'duration_seconds': 600,
+        'author_id': 1,
+        'author_email': 'author@example.com',
+        'status': 'APPROVED',
+        'questions': questions,
+        'created_at': created_at,
+        'updated_at': created_at
+    }
+
+
+def legacy_body(quizzes):
+    return jsonify({"quizzes": [json.loads(json_util.dumps(q)) for q in quizzes]}).get_data()
+
+
+def streamed_body(quizzes):
+    return b''.join(json_response({"quizzes": quizzes}).iter_encoded())
+
+
+def timed(encode, quizzes):
+    best = None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        encode(quizzes)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    app = Flask(__name__)
+    quizzes = [build_quiz(i) for i in range(QUIZZES)]
+
+    with app.app_context():
+        legacy = legacy_body(quizzes)
+        streamed = streamed_body(quizzes)
+        if legacy != streamed:
+            raise SystemExit("Encoded bodies differ from the json_util output")
+
+        print(f"{QUIZZES} quizzes x {QUESTIONS} questions, {len(legacy) / 1024 / 1024:.1f} MiB body, "
+              f"best of {ROUNDS}")
+        legacy_time = timed(legacy_body, quizzes)
+        streamed_time = timed(streamed_body, quizzes)
+        print(f"{'json_util + jsonify':>22}: {legacy_time * 1000:8.1f} ms")
+        print(f"{'serializers':>22}: {streamed_time * 1000:8.1f} ms  ({legacy_time / streamed_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
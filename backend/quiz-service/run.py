@@ -1,13 +1,18 @@
-from app import create_app
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from app import create_app
+from app import create_app, start_background_services
+from app.indexes import check_unique_indexes
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True)
-
+    # Upserts rely on the unique indexes; refuse to serve until indexes-apply has built them
+    check_unique_indexes(app.mongo_db)
+    use_reloader = app.config['USE_RELOADER']
+    # The reloader also runs this file in its watching process; only the serving child starts workers
+    if not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services(app)
+    app.run(host="0.0.0.0", port=5001, debug=True, use_reloader=use_reloader)
@@ -121,7 +121,7 @@ export class LeaderboardComponent implements OnInit {
 
     this.quizService.createPdfReport(quizIdToReport).subscribe({
       next: (response) => {
-        this.notificationService.success('PDF report has been sent to your email');
+        this.notificationService.success(response?.message || 'PDF report is being generated and will be sent to your email');
       },
       error: (error) => {
         this.notificationService.error(error.error?.error || 'Failed to create PDF report');